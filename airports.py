@@ -0,0 +1,257 @@
+"""
+Bundled airport reference data keyed by 3-letter IATA code.
+
+The source of truth is data/airports.csv. It is compiled into data/airports.bin,
+a direct-addressed table with one fixed-size slot per possible code (AAA..ZZZ),
+so a lookup is a single struct unpack at a computed offset. The binary is
+memory-mapped once per process, which keeps worker startup fast and lets
+forked workers share the pages.
+
+Rebuild the binary after editing the CSV with:
+    python airports.py
+"""
+import csv
+import math
+import mmap
+import os
+import struct
+from collections import namedtuple
+from functools import lru_cache
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+CSV_PATH = os.path.join(DATA_DIR, 'airports.csv')
+BIN_PATH = os.path.join(DATA_DIR, 'airports.bin')
+
+MAGIC = b'SOARAP01'
+# magic, slot count, timezone table offset, timezone table length, string pool offset
+HEADER = struct.Struct('<8sIIII')
+# latitude, longitude, ISO country code, timezone index, string pool offset
+RECORD = struct.Struct('<ff2sHI')
+SLOT_COUNT = 26 ** 3
+
+EARTH_RADIUS_MILES = 3958.8
+
+Airport = namedtuple('Airport', ['code', 'name', 'city', 'country', 'latitude', 'longitude', 'timezone'])
+
+
+def slot_for(code):
+    """Map a 3-letter code to its slot number, or None if it is not A-Z only"""
+    if not code or len(code) != 3:
+        return None
+    slot = 0
+    for char in code.upper():
+        value = ord(char) - 65
+        if value < 0 or value > 25:
+            return None
+        slot = slot * 26 + value
+    return slot
+
+
+def build(csv_path=CSV_PATH):
+    """Compile the airports CSV into the binary index format. Returns bytes."""
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+
+    timezones = sorted({row['timezone'] for row in rows})
+    timezone_ids = {tz: i for i, tz in enumerate(timezones)}
+
+    slots = bytearray(RECORD.size * SLOT_COUNT)
+    pool = bytearray()
+    for row in rows:
+        slot = slot_for(row['iata'])
+        if slot is None:
+            continue
+        name = row['name'].encode('utf-8')[:255]
+        city = row['city'].encode('utf-8')[:255]
+        RECORD.pack_into(slots, slot * RECORD.size,
+                         float(row['latitude']), float(row['longitude']),
+                         row['country'].encode('ascii'), timezone_ids[row['timezone']], len(pool))
+        pool += bytes([len(name)]) + name + bytes([len(city)]) + city
+
+    tz_table = '\n'.join(timezones).encode('utf-8')
+    tz_offset = HEADER.size + len(slots)
+    pool_offset = tz_offset + len(tz_table)
+    header = HEADER.pack(MAGIC, SLOT_COUNT, tz_offset, len(tz_table), pool_offset)
+    return header + bytes(slots) + tz_table + bytes(pool)
+
+
+class AirportIndex:
+    """O(1) lookups over a compiled airport table (mmap or bytes)"""
+
+    def __init__(self, buffer):
+        magic, slot_count, tz_offset, tz_length, pool_offset = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or slot_count != SLOT_COUNT:
+            raise ValueError('Not a compiled airport table')
+        self._buffer = buffer
+        self._pool_offset = pool_offset
+        self._timezones = bytes(buffer[tz_offset:tz_offset + tz_length]).decode('utf-8').split('\n')
+
+    @classmethod
+    def open(cls, path=BIN_PATH):
+        with open(path, 'rb') as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def _record(self, code):
+        slot = slot_for(code)
+        if slot is None:
+            return None
+        record = RECORD.unpack_from(self._buffer, HEADER.size + slot * RECORD.size)
+        if record[2] == b'\0\0':
+            return None
+        return record
+
+    def _string(self, offset):
+        length = self._buffer[offset]
+        return bytes(self._buffer[offset + 1:offset + 1 + length]).decode('utf-8'), offset + 1 + length
+
+    def get(self, code):
+        record = self._record(code)
+        if record is None:
+            return None
+        latitude, longitude, country, tz_id, label_offset = record
+        name, offset = self._string(self._pool_offset + label_offset)
+        city, _ = self._string(offset)
+        return Airport(code.upper(), name, city, country.decode('ascii'),
+                       latitude, longitude, self._timezones[tz_id])
+
+    def coordinates(self, code):
+        record = self._record(code)
+        return (record[0], record[1]) if record else None
+
+    def country(self, code):
+        record = self._record(code)
+        return record[2].decode('ascii') if record else None
+
+    def __contains__(self, code):
+        return self._record(code) is not None
+
+
+_index = None
+
+
+def get_index():
+    """Return the process-wide airport index, loading it on first use"""
+    global _index
+    if _index is None:
+        if os.path.exists(BIN_PATH):
+            _index = AirportIndex.open(BIN_PATH)
+        else:
+            # No compiled table (e.g. a fresh checkout that removed it): build in memory
+            _index = AirportIndex(build())
+    return _index
+
+
+def lookup(code):
+    """Return the Airport for an IATA code, or None if unknown"""
+    return get_index().get(code)
+
+
+def airport_country(code):
+    """Return the ISO country code for an IATA code, or None if unknown"""
+    return get_index().country(code)
+
+
+def haversine_miles(origin, destination):
+    """Great-circle distance in statute miles between two (lat, lon) points"""
+    lat1, lon1 = map(math.radians, origin)
+    lat2, lon2 = map(math.radians, destination)
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_MILES * math.asin(math.sqrt(a))
+
+
+@lru_cache(maxsize=65536)
+def _route_distance(origin, destination):
+    index = get_index()
+    start = index.coordinates(origin)
+    end = index.coordinates(destination)
+    if start is None or end is None:
+        return None
+    return haversine_miles(start, end)
+
+
+def distance_miles(origin, destination):
+    """
+    Great-circle distance in miles between two airports, cached per pair.
+    Returns None if either code is missing or unknown.
+    """
+    if not origin or not destination:
+        return None
+    return _route_distance(origin.upper(), destination.upper())
+
+
+def _simplify(points, tolerance):
+    """Ramer-Douglas-Peucker simplification of a list of (lat, lon) points"""
+    if len(points) < 3:
+        return points
+    (y1, x1), (y2, x2) = points[0], points[-1]
+    length = math.hypot(x2 - x1, y2 - y1) or 1e-12
+    farthest, max_distance = 0, 0.0
+    for i in range(1, len(points) - 1):
+        y, x = points[i]
+        distance = abs((x2 - x1) * (y1 - y) - (x1 - x) * (y2 - y1)) / length
+        if distance > max_distance:
+            farthest, max_distance = i, distance
+    if max_distance <= tolerance:
+        return [points[0], points[-1]]
+    left = _simplify(points[:farthest + 1], tolerance)
+    return left[:-1] + _simplify(points[farthest:], tolerance)
+
+
+@lru_cache(maxsize=16384)
+def _route_path(origin, destination, tolerance):
+    index = get_index()
+    start = index.coordinates(origin)
+    end = index.coordinates(destination)
+    if start is None or end is None:
+        return None
+
+    lat1, lon1 = map(math.radians, start)
+    lat2, lon2 = map(math.radians, end)
+    angle = haversine_miles(start, end) / EARTH_RADIUS_MILES
+    # Roughly one vertex per 100 miles before simplification
+    steps = max(1, min(128, int(angle * EARTH_RADIUS_MILES / 100)))
+
+    points = []
+    previous_lon = None
+    for step in range(steps + 1):
+        fraction = step / steps
+        if angle == 0:
+            lat, lon = start
+        else:
+            # Spherical linear interpolation along the great circle
+            a = math.sin((1 - fraction) * angle) / math.sin(angle)
+            b = math.sin(fraction * angle) / math.sin(angle)
+            x = a * math.cos(lat1) * math.cos(lon1) + b * math.cos(lat2) * math.cos(lon2)
+            y = a * math.cos(lat1) * math.sin(lon1) + b * math.cos(lat2) * math.sin(lon2)
+            z = a * math.sin(lat1) + b * math.sin(lat2)
+            lat = math.degrees(math.atan2(z, math.hypot(x, y)))
+            lon = math.degrees(math.atan2(y, x))
+        # Unwrap longitudes so paths crossing the antimeridian stay continuous
+        if previous_lon is not None:
+            while lon - previous_lon > 180:
+                lon -= 360
+            while lon - previous_lon < -180:
+                lon += 360
+        previous_lon = lon
+        points.append((lat, lon))
+
+    return tuple((round(lat, 4), round(lon, 4)) for lat, lon in _simplify(points, tolerance))
+
+
+def great_circle_path(origin, destination, tolerance=0.25):
+    """
+    Simplified great-circle polyline between two airports as [(lat, lon), ...],
+    cached per pair. Longitudes are unwrapped, so they may leave [-180, 180] on
+    routes that cross the antimeridian. Returns None if either code is unknown.
+    """
+    if not origin or not destination:
+        return None
+    return _route_path(origin.upper(), destination.upper(), tolerance)
+
+
+if __name__ == '__main__':
+    data = build()
+    with open(BIN_PATH, 'wb') as f:
+        f.write(data)
+    print(f'Wrote {BIN_PATH} ({len(data)} bytes)')
@@ -1,18 +1,57 @@
-from flask import Flask, request, jsonify, render_template, redirect, url_for, session, send_from_directory
+from flask import Flask, request, jsonify, render_template, redirect, url_for, session, send_file, send_from_directory, stream_with_context, g, has_request_context
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.exc import IntegrityError, OperationalError, TimeoutError as PoolTimeoutError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime, timedelta
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+from werkzeug.middleware.proxy_fix import ProxyFix
+from datetime import datetime, date, timedelta
 import os
 from dotenv import load_dotenv
+import click
 import secrets
+import json
+import csv
+import sqlite3
+import signal
+import socket
+import io
+import base64
 import re
-from html import escape
+import math
+import itertools
+import random
+from html import escape, unescape
+from metrics import Registry, Counter, Gauge, Histogram
+from assets import AssetManifest, select_encoding
+from serialization import RowSerializer, dumps as json_dumps
+from sketches import HeavyHitters, KeyedHyperLogLog
+from airports import airport_country, distance_miles, great_circle_path, lookup as lookup_airport
+from collections import OrderedDict
+from types import SimpleNamespace
+import threading
+import atexit
+import time
+import hashlib
+import mimetypes
+from functools import wraps, lru_cache
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 
-app = Flask(__name__)
+app = Flask(__name__, static_folder=None)  # /static is served by static_files below
 load_dotenv()
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', secrets.token_hex(32))
 
+# Behind a reverse proxy (Render, Heroku, nginx) request.remote_addr is the proxy's
+# address. Set TRUSTED_PROXY_HOPS to the number of proxies in front of the app to take
+# the client address from X-Forwarded-For instead; 0 trusts no forwarding headers.
+TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS', 0))
+if TRUSTED_PROXY_HOPS:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_HOPS, x_proto=TRUSTED_PROXY_HOPS)
+
 # PostgreSQL configuration
 # Support both DATABASE_URL and standard Heroku/Render postgres:// URLs
 database_url = os.environ.get('DATABASE_URL')
@@ -30,10 +69,200 @@ if not database_url:
     db_name = os.environ.get('DB_NAME', 'soarrr_web')
     database_url = f'postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}'
 
+# DATABASE_URL=sqlite:///soarrr.db also works, e.g. for tests and local runs
 app.config['SQLALCHEMY_DATABASE_URI'] = database_url
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# Database instrumentation
+# Hooks are called as hook(name, value, labels) for pool checkout waits and timeouts
+# and for per-request query counts and SQL time. /metrics and logging build on this.
+db_instrumentation_hooks = []
+
+def add_db_instrumentation_hook(hook):
+    db_instrumentation_hooks.append(hook)
+    return hook
+
+def emit_db_metric(name, value, **labels):
+    for hook in db_instrumentation_hooks:
+        hook(name, value, labels)
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that reports how long each checkout waited for a connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            emit_db_metric('pool_checkout_timeouts', 1)
+            raise
+        emit_db_metric('pool_checkout_seconds', time.perf_counter() - start)
+        return connection
+
+def engine_options(url):
+    """SQLAlchemy engine options, tunable from the environment"""
+    if url.startswith('sqlite'):
+        # SQLite picks its own pool; keep Flask-SQLAlchemy's defaults
+        return {}
+    options = {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),  # Below typical proxy idle timeouts
+        'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true',
+    }
+    statement_timeout = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 0))
+    if statement_timeout and url.startswith('postgresql'):
+        options['connect_args'] = {'options': f'-c statement_timeout={statement_timeout}'}
+    return options
+
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(database_url)
+
 db = SQLAlchemy(app)
+
+def pool_status():
+    """
+    Current connection pool occupancy, e.g. for saturation gauges. capacity and
+    saturation are None unless DB_MAX_OVERFLOW bounds the pool (SQLite keeps
+    SQLAlchemy's own pool settings).
+    """
+    pool = db.engine.pool
+    if not isinstance(pool, QueuePool):
+        return None
+    max_overflow = app.config['SQLALCHEMY_ENGINE_OPTIONS'].get('max_overflow')
+    capacity = pool.size() + max_overflow if max_overflow is not None and max_overflow >= 0 else None
+    return {
+        'size': pool.size(),
+        'checked_out': pool.checkedout(),
+        'overflow': max(pool.overflow(), 0),
+        'capacity': capacity,
+        'saturation': pool.checkedout() / capacity if capacity else None
+    }
+
+@db.event.listens_for(Engine, 'connect')
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    # SQLite ignores foreign keys (and so ON DELETE CASCADE) unless asked per connection
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.execute('PRAGMA foreign_keys=ON')
+
+@db.event.listens_for(Engine, 'before_cursor_execute')
+def _count_query_start(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+@db.event.listens_for(Engine, 'after_cursor_execute')
+def _count_query_end(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start'].pop()
+    if has_request_context():
+        g.query_count = g.get('query_count', 0) + 1
+        g.query_seconds = g.get('query_seconds', 0.0) + elapsed
+        if SLOW_REQUEST_MS:
+            g.setdefault('sql_log', []).append((elapsed, statement))
+
+@db.event.listens_for(Engine, 'handle_error')
+def _count_query_error(context):
+    starts = context.connection.info.get('query_start') if context.connection is not None else None
+    if starts:
+        starts.pop()
+
+@app.after_request
+def _report_request_queries(response):
+    if db_instrumentation_hooks:
+        endpoint = request.endpoint or 'unknown'
+        emit_db_metric('request_queries', g.get('query_count', 0), endpoint=endpoint)
+        emit_db_metric('request_query_seconds', g.get('query_seconds', 0.0), endpoint=endpoint)
+    return response
+
+if os.environ.get('DB_QUERY_LOG', 'false').lower() == 'true':
+    @add_db_instrumentation_hook
+    def _log_db_metrics(name, value, labels):
+        app.logger.info('db %s=%s %s', name, value, labels)
+
+# Metrics
+# Per-process request and database metrics, served in Prometheus text format at /metrics
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # If set, /metrics requires "Authorization: Bearer <token>"
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', 0))  # If set, log requests slower than this with their SQL
+
+metrics_registry = Registry()
+http_request_duration = Histogram(metrics_registry, 'soarrr_http_request_duration_seconds',
+                                  'Request latency by endpoint', ['endpoint', 'method'])
+http_requests_total = Counter(metrics_registry, 'soarrr_http_requests_total',
+                              'Requests by endpoint and status code', ['endpoint', 'method', 'status'])
+http_response_size = Histogram(metrics_registry, 'soarrr_http_response_size_bytes',
+                               'Response body size by endpoint', ['endpoint'],
+                               buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304))
+db_queries_per_request = Histogram(metrics_registry, 'soarrr_db_queries_per_request',
+                                   'SQL statements issued per request', ['endpoint'],
+                                   buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100))
+db_seconds_per_request = Histogram(metrics_registry, 'soarrr_db_query_seconds_per_request',
+                                   'Time spent executing SQL per request', ['endpoint'])
+db_pool_checkout = Histogram(metrics_registry, 'soarrr_db_pool_checkout_seconds',
+                             'Time spent waiting for a pooled connection',
+                             buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0))
+db_pool_timeouts = Counter(metrics_registry, 'soarrr_db_pool_checkout_timeouts_total',
+                           'Pool checkouts that timed out')
+
+def _collect_pool_connections():
+    status = pool_status()
+    if status is None:
+        return {}
+    values = {('checked_out',): status['checked_out'], ('overflow',): status['overflow']}
+    if status['capacity'] is not None:
+        values[('capacity',)] = status['capacity']
+    return values
+
+def _collect_pool_saturation():
+    status = pool_status()
+    return {(): status['saturation']} if status and status['saturation'] is not None else {}
+
+Gauge(metrics_registry, 'soarrr_db_pool_connections', 'Connection pool occupancy', ['state'],
+      collect=_collect_pool_connections)
+Gauge(metrics_registry, 'soarrr_db_pool_saturation', 'Checked-out connections over pool capacity',
+      collect=_collect_pool_saturation)
+
+@add_db_instrumentation_hook
+def _record_db_metric(name, value, labels):
+    if name == 'request_queries':
+        db_queries_per_request.observe(value, **labels)
+    elif name == 'request_query_seconds':
+        db_seconds_per_request.observe(value, **labels)
+    elif name == 'pool_checkout_seconds':
+        db_pool_checkout.observe(value)
+    elif name == 'pool_checkout_timeouts':
+        db_pool_timeouts.inc(value)
+
+@app.before_request
+def _start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def _record_request_metrics(response):
+    if 'request_start' not in g:
+        return response
+    elapsed = time.perf_counter() - g.request_start
+    endpoint = request.endpoint or 'unknown'
+    http_request_duration.observe(elapsed, endpoint=endpoint, method=request.method)
+    http_requests_total.inc(endpoint=endpoint, method=request.method, status=str(response.status_code))
+    if response.content_length is not None:
+        http_response_size.observe(response.content_length, endpoint=endpoint)
+
+    if SLOW_REQUEST_MS and elapsed * 1000 >= SLOW_REQUEST_MS:
+        statements = g.get('sql_log', [])
+        app.logger.warning(
+            'Slow request: %s %s took %.1f ms (%d queries, %.1f ms SQL)\n%s',
+            request.method, request.full_path, elapsed * 1000, len(statements),
+            sum(seconds for seconds, _ in statements) * 1000,
+            '\n'.join(f'  [{seconds * 1000:.1f} ms] {" ".join(statement.split())}'
+                      for seconds, statement in statements)
+        )
+    return response
+
+@app.route('/metrics')
+def metrics():
+    if METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {METRICS_TOKEN}':
+        return jsonify({'error': 'Unauthorized'}), 401
+    return app.response_class(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
+
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login_page'
@@ -62,24 +291,146 @@ def validate_password(password):
         return False, "Password must be at least 6 characters"
     return True, ""
 
+# Password hashing
+# Hashes are computed on a small bounded thread pool (hashlib releases the GIL) so a
+# burst of logins cannot tie up every request thread. When the pool and its queue
+# are full, new work is refused immediately instead of piling up.
+PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 8))
+PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+
+class PasswordHashBusy(Exception):
+    """Raised when the hashing pool is saturated"""
+
+def normalize_hash_method(method):
+    """Expand a werkzeug hash method to the full prefix it stores, e.g. 'scrypt' -> 'scrypt:32768:8:1'"""
+    name, *args = method.split(':')
+    if name == 'scrypt':
+        n, r, p = args if args else (2 ** 15, 8, 1)
+        return f'scrypt:{int(n)}:{int(r)}:{int(p)}'
+    if name == 'pbkdf2':
+        hash_name = args[0] if args else 'sha256'
+        iterations = int(args[1]) if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f'pbkdf2:{hash_name}:{iterations}'
+    raise ValueError(f'Unsupported PASSWORD_HASH_METHOD: {method}')
+
+PASSWORD_HASH_PREFIX = normalize_hash_method(PASSWORD_HASH_METHOD)
+
+class HashingPool:
+    """Bounded executor for password hashing with admission control"""
+
+    def __init__(self, workers, queue_limit, timeout):
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # Created lazily per process: threads do not survive a gunicorn fork
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+                self._pid = os.getpid()
+            return self._executor
+
+    def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHashBusy()
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise PasswordHashBusy()
+
+hashing_pool = HashingPool(PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE, PASSWORD_HASH_TIMEOUT)
+
+def hash_password(password):
+    return hashing_pool.run(generate_password_hash, password, PASSWORD_HASH_METHOD)
+
+def verify_password(password_hash, password):
+    return hashing_pool.run(check_password_hash, password_hash, password)
+
+def needs_rehash(password_hash):
+    """True if a stored hash was made with different cost parameters than configured"""
+    return password_hash.split('$', 1)[0] != PASSWORD_HASH_PREFIX
+
+class TokenBucketLimiter:
+    """
+    In-memory token buckets keyed by string (e.g. email or IP). Each failed attempt
+    takes a token; tokens refill at a steady rate up to the burst size.
+    """
+
+    def __init__(self, burst, refill_seconds, max_keys=10000):
+        self.burst = burst
+        self.refill_seconds = refill_seconds
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def _tokens(self, key, now):
+        tokens, updated_at = self._buckets.get(key, (self.burst, now))
+        return min(self.burst, tokens + (now - updated_at) / self.refill_seconds)
+
+    def retry_after(self, keys):
+        """Seconds until every key has a token again (0 if allowed now)"""
+        now = time.monotonic()
+        with self._lock:
+            missing = max((1 - self._tokens(key, now) for key in keys), default=0)
+        return 0 if missing <= 0 else int(math.ceil(missing * self.refill_seconds))
+
+    def consume(self, keys):
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                self._buckets[key] = (max(self._tokens(key, now) - 1, 0), now)
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+
+# Failed logins are limited per (IP, email), so guessing at one account from one place
+# is slow but nobody else can lock its owner out, and more loosely per IP to slow
+# credential stuffing across many accounts.
+login_failures = TokenBucketLimiter(
+    burst=int(os.environ.get('LOGIN_FAILURE_BURST', 5)),
+    refill_seconds=float(os.environ.get('LOGIN_FAILURE_REFILL_SECONDS', 60))
+)
+login_ip_failures = TokenBucketLimiter(
+    burst=int(os.environ.get('LOGIN_IP_FAILURE_BURST', 50)),
+    refill_seconds=float(os.environ.get('LOGIN_IP_FAILURE_REFILL_SECONDS', 6))
+)
+
 # User Model
 class User(UserMixin, db.Model):
+    # Never reuse ids on SQLite: cached responses are keyed by user id
+    __table_args__ = {'sqlite_autoincrement': True}
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(200), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    flights = db.relationship('Flight', backref='user', lazy=True, cascade='all, delete-orphan')
+    is_seed = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+    # The database deletes a user's flights (ON DELETE CASCADE); don't load them first
+    flights = db.relationship('Flight', backref='user', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
 
 # Flight Model
 class Flight(db.Model):
+    # Never reuse ids on SQLite: sync clients get tombstones by flight id
+    __table_args__ = {'sqlite_autoincrement': True}
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
     flight_number = db.Column(db.String(20))
     aircraft = db.Column(db.String(100))
     cabin_class = db.Column(db.String(50))
@@ -90,39 +441,170 @@ class Flight(db.Model):
     departure_time = db.Column(db.DateTime)
     arrival_time = db.Column(db.DateTime)
     flight_date = db.Column(db.Date)
-    duration = db.Column(db.String(20))
+    duration = db.Column(db.String(20))  # Display string, e.g. "7h 30m"
+    duration_minutes = db.Column(db.Integer)  # Numeric duration used for aggregation
     notes = db.Column(db.Text)
     is_seed = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    change_seq = db.Column(db.Integer, nullable=False, default=0)  # See lock_user_stats
+
+# Indexes for the per-user flight queries (see migrations/0003_flight_indexes.sql).
+# PostgreSQL gets flight_date DESC NULLS LAST there; SQLite's DESC already sorts NULLs last.
+db.Index('ix_flight_user_date', Flight.user_id, Flight.flight_date.desc(), Flight.id.desc())
+db.Index('ix_flight_user_departure', Flight.user_id, Flight.departure_code, Flight.flight_date.desc(), Flight.id.desc())
+db.Index('ix_flight_user_arrival', Flight.user_id, Flight.arrival_code, Flight.flight_date.desc(), Flight.id.desc())
+db.Index('ix_flight_user_seed', Flight.user_id,
+         postgresql_where=Flight.is_seed.is_(True), sqlite_where=Flight.is_seed == True)
+db.Index('ix_flight_user_change', Flight.user_id, Flight.change_seq, Flight.id)
+
+# A deleted flight, kept so sync clients holding a copy learn to drop it
+class FlightTombstone(db.Model):
+    __tablename__ = 'flight_tombstone'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), primary_key=True)
+    change_seq = db.Column(db.Integer, primary_key=True)
+    flight_id = db.Column(db.Integer, primary_key=True)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+# Per-user statistics rollup, maintained in the same transaction as flight writes
+class UserStats(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), primary_key=True)
+    total_flights = db.Column(db.Integer, nullable=False, default=0)
+    total_minutes = db.Column(db.Integer, nullable=False, default=0)
+    total_miles = db.Column(db.Integer, nullable=False, default=0)
+    class_counts = db.Column(db.JSON, nullable=False, default=dict)        # {cabin_class: count}
+    destination_counts = db.Column(db.JSON, nullable=False, default=dict)  # {city: {airport_code: count}}
+    country_counts = db.Column(db.JSON, nullable=False, default=dict)      # {country: count}
+    monthly_counts = db.Column(db.JSON, nullable=False, default=dict)      # {'YYYY-MM': count}
+    data_version = db.Column(db.Integer, nullable=False, default=0)       # Bumped on every flight change
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+# Timeseries totals for one closed week, month or year of a user's flights
+# (see /api/stats/timeseries). The current period is always computed live.
+class StatsBucket(db.Model):
+    __tablename__ = 'stats_bucket'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), primary_key=True)
+    granularity = db.Column(db.String(5), primary_key=True)  # 'week', 'month' or 'year'
+    period_start = db.Column(db.Date, primary_key=True)
+    flights = db.Column(db.Integer, nullable=False, default=0)
+    minutes = db.Column(db.Integer, nullable=False, default=0)
+    miles = db.Column(db.Integer, nullable=False, default=0)
+    routes = db.Column(db.Integer, nullable=False, default=0)   # Distinct directed routes
+
+# Background job, run by `flask worker` (see Background jobs below)
+class Job(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    kind = db.Column(db.String(50), nullable=False)                       # Key in JOB_HANDLERS
+    status = db.Column(db.String(20), nullable=False, default='queued')   # queued, running, succeeded, failed
+    payload = db.Column(db.JSON, nullable=False, default=dict)
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    progress = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    idempotency_key = db.Column(db.String(100))
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # Not before; pushed back on retry
+    locked_at = db.Column(db.DateTime)
+    locked_by = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
 
     def to_dict(self):
         return {
             'id': self.id,
-            'flight_number': self.flight_number,
-            'aircraft': self.aircraft,
-            'cabin_class': self.cabin_class,
-            'departure_code': self.departure_code,
-            'departure_city': self.departure_city,
-            'arrival_code': self.arrival_code,
-            'arrival_city': self.arrival_city,
-            'departure_time': self.departure_time.isoformat() if self.departure_time else None,
-            'arrival_time': self.arrival_time.isoformat() if self.arrival_time else None,
-            'flight_date': self.flight_date.isoformat() if self.flight_date else None,
-            'duration': self.duration,
-            'notes': self.notes,
-            'is_seed': self.is_seed,
-            'created_at': self.created_at.isoformat()
+            'kind': self.kind,
+            'status': self.status,
+            'progress': self.progress,
+            'total': self.total,
+            'result': self.result,
+            'error': self.error,
+            'attempts': self.attempts,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
         }
 
+db.Index('ix_job_queue', Job.status, Job.run_at)
+db.Index('ix_job_user_key', Job.user_id, Job.idempotency_key, unique=True)
+
+# Stored leaderboard sketch (see Global leaderboards below)
+class GlobalSketch(db.Model):
+    __tablename__ = 'global_sketch'
+    name = db.Column(db.String(50), primary_key=True)
+    data = db.Column(db.LargeBinary, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+# How long a process trusts that a signed-in account still exists before checking again.
+# Deleting an account takes effect at once in the process that deleted it, and in the
+# others within this many seconds (until then their writes are refused by AccountGone).
+IDENTITY_CHECK_SECONDS = float(os.environ.get('IDENTITY_CHECK_SECONDS', 30))
+IDENTITY_CHECK_MAX_USERS = 10000
+
+class AccountGone(Exception):
+    """Raised when the signed-in user's account no longer exists (deleted from another session)"""
+
+class SessionUser(UserMixin):
+    """The logged-in identity as stored in the signed session, loaded without a query"""
+
+    def __init__(self, id, email):
+        self.id = id
+        self.email = email
+
+# user id -> time.monotonic() when the account was last seen to exist
+_account_checks = {}
+_account_checks_lock = threading.Lock()
+
+def mark_account_checked(user_id):
+    with _account_checks_lock:
+        if len(_account_checks) >= IDENTITY_CHECK_MAX_USERS:
+            _account_checks.clear()
+        _account_checks[user_id] = time.monotonic()
+
+def account_exists(user_id):
+    """True if the account still exists; looked up at most every IDENTITY_CHECK_SECONDS per process"""
+    checked_at = _account_checks.get(user_id)
+    if checked_at is not None and time.monotonic() - checked_at < IDENTITY_CHECK_SECONDS:
+        return True
+    if db.session.query(User.id).filter_by(id=user_id).first() is None:
+        forget_account_check(user_id)
+        return False
+    mark_account_checked(user_id)
+    return True
+
+def forget_account_check(user_id):
+    with _account_checks_lock:
+        _account_checks.pop(user_id, None)
+
+def remember_identity(user):
+    """Keep the minimal identity in the session so later requests skip the user lookup"""
+    session['_identity'] = {'id': user.id, 'email': user.email}
+    mark_account_checked(user.id)
+
+def forget_identity():
+    session.pop('_identity', None)
+
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    identity = session.get('_identity')
+    if identity and str(identity.get('id')) == str(user_id):
+        if not account_exists(identity['id']):
+            # Deleted from another session
+            forget_identity()
+            return None
+        return SessionUser(identity['id'], identity['email'])
+    
+    # Sessions from before this change or restored from the remember cookie
+    user = db.session.get(User, int(user_id))
+    if user:
+        remember_identity(user)
+    return user
 
-# Helper function to calculate flight duration
-def calculate_flight_duration(departure_time, arrival_time):
+# Helper functions to calculate flight duration
+def calculate_flight_minutes(departure_time, arrival_time):
     """
-    Calculate flight duration between departure and arrival times.
-    Returns duration as a formatted string like "2h 30m" or None if times are invalid.
+    Calculate flight duration in whole minutes between departure and arrival times.
+    Returns None if times are invalid.
     """
     if not departure_time or not arrival_time:
         return None
@@ -136,64 +618,267 @@ def calculate_flight_duration(departure_time, arrival_time):
             # Add 24 hours if arrival is next day
             duration_delta += timedelta(days=1)
         
-        # Convert to hours and minutes
-        total_minutes = int(duration_delta.total_seconds() / 60)
-        hours = total_minutes // 60
-        minutes = total_minutes % 60
-        
-        # Format the duration string
-        if hours > 0 and minutes > 0:
-            return f"{hours}h {minutes}m"
-        elif hours > 0:
-            return f"{hours}h"
-        elif minutes > 0:
-            return f"{minutes}m"
-        else:
-            return "0m"
+        return int(duration_delta.total_seconds() / 60)
             
     except Exception as e:
         return None
 
-# Initialize database
-with app.app_context():
-    db.create_all()
+def format_duration(total_minutes):
+    """Format minutes as a display string like "2h 30m". Returns None for None."""
+    if total_minutes is None:
+        return None
+    
+    hours = total_minutes // 60
+    minutes = total_minutes % 60
+    
+    if hours > 0 and minutes > 0:
+        return f"{hours}h {minutes}m"
+    elif hours > 0:
+        return f"{hours}h"
+    elif minutes > 0:
+        return f"{minutes}m"
+    else:
+        return "0m"
+
+def calculate_flight_duration(departure_time, arrival_time):
+    """
+    Calculate flight duration between departure and arrival times.
+    Returns duration as a formatted string like "2h 30m" or None if times are invalid.
+    """
+    return format_duration(calculate_flight_minutes(departure_time, arrival_time))
+
+# Response caching
+# Per-user responses are cached by (user, data_version, path). Every flight write
+# bumps UserStats.data_version, so stale entries are never served and simply age out.
+class LRUCache:
+    """A small thread-safe in-process LRU cache of byte strings, bounded by entries and total size"""
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def set(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._entries[key] = value
+            self.size += len(value)
+            while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+class LocalCacheBackend:
+    """
+    In-process stand-in for a shared cache backend (same get/set-with-TTL interface
+    as RedisCacheBackend). Used for local runs and tests.
+    """
+
+    def __init__(self, ttl=3600):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+
+class RedisCacheBackend:
+    """Shared cache backend on Redis (requires the optional redis package)"""
+
+    def __init__(self, url, ttl=3600):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('RESPONSE_CACHE_BACKEND points at Redis but the redis package is not installed')
+        self.ttl = ttl
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        return self._client.get(f'soarrr:response:{key}')
+
+    def set(self, key, value):
+        self._client.set(f'soarrr:response:{key}', value, ex=self.ttl)
+
+class ResponseCache:
+    """
+    Two-tier cache of serialized response bodies: bounded local LRU, then an optional
+    shared backend. Bodies over max_body_bytes (e.g. a large account's unpaginated
+    flight list) are not cached in either tier.
+    """
+
+    def __init__(self, max_entries=1024, shared=None, max_bytes=64 * 1024 * 1024, max_body_bytes=1024 * 1024):
+        self.local = LRUCache(max_entries, max_bytes)
+        self.shared = shared
+        self.max_body_bytes = max_body_bytes
+
+    def get(self, key):
+        body = self.local.get(key)
+        if body is None and self.shared is not None:
+            body = self.shared.get(key)
+            if body is not None:
+                self.local.set(key, body)
+        return body
+
+    def set(self, key, body):
+        if len(body) > self.max_body_bytes:
+            return
+        self.local.set(key, body)
+        if self.shared is not None:
+            self.shared.set(key, body)
+
+def make_shared_cache_backend(spec, ttl):
+    """Build the shared backend from RESPONSE_CACHE_BACKEND ('', 'local' or a redis:// URL)"""
+    if not spec:
+        return None
+    if spec == 'local':
+        return LocalCacheBackend(ttl)
+    if spec.startswith(('redis://', 'rediss://')):
+        return RedisCacheBackend(spec, ttl)
+    raise RuntimeError(f'Unknown RESPONSE_CACHE_BACKEND: {spec}')
+
+response_cache = ResponseCache(
+    max_entries=int(os.environ.get('RESPONSE_CACHE_SIZE', 2048)),
+    max_bytes=int(os.environ.get('RESPONSE_CACHE_BYTES', 64 * 1024 * 1024)),
+    max_body_bytes=int(os.environ.get('RESPONSE_CACHE_MAX_BODY_BYTES', 1024 * 1024)),
+    shared=make_shared_cache_backend(os.environ.get('RESPONSE_CACHE_BACKEND', ''),
+                                     int(os.environ.get('RESPONSE_CACHE_TTL', 3600)))
+)
+
+def versioned_response(vary=None):
+    """
+    Cache a per-user JSON GET view under the user's data version and answer
+    If-None-Match with 304 using a strong ETag derived from it. Only the user's
+    stats row is read on a hit. vary() may return extra key material for views
+    that also depend on something other than the user's flights (e.g. the date).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            version = get_data_version(current_user.id)
+            key = f'{current_user.id}:{version}:{request.full_path}'
+            if vary is not None:
+                key += f':{vary()}'
+            etag = hashlib.sha256(key.encode()).hexdigest()[:32]
+
+            if request.if_none_match.contains(etag):
+                response = app.response_class(status=304)
+            else:
+                body = response_cache.get(key)
+                if body is None:
+                    response = app.make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                    body = response.get_data()
+                    response_cache.set(key, body)
+                response = app.response_class(body, mimetype='application/json')
+
+            response.set_etag(etag)
+            # Browsers may keep the body but must revalidate it on every use
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
+
+# Static assets
+# Built by `python assets.py` into dist/: fingerprinted JS/CSS, pages pointing at them,
+# and precompressed variants. Without a build, static/ is served as-is.
+PAGE_MAX_AGE = int(os.environ.get('PAGE_MAX_AGE', 60))  # Seconds browsers may reuse a page before revalidating
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+asset_manifest = AssetManifest.load()
+
+def send_asset(name):
+    """
+    Serve a static file, preferring the built copy: the best precompressed
+    variant for the client's Accept-Encoding, with an ETag per variant.
+    Fingerprinted files are cacheable forever; everything else briefly.
+    """
+    entry = asset_manifest.get(name) if asset_manifest else None
+    if entry is None:
+        response = send_from_directory('static', name, max_age=PAGE_MAX_AGE)
+        response.headers['Cache-Control'] = f'private, max-age={PAGE_MAX_AGE}'
+        return response
+
+    encoding, suffix = select_encoding(entry, request.accept_encodings)
+    path = os.path.join(asset_manifest.dist_dir, entry['path'])
+    # download_name keeps the .gz/.br suffix out of Content-Disposition
+    response = send_file(path + suffix, mimetype=mimetypes.guess_type(entry['path'])[0],
+                         download_name=os.path.basename(entry['path']),
+                         etag=f"{entry['etag']}-{encoding or 'identity'}", conditional=True)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if entry['encodings']:
+        response.vary.add('Accept-Encoding')
+    if entry['immutable'] and name == entry['path']:
+        response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    else:
+        response.headers['Cache-Control'] = f'private, max-age={PAGE_MAX_AGE}'
+    return response
 
 # Routes for serving HTML pages
 @app.route('/')
 def index():
     if current_user.is_authenticated:
-        return send_from_directory('static', 'index.html')
+        return send_asset('index.html')
     return redirect(url_for('login_page'))
 
 @app.route('/login')
 def login_page():
-    return send_from_directory('static', 'login.html')
+    return send_asset('login.html')
 
 @app.route('/signup')
 def signup_page():
-    return send_from_directory('static', 'signup.html')
+    return send_asset('signup.html')
 
 @app.route('/add-flight')
 @login_required
 def add_flight_page():
-    return send_from_directory('static', 'add-flight.html')
+    return send_asset('add-flight.html')
 
 @app.route('/stats')
 @login_required
 def stats_page():
-    return send_from_directory('static', 'stats.html')
+    return send_asset('stats.html')
 
 @app.route('/map')
 @login_required
 def map_page():
-    return send_from_directory('static', 'map.html')
+    return send_asset('map.html')
 
 # Static files
 @app.route('/static/<path:filename>')
 def static_files(filename):
-    return send_from_directory('static', filename)
+    return send_asset(filename)
 
 # Authentication API
+def busy_response():
+    response = jsonify({'error': 'The server is busy. Please try again in a moment.'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 @app.route('/api/auth/signup', methods=['POST'])
 def signup():
     data = request.get_json()
@@ -216,11 +901,15 @@ def signup():
         return jsonify({'error': 'Email already registered'}), 400
     
     user = User(email=email)
-    user.set_password(data['password'])
+    try:
+        user.set_password(data['password'])
+    except PasswordHashBusy:
+        return busy_response()
     db.session.add(user)
     db.session.commit()
     
     login_user(user)
+    remember_identity(user)
     return jsonify({'success': True, 'message': 'User created successfully'})
 
 @app.route('/api/auth/login', methods=['POST'])
@@ -236,20 +925,74 @@ def login():
     if not validate_email(email):
         return jsonify({'error': 'Invalid email format'}), 400
     
+    # Throttle repeated failures per (IP, email) and per IP before doing any hashing
+    account_key = f'{request.remote_addr}:{email}'
+    ip_key = f'ip:{request.remote_addr}'
+    retry_after = max(login_failures.retry_after([account_key]), login_ip_failures.retry_after([ip_key]))
+    if retry_after:
+        response = jsonify({'error': 'Too many failed login attempts. Please try again later.'})
+        response.headers['Retry-After'] = str(retry_after)
+        return response, 429
+    
     user = User.query.filter_by(email=email).first()
     
-    if user and user.check_password(data['password']):
+    try:
+        valid = user is not None and user.check_password(data['password'])
+        if valid and needs_rehash(user.password_hash):
+            # Cost parameters changed since this hash was made: upgrade it now
+            user.set_password(data['password'])
+            db.session.commit()
+    except PasswordHashBusy:
+        return busy_response()
+    
+    if valid:
         login_user(user)
+        remember_identity(user)
         return jsonify({'success': True, 'message': 'Logged in successfully'})
     
+    login_failures.consume([account_key])
+    login_ip_failures.consume([ip_key])
     return jsonify({'error': 'Invalid email or password'}), 401
 
 @app.route('/api/auth/logout', methods=['POST'])
 @login_required
 def logout():
     logout_user()
+    forget_identity()
     return jsonify({'success': True, 'message': 'Logged out successfully'})
 
+@app.route('/api/auth/account', methods=['DELETE'])
+@login_required
+def delete_account():
+    """Delete the current user's account. Flights and stats go with it via ON DELETE CASCADE."""
+    data = request.get_json(silent=True)
+    if not data or not data.get('password'):
+        return jsonify({'error': 'Password required'}), 400
+
+    user = db.session.get(User, current_user.id)
+    try:
+        valid = user is not None and user.check_password(data['password'])
+    except PasswordHashBusy:
+        return busy_response()
+    if not valid:
+        return jsonify({'error': 'Invalid password'}), 401
+
+    forget_leaderboard_flights(Flight.query.filter(Flight.user_id == user.id))
+    db.session.execute(db.delete(User).where(User.id == user.id))
+    db.session.commit()
+    forget_account_check(user.id)
+    logout_user()
+    forget_identity()
+    return jsonify({'success': True, 'message': 'Account deleted'})
+
+@app.errorhandler(AccountGone)
+def account_gone(e):
+    """A session outlived its account: end it instead of writing rows for a missing user"""
+    db.session.rollback()
+    logout_user()
+    forget_identity()
+    return jsonify({'error': 'This account no longer exists'}), 401
+
 @app.route('/api/auth/status')
 def auth_status():
     if current_user.is_authenticated:
@@ -259,12 +1002,401 @@ def auth_status():
         })
     return jsonify({'authenticated': False})
 
+# Flight input parsing
+VALID_CABIN_CLASSES = ['Economy', 'Premium Economy', 'Business', 'First']
+
+def parse_flight_time(time_str, flight_date):
+    """Parse an ISO datetime or an HH:MM time on flight_date"""
+    # Handle both ISO datetime format and HH:MM time format
+    if 'T' in time_str:
+        # ISO datetime format (e.g., '1999-02-02T11:03:00')
+        return datetime.fromisoformat(time_str.replace('Z', '+00:00'))
+    # HH:MM time format
+    return datetime.combine(flight_date, datetime.strptime(time_str, '%H:%M').time())
+
+# Fields accepted by flight_values_from_data; each must be a string when present
+FLIGHT_INPUT_FIELDS = ('flight_number', 'aircraft', 'cabin_class', 'departure_code', 'departure_city',
+                       'arrival_code', 'arrival_city', 'flight_date', 'departure_time', 'arrival_time', 'notes')
+
+def flight_values_from_data(data):
+    """
+    Validate and sanitize one flight as accepted by POST /api/flights.
+    Returns the Flight column values; raises ValueError with a user-facing
+    message when the input is invalid.
+    """
+    for field in FLIGHT_INPUT_FIELDS:
+        if data.get(field) is not None and not isinstance(data[field], str):
+            raise ValueError(f'{field} must be a string')
+
+    # Validate and sanitize airport codes
+    departure_code = (data.get('departure_code') or '').upper().strip()
+    arrival_code = (data.get('arrival_code') or '').upper().strip()
+    
+    if departure_code and not validate_airport_code(departure_code):
+        raise ValueError('Invalid departure airport code format')
+    if arrival_code and not validate_airport_code(arrival_code):
+        raise ValueError('Invalid arrival airport code format')
+    
+    # Validate cabin class
+    cabin_class = data.get('cabin_class') or None
+    if cabin_class and cabin_class not in VALID_CABIN_CLASSES:
+        raise ValueError('Invalid cabin class')
+    
+    # Parse flight date if provided, defaulting to today
+    if data.get('flight_date'):
+        try:
+            flight_date = datetime.fromisoformat(data['flight_date']).date()
+        except ValueError:
+            raise ValueError('flight_date must be a date in YYYY-MM-DD format') from None
+    else:
+        flight_date = datetime.now().date()
+    
+    # Parse times and calculate duration
+    times = {}
+    for field in ('departure_time', 'arrival_time'):
+        try:
+            times[field] = parse_flight_time(data[field], flight_date) if data.get(field) else None
+        except ValueError:
+            raise ValueError(f'{field} must be HH:MM or an ISO datetime') from None
+    departure_time, arrival_time = times['departure_time'], times['arrival_time']
+    
+    # Auto-calculate duration if both times are provided
+    duration_minutes = None
+    if departure_time and arrival_time:
+        duration_minutes = calculate_flight_minutes(departure_time, arrival_time)
+    
+    return {
+        'flight_number': sanitize_input(data.get('flight_number')),
+        'aircraft': sanitize_input(data.get('aircraft')),
+        'cabin_class': cabin_class,
+        'departure_code': departure_code if departure_code else None,
+        'departure_city': sanitize_input(data.get('departure_city')),
+        'arrival_code': arrival_code if arrival_code else None,
+        'arrival_city': sanitize_input(data.get('arrival_city')),
+        'flight_date': flight_date,
+        'departure_time': departure_time,
+        'arrival_time': arrival_time,
+        'duration_minutes': duration_minutes,
+        'duration': format_duration(duration_minutes),
+        'notes': sanitize_input(data.get('notes'))
+    }
+
+# Flight list helpers
+# Public flight field names in API responses (see flight_serializer), in order
+FLIGHT_FIELDS = ['id', 'flight_number', 'aircraft', 'cabin_class', 'departure_code', 'departure_city',
+                 'arrival_code', 'arrival_city', 'departure_time', 'arrival_time', 'flight_date',
+                 'duration', 'notes', 'is_seed', 'created_at', 'updated_at']
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def parse_fields(value):
+    """Parse a comma-separated fields= parameter. Returns (fields, error)."""
+    if not value:
+        return FLIGHT_FIELDS, None
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in FLIGHT_FIELDS]
+    if unknown or not fields:
+        return None, f"Unknown fields: {', '.join(unknown)}" if unknown else 'No fields requested'
+    return fields, None
+
+FLIGHT_TEMPORAL_FIELDS = ('departure_time', 'arrival_time', 'flight_date', 'created_at', 'updated_at')
+# Free-text fields, stored HTML-escaped by sanitize_input
+FLIGHT_ESCAPED_FIELDS = ('flight_number', 'aircraft', 'departure_city', 'arrival_city', 'notes')
+
+@lru_cache(maxsize=256)
+def flight_serializer(fields=tuple(FLIGHT_FIELDS)):
+    """Shared serializer for a tuple of FLIGHT_FIELDS names"""
+    return RowSerializer(fields, FLIGHT_TEMPORAL_FIELDS)
+
+def json_response(payload, status=200):
+    """Like jsonify, but encoded with the fast serialization layer (see serialization.py)"""
+    return app.response_class(json_dumps(payload), status=status, mimetype='application/json')
+
+def encode_cursor(flight_date, flight_id):
+    """Build an opaque pagination cursor for the (flight_date, id) position"""
+    payload = json.dumps([flight_date.isoformat() if flight_date else None, flight_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Decode a pagination cursor. Raises ValueError if it is malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        flight_date, flight_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return (date.fromisoformat(flight_date) if flight_date else None), int(flight_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+def after_cursor(flight_date, flight_id):
+    """Keyset condition for rows after a cursor in (flight_date desc nulls last, id desc) order"""
+    if flight_date is None:
+        return db.and_(Flight.flight_date.is_(None), Flight.id < flight_id)
+    return db.or_(
+        Flight.flight_date < flight_date,
+        db.and_(Flight.flight_date == flight_date, Flight.id < flight_id),
+        Flight.flight_date.is_(None)
+    )
+
+# Flight search
+# Free-text q= matches words in the flight number, cities, aircraft and notes by prefix.
+# PostgreSQL uses a generated tsvector column with a GIN index (migration 0008); SQLite
+# uses an FTS5 table kept in sync by triggers, created by db-upgrade. Anything else
+# falls back to LIKE over the user's rows.
+SEARCH_COLUMNS = ('flight_number', 'departure_city', 'arrival_city', 'aircraft', 'notes')
+MAX_SEARCH_TERMS = 8
+
+# Contentless FTS5 table keyed by flight id. 'owner' holds u<user_id> so a match is
+# intersected with the user's rows inside the index.
+SQLITE_SEARCH_COLUMNS = ', '.join(SEARCH_COLUMNS)
+SQLITE_SEARCH_VALUES = ', '.join(f'{{row}}.{column}' for column in SEARCH_COLUMNS)
+SQLITE_SEARCH_DDL = [
+    f"CREATE VIRTUAL TABLE flight_search USING fts5(owner, {SQLITE_SEARCH_COLUMNS}, content='')",
+    f"""CREATE TRIGGER flight_search_insert AFTER INSERT ON flight BEGIN
+        INSERT INTO flight_search (rowid, owner, {SQLITE_SEARCH_COLUMNS})
+        VALUES (new.id, 'u' || new.user_id, {SQLITE_SEARCH_VALUES.format(row='new')});
+    END""",
+    f"""CREATE TRIGGER flight_search_delete AFTER DELETE ON flight BEGIN
+        INSERT INTO flight_search (flight_search, rowid, owner, {SQLITE_SEARCH_COLUMNS})
+        VALUES ('delete', old.id, 'u' || old.user_id, {SQLITE_SEARCH_VALUES.format(row='old')});
+    END""",
+    f"""CREATE TRIGGER flight_search_update AFTER UPDATE ON flight BEGIN
+        INSERT INTO flight_search (flight_search, rowid, owner, {SQLITE_SEARCH_COLUMNS})
+        VALUES ('delete', old.id, 'u' || old.user_id, {SQLITE_SEARCH_VALUES.format(row='old')});
+        INSERT INTO flight_search (rowid, owner, {SQLITE_SEARCH_COLUMNS})
+        VALUES (new.id, 'u' || new.user_id, {SQLITE_SEARCH_VALUES.format(row='new')});
+    END""",
+    f"""INSERT INTO flight_search (rowid, owner, {SQLITE_SEARCH_COLUMNS})
+        SELECT id, 'u' || user_id, {SQLITE_SEARCH_COLUMNS} FROM flight""",
+]
+
+def ensure_sqlite_search_index(conn):
+    """
+    Create and fill the FTS5 search table and its triggers if they are missing.
+    Returns False if this SQLite build has no FTS5 (search then uses LIKE).
+    """
+    if conn.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE name = 'flight_search'").first():
+        return True
+    try:
+        conn.exec_driver_sql('CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)')
+        conn.exec_driver_sql('DROP TABLE temp.fts5_probe')
+    except OperationalError:
+        return False
+    for statement in SQLITE_SEARCH_DDL:
+        conn.exec_driver_sql(statement)
+    return True
+
+_search_backend = None
+
+def search_backend():
+    """'postgresql', 'fts5' or 'like', decided once per process"""
+    global _search_backend
+    if _search_backend is None:
+        dialect = db.engine.dialect.name
+        if dialect == 'postgresql':
+            _search_backend = 'postgresql'
+        elif dialect == 'sqlite' and db.session.execute(
+                db.text("SELECT 1 FROM sqlite_master WHERE name = 'flight_search'")).first():
+            _search_backend = 'fts5'
+        else:
+            _search_backend = 'like'
+    return _search_backend
+
+def escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def search_condition(user_id, terms):
+    """Condition matching flights that contain every term as a word prefix"""
+    backend = search_backend()
+    if backend == 'postgresql':
+        query = ' & '.join(f'{term}:*' for term in terms)
+        return db.text("flight.search_vector @@ to_tsquery('simple', :search_query)").bindparams(search_query=query)
+    if backend == 'fts5':
+        match = (f'owner : u{int(user_id)} AND {{{" ".join(SEARCH_COLUMNS)}}} : ('
+                 + ' AND '.join(f'"{term}"*' for term in terms) + ')')
+        matches = (db.select(db.column('rowid')).select_from(db.table('flight_search'))
+                   .where(db.text('flight_search MATCH :search_match').bindparams(search_match=match)))
+        return Flight.id.in_(matches)
+    return db.and_(*[
+        db.or_(*[getattr(Flight, column).ilike(f'%{escape_like(term)}%', escape='\\') for column in SEARCH_COLUMNS])
+        for term in terms
+    ])
+
+def flight_filters(user_id, args):
+    """
+    Filter conditions from the GET /api/flights query string: from/to (flight date,
+    inclusive), departure/arrival (airport code), cabin_class, aircraft (substring)
+    and q (free text). Raises ValueError with a user-facing message.
+    """
+    conditions = []
+    for param, compare in (('from', lambda value: Flight.flight_date >= value),
+                           ('to', lambda value: Flight.flight_date <= value)):
+        if args.get(param):
+            try:
+                conditions.append(compare(date.fromisoformat(args[param])))
+            except ValueError:
+                raise ValueError(f'{param} must be a date (YYYY-MM-DD)')
+
+    for param, column in (('departure', Flight.departure_code), ('arrival', Flight.arrival_code)):
+        if args.get(param):
+            code = args[param].strip().upper()
+            if not validate_airport_code(code):
+                raise ValueError(f'Invalid {param} airport code format')
+            conditions.append(column == code)
+
+    if args.get('cabin_class'):
+        if args['cabin_class'] not in VALID_CABIN_CLASSES:
+            raise ValueError('Invalid cabin class')
+        conditions.append(Flight.cabin_class == args['cabin_class'])
+
+    if args.get('aircraft', '').strip():
+        conditions.append(Flight.aircraft.ilike(f"%{escape_like(args['aircraft'].strip())}%", escape='\\'))
+
+    terms = re.findall(r'[^\W_]+', args.get('q', '').lower())[:MAX_SEARCH_TERMS]
+    if terms:
+        conditions.append(search_condition(user_id, terms))
+    return conditions
+
 # Flight Management API
 @app.route('/api/flights', methods=['GET'])
 @login_required
+@versioned_response()
 def get_flights():
-    flights = Flight.query.filter_by(user_id=current_user.id).order_by(Flight.flight_date.desc()).all()
-    return jsonify([flight.to_dict() for flight in flights])
+    """
+    List the user's flights, newest first.
+    With ?limit= or ?cursor= the response is a page: {'flights', 'next_cursor', 'has_seed_data'}.
+    Without them the full list is returned, as before. ?fields= selects the returned fields;
+    the filters in flight_filters narrow either form.
+    """
+    fields, error = parse_fields(request.args.get('fields'))
+    if error:
+        return jsonify({'error': error}), 400
+    try:
+        filters = flight_filters(current_user.id, request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Always select the keyset columns so a cursor can be built from the last row
+    selected = list(dict.fromkeys(fields + ['flight_date', 'id']))
+    query = (db.session.query(*[getattr(Flight, field) for field in selected])
+             .filter(Flight.user_id == current_user.id, *filters)
+             .order_by(Flight.flight_date.desc().nulls_last(), Flight.id.desc()))
+
+    paginate = 'limit' in request.args or 'cursor' in request.args
+    if not paginate:
+        return json_response(flight_serializer(tuple(fields)).rows(query.all()))
+
+    try:
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        return jsonify({'error': f'limit must be between 1 and {MAX_PAGE_SIZE}'}), 400
+
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            query = query.filter(after_cursor(*decode_cursor(cursor)))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+    # Fetch one extra row to know whether another page exists
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].flight_date, rows[-1].id)
+
+    page = {
+        'flights': flight_serializer(tuple(fields)).rows(rows),
+        'next_cursor': next_cursor
+    }
+    if not cursor:
+        page['has_seed_data'] = db.session.query(
+            Flight.query.filter_by(user_id=current_user.id, is_seed=True).exists()).scalar()
+    return json_response(page)
+
+# Delta sync
+# Clients keep the token from their last sync and fetch only what changed after it:
+# flights added since (by change number) and ids of flights deleted since.
+SYNC_PAGE_SIZE = 500
+MAX_SYNC_PAGE_SIZE = 2000
+SYNC_FLIGHT_FIELDS = (*FLIGHT_FIELDS, 'change_seq')
+
+def encode_change_token(change_seq, flight_id):
+    """Opaque sync token for the (change_seq, flight id) position"""
+    return base64.urlsafe_b64encode(json.dumps([change_seq, flight_id]).encode()).decode().rstrip('=')
+
+def decode_change_token(token):
+    """Decode a sync token. Raises ValueError if it is malformed."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        change_seq, flight_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return int(change_seq), int(flight_id)
+    except Exception:
+        raise ValueError('Invalid sync token')
+
+def after_change(columns, position):
+    """Keyset condition for rows after a (change_seq, id) position"""
+    change_seq, row_id = columns
+    return db.or_(change_seq > position[0], db.and_(change_seq == position[0], row_id > position[1]))
+
+@app.route('/api/flights/changes', methods=['GET'])
+@login_required
+@versioned_response()
+def get_flight_changes():
+    """
+    Flights added and deleted since a sync token, oldest change first. Without since=
+    every flight is returned. Every flight and tombstone entry carries its change_seq,
+    so a client merging a page applies them in that order. Each page is a range scan of the (user_id, change_seq)
+    indexes on flight and flight_tombstone, read in one statement so both come from
+    the same snapshot.
+    """
+    try:
+        limit = int(request.args.get('limit', SYNC_PAGE_SIZE))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    if limit < 1 or limit > MAX_SYNC_PAGE_SIZE:
+        return jsonify({'error': f'limit must be between 1 and {MAX_SYNC_PAGE_SIZE}'}), 400
+    try:
+        position = decode_change_token(request.args['since']) if request.args.get('since') else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    added = (db.select(Flight.change_seq.label('change_seq'), Flight.id.label('flight_id'),
+                       db.literal(False).label('deleted'))
+             .where(Flight.user_id == current_user.id))
+    deleted = (db.select(FlightTombstone.change_seq.label('change_seq'), FlightTombstone.flight_id.label('flight_id'),
+                         db.literal(True).label('deleted'))
+               .where(FlightTombstone.user_id == current_user.id))
+    if position is not None:
+        added = added.where(after_change((Flight.change_seq, Flight.id), position))
+        deleted = deleted.where(after_change((FlightTombstone.change_seq, FlightTombstone.flight_id), position))
+    # Each side is limited first so it stays an index range scan
+    added = added.order_by(Flight.change_seq, Flight.id).limit(limit + 1).subquery()
+    deleted = deleted.order_by(FlightTombstone.change_seq, FlightTombstone.flight_id).limit(limit + 1).subquery()
+    changes = db.union_all(db.select(added), db.select(deleted)).subquery()
+    rows = db.session.execute(
+        db.select(changes).order_by(changes.c.change_seq, changes.c.flight_id).limit(limit + 1)
+    ).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    added_ids = [row.flight_id for row in rows if not row.deleted]
+    flights = {}
+    if added_ids:
+        flights = {flight.id: flight for flight in Flight.query.filter(Flight.user_id == current_user.id,
+                                                                       Flight.id.in_(added_ids))}
+    if rows:
+        next_token = encode_change_token(rows[-1].change_seq, rows[-1].flight_id)
+    else:
+        next_token = request.args.get('since') or encode_change_token(-1, 0)
+    return json_response({
+        # A flight deleted after this page was read is left out; its tombstone comes next time
+        'flights': flight_serializer(SYNC_FLIGHT_FIELDS).objects(
+            flights[flight_id] for flight_id in added_ids if flight_id in flights),
+        'deleted': [{'id': row.flight_id, 'change_seq': row.change_seq} for row in rows if row.deleted],
+        'next_token': next_token,
+        'has_more': has_more,
+    })
 
 @app.route('/api/flights', methods=['POST'])
 @login_required
@@ -275,219 +1407,630 @@ def create_flight():
         return jsonify({'error': 'No data provided'}), 400
     
     try:
-        # Validate and sanitize airport codes
-        departure_code = data.get('departure_code', '').upper().strip()
-        arrival_code = data.get('arrival_code', '').upper().strip()
-        
-        if departure_code and not validate_airport_code(departure_code):
-            return jsonify({'error': 'Invalid departure airport code format'}), 400
-        if arrival_code and not validate_airport_code(arrival_code):
-            return jsonify({'error': 'Invalid arrival airport code format'}), 400
-        
-        # Validate cabin class
-        valid_classes = ['Economy', 'Premium Economy', 'Business', 'First']
-        cabin_class = data.get('cabin_class')
-        if cabin_class and cabin_class not in valid_classes:
-            return jsonify({'error': 'Invalid cabin class'}), 400
-        
+        values = flight_values_from_data(data)
+        stats = lock_user_stats(current_user.id)
         flight = Flight(
             user_id=current_user.id,
-            flight_number=sanitize_input(data.get('flight_number')),
-            aircraft=sanitize_input(data.get('aircraft')),
-            cabin_class=cabin_class,
-            departure_code=departure_code if departure_code else None,
-            departure_city=sanitize_input(data.get('departure_city')),
-            arrival_code=arrival_code if arrival_code else None,
-            arrival_city=sanitize_input(data.get('arrival_city')),
-            notes=sanitize_input(data.get('notes')),
-            is_seed=False  # Explicitly set to False for manually created flights
+            is_seed=False,  # Explicitly set to False for manually created flights
+            change_seq=stats.data_version,
+            **values
         )
         
-        # Parse flight date if provided
-        flight_date = None
-        if data.get('flight_date'):
-            flight_date = datetime.fromisoformat(data['flight_date']).date()
-            flight.flight_date = flight_date
-        else:
-            # Default to today if no date provided
-            flight_date = datetime.now().date()
-            flight.flight_date = flight_date
-        
-        # Parse times and calculate duration
-        departure_time = None
-        arrival_time = None
-        
-        if data.get('departure_time'):
-            # Handle both ISO datetime format and HH:MM time format
-            time_str = data['departure_time']
-            if 'T' in time_str:
-                # ISO datetime format (e.g., '1999-02-02T11:03:00')
-                departure_time = datetime.fromisoformat(time_str.replace('Z', '+00:00'))
-            else:
-                # HH:MM time format
-                departure_time = datetime.combine(
-                    flight_date,
-                    datetime.strptime(time_str, '%H:%M').time()
-                )
-            flight.departure_time = departure_time
-        
-        if data.get('arrival_time'):
-            # Handle both ISO datetime format and HH:MM time format
-            time_str = data['arrival_time']
-            if 'T' in time_str:
-                # ISO datetime format (e.g., '1999-02-02T11:03:00')
-                arrival_time = datetime.fromisoformat(time_str.replace('Z', '+00:00'))
-            else:
-                # HH:MM time format  
-                arrival_time = datetime.combine(
-                    flight_date,
-                    datetime.strptime(time_str, '%H:%M').time()
-                )
-            flight.arrival_time = arrival_time
-        
-        # Auto-calculate duration if both times are provided
-        if departure_time and arrival_time:
-            calculated_duration = calculate_flight_duration(departure_time, arrival_time)
-            flight.duration = calculated_duration
-        
         db.session.add(flight)
+        update_user_stats(stats, [flight], 1)
         db.session.commit()
         
-        return jsonify(flight.to_dict()), 201
+        return json_response(flight_serializer().object(flight), 201)
         
+    except AccountGone:
+        raise
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
 
-@app.route('/api/flights/<int:flight_id>', methods=['DELETE'])
-@login_required
-def delete_flight(flight_id):
-    flight = Flight.query.filter_by(id=flight_id, user_id=current_user.id).first()
-    
-    if not flight:
-        return jsonify({'error': 'Flight not found'}), 404
-    
-    db.session.delete(flight)
-    db.session.commit()
-    
-    return jsonify({'success': True, 'message': 'Flight deleted successfully'})
+MAX_BATCH_FLIGHTS = 500
 
-@app.route('/api/flights/<int:flight_id>', methods=['GET'])
+@app.route('/api/flights/batch', methods=['POST'])
 @login_required
-def get_flight(flight_id):
-    flight = Flight.query.filter_by(id=flight_id, user_id=current_user.id).first()
-    
-    if not flight:
-        return jsonify({'error': 'Flight not found'}), 404
-    
-    return jsonify(flight.to_dict())
+def create_flights_batch():
+    """
+    Create several flights (e.g. the legs of a trip) from {'flights': [...]} in one
+    transaction. Every flight is validated first; if any is invalid nothing is saved
+    and the errors are listed by position. The rows are written with one multi-row
+    INSERT ... RETURNING and returned in request order.
+    """
+    data = request.get_json(silent=True)
+    items = data.get('flights') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'Expected {"flights": [...]} with at least one flight'}), 400
+    if len(items) > MAX_BATCH_FLIGHTS:
+        return jsonify({'error': f'At most {MAX_BATCH_FLIGHTS} flights per batch'}), 400
 
-# Statistics API
-@app.route('/api/stats', methods=['GET'])
-@login_required
-def get_stats():
-    flights = Flight.query.filter_by(user_id=current_user.id).all()
-    
-    if not flights:
-        return jsonify({
-            'total_flights': 0,
-            'total_hours': 0,
-            'countries_visited': 0,
-            'miles_flown': 0,
-            'flight_classes': {},
-            'top_destinations': [],
-            'monthly_activity': []
-        })
-    
-    # Calculate basic stats
-    total_flights = len(flights)
-    
-    # Parse duration to calculate hours
-    total_minutes = 0
-    for flight in flights:
-        if flight.duration:
-            # Parse duration like "7h 30m" or "1h 15m"
-            try:
-                parts = flight.duration.lower().replace('h', '').replace('m', '').split()
-                hours = int(parts[0]) if len(parts) > 0 else 0
-                minutes = int(parts[1]) if len(parts) > 1 else 0
-                total_minutes += (hours * 60) + minutes
-            except:
-                pass
-    
-    total_hours = total_minutes // 60
-    
-    # Count unique countries (simple approximation)
-    countries = set()
-    for flight in flights:
-        if flight.departure_city:
-            # Extract country (last part after comma)
-            dep_parts = flight.departure_city.split(',')
-            if len(dep_parts) > 1:
-                countries.add(dep_parts[-1].strip())
-        if flight.arrival_city:
-            arr_parts = flight.arrival_city.split(',')
-            if len(arr_parts) > 1:
-                countries.add(arr_parts[-1].strip())
-    
-    countries_visited = len(countries)
-    
-    # Estimate miles (rough calculation)
-    miles_flown = total_hours * 500  # Rough estimate
-    
-    # Flight class distribution
-    class_counts = {}
-    for flight in flights:
-        cabin_class = flight.cabin_class or 'Unknown'
-        class_counts[cabin_class] = class_counts.get(cabin_class, 0) + 1
+    rows = []
+    errors = []
+    created_at = datetime.utcnow()
+    for index, item in enumerate(items):
+        try:
+            if not isinstance(item, dict):
+                raise ValueError('Each flight must be a JSON object')
+            values = flight_values_from_data(item)
+        except Exception as e:
+            errors.append({'index': index, 'error': str(e)})
+            continue
+        values.update(user_id=current_user.id, is_seed=False, created_at=created_at, updated_at=created_at)
+        rows.append(values)
+    if errors:
+        return jsonify({'error': 'Invalid flights; none were saved', 'errors': errors}), 400
+
+    try:
+        stats = lock_user_stats(current_user.id)
+        for values in rows:
+            values['change_seq'] = stats.data_version
+        if db.engine.dialect.name == 'sqlite':
+            # RETURNING order is not guaranteed, but ids are assigned in VALUES order. Asking
+            # SQLAlchemy to sort by parameter order makes SQLite fall back to a row per INSERT.
+            flights = sorted(db.session.scalars(db.insert(Flight).returning(Flight), rows), key=lambda f: f.id)
+        else:
+            statement = db.insert(Flight).returning(Flight, sort_by_parameter_order=True)
+            flights = db.session.scalars(statement, rows).all()
+        update_user_stats(stats, flights, 1)
+        db.session.commit()
+    except AccountGone:
+        raise
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Failed to save flights: {str(e)}'}), 500
+
+    return json_response({'flights': flight_serializer().objects(flights)}, 201)
+
+# Bulk import
+IMPORT_CHUNK_SIZE = 1000
+IMPORT_MAX_ROWS = int(os.environ.get('IMPORT_MAX_ROWS', 100000))
+IMPORT_MAX_ERRORS = 1000  # Errors listed in the response; the rest are only counted
+# ?async=1 uploads are stored on the job until a worker imports them
+ASYNC_IMPORT_MAX_CHARS = int(os.environ.get('ASYNC_IMPORT_MAX_CHARS', 20 * 1024 * 1024))
+
+def import_rows(stream, import_format):
+    """
+    Yield (row, error) pairs from a text stream of CSV (with header) or NDJSON, one
+    row at a time. NDJSON lines that are not JSON objects yield an error instead.
+    """
+    if import_format == 'csv':
+        for row in csv.DictReader(stream):
+            yield {key: value.strip() for key, value in row.items() if key and value and value.strip()}, None
+    else:
+        for line in stream:
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield None, 'Invalid JSON'
+                continue
+            if not isinstance(row, dict):
+                yield None, 'Each line must be a JSON object'
+                continue
+            yield row, None
+
+def insert_flight_chunk(user_id, chunk):
+    """Insert a chunk of flight values with one multi-row INSERT and update the stats rollup"""
+    stats = lock_user_stats(user_id)
+    for values in chunk:
+        values['change_seq'] = stats.data_version
+    db.session.execute(db.insert(Flight), chunk)
+    update_user_stats(stats, [SimpleNamespace(**values) for values in chunk], 1)
+
+def import_flight_rows(user_id, stream, import_format, progress=None, resume=None):
+    """
+    Parse a CSV/NDJSON text stream and insert its valid rows in chunks. Returns
+    {'imported', 'failed', 'errors', 'errors_truncated'}; raises ValueError when the
+    upload itself is unusable (too long, not UTF-8, broken CSV quoting). The caller
+    commits. progress(rows, totals) is called after each chunk with the rows read so
+    far and the totals up to there; a background job commits at that point and, on a
+    retry, passes both back (resume=(rows, totals)) to carry on after those rows.
+    """
+    skip, totals = resume or (0, None)
+    imported = totals['imported'] if totals else 0
+    failed = totals['failed'] if totals else 0
+    errors = list(totals['errors']) if totals else []
+    chunk = []
+    row_number = 0
+    try:
+        for row, error in import_rows(stream, import_format):
+            row_number += 1
+            if row_number > IMPORT_MAX_ROWS:
+                raise ValueError(f'Imports are limited to {IMPORT_MAX_ROWS} rows')
+            if row_number <= skip:
+                continue
+
+            if error is None:
+                try:
+                    values = flight_values_from_data(row)
+                except Exception as e:
+                    error = str(e)
+            if error is not None:
+                failed += 1
+                if len(errors) < IMPORT_MAX_ERRORS:
+                    errors.append({'row': row_number, 'error': error})
+                continue
+
+            values.update(user_id=user_id, is_seed=False, created_at=datetime.utcnow())
+            chunk.append(values)
+            if len(chunk) >= IMPORT_CHUNK_SIZE:
+                insert_flight_chunk(user_id, chunk)
+                imported += len(chunk)
+                chunk = []
+                if progress:
+                    progress(row_number, {'imported': imported, 'failed': failed, 'errors': errors})
+
+        if chunk:
+            insert_flight_chunk(user_id, chunk)
+            imported += len(chunk)
+    except UnicodeDecodeError as e:
+        # Not about any one row: the stream could not be decoded at all past this point
+        raise ValueError('The upload is not valid UTF-8') from e
+    except (ValueError, csv.Error) as e:
+        raise ValueError(f'Row {row_number}: {str(e)}') from e
+
+    return {
+        'imported': imported,
+        'failed': failed,
+        'errors': errors,
+        'errors_truncated': failed > len(errors)
+    }
+
+def check_import_rows(stream, import_format):
+    """Raise the ValueError import_flight_rows would for an unusable upload, without validating or writing rows"""
+    row_number = 0
+    try:
+        for row_number, _ in enumerate(import_rows(stream, import_format), start=1):
+            if row_number > IMPORT_MAX_ROWS:
+                raise ValueError(f'Imports are limited to {IMPORT_MAX_ROWS} rows')
+    except (ValueError, csv.Error) as e:
+        raise ValueError(f'Row {row_number}: {str(e)}') from e
+
+@app.route('/api/flights/import', methods=['POST'])
+@login_required
+def import_flights():
+    """
+    Import flights from a CSV or NDJSON upload, either as a multipart 'file' field or
+    as the raw request body. Columns/keys are the POST /api/flights fields. Rows are
+    parsed as a stream and inserted in chunks; invalid rows are skipped and reported.
+    """
+    upload = request.files.get('file')
+    if upload:
+        raw = upload.stream
+        filename = (upload.filename or '').lower()
+        content_type = upload.mimetype or ''
+    else:
+        raw = request.stream
+        filename = ''
+        content_type = request.mimetype or ''
+
+    import_format = request.args.get('format')
+    if not import_format:
+        if filename.endswith('.csv') or content_type == 'text/csv':
+            import_format = 'csv'
+        elif filename.endswith(('.ndjson', '.jsonl')) or content_type in ('application/x-ndjson', 'application/jsonl'):
+            import_format = 'ndjson'
+    if import_format not in ('csv', 'ndjson'):
+        return jsonify({'error': 'Unknown import format. Use ?format=csv or ?format=ndjson'}), 400
+
+    stream = io.TextIOWrapper(raw if upload else io.BufferedReader(raw), encoding='utf-8-sig', newline='')
+
+    if request.args.get('async') in ('1', 'true'):
+        try:
+            data = stream.read(ASYNC_IMPORT_MAX_CHARS + 1)
+        except ValueError:
+            return jsonify({'error': 'The upload is not valid UTF-8'}), 400
+        if len(data) > ASYNC_IMPORT_MAX_CHARS:
+            return jsonify({'error': f'Background imports are limited to {ASYNC_IMPORT_MAX_CHARS} characters'}), 400
+        job = enqueue_job(current_user.id, 'import', {'format': import_format, 'data': data},
+                          request.headers.get('Idempotency-Key'))
+        return job_accepted(job)
+
+    try:
+        result = import_flight_rows(current_user.id, stream, import_format)
+        db.session.commit()
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except AccountGone:
+        raise
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Failed to import flights: {str(e)}'}), 500
+
+    return jsonify({'success': True, **result}), 201 if result['imported'] else 200
+
+# Export
+EXPORT_BATCH_SIZE = 1000
+
+@app.route('/api/flights/export', methods=['GET'])
+@login_required
+def export_flights():
+    """
+    Stream all of the user's flights as CSV or NDJSON (?format=csv|ndjson).
+    Rows are read through a server-side cursor and written out in batches, so
+    memory stays flat and the first bytes are sent before the query finishes.
+    Text is written unescaped (CSV and NDJSON are not HTML), so both formats
+    are accepted back by /api/flights/import as-is.
+    """
+    export_format = request.args.get('format', 'csv')
+    if export_format not in ('csv', 'ndjson'):
+        return jsonify({'error': 'format must be csv or ndjson'}), 400
+
+    query = (db.session.query(*[getattr(Flight, field) for field in FLIGHT_FIELDS])
+             .filter(Flight.user_id == current_user.id)
+             .order_by(Flight.flight_date.desc().nulls_last(), Flight.id.desc())
+             .yield_per(EXPORT_BATCH_SIZE))
+    escaped = [i for i, field in enumerate(FLIGHT_FIELDS) if field in FLIGHT_ESCAPED_FIELDS]
+
+    def unescaped(rows):
+        for row in rows:
+            row = list(row)
+            for i in escaped:
+                if row[i] is not None:
+                    row[i] = unescape(row[i])
+            yield row
+
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(FLIGHT_FIELDS)
+        for count, row in enumerate(unescaped(query), start=1):
+            writer.writerow(value.isoformat() if isinstance(value, (datetime, date)) else value
+                            for value in row)
+            if count % EXPORT_BATCH_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    def ndjson_lines(serializer, rows):
+        return b''.join(json_dumps(flight) + b'\n' for flight in serializer.rows(rows))
+
+    def generate_ndjson():
+        serializer = flight_serializer()
+        batch = []
+        for row in unescaped(query):
+            batch.append(row)
+            if len(batch) == EXPORT_BATCH_SIZE:
+                yield ndjson_lines(serializer, batch)
+                batch = []
+        if batch:
+            yield ndjson_lines(serializer, batch)
+
+    extension, mimetype = ('csv', 'text/csv') if export_format == 'csv' else ('ndjson', 'application/x-ndjson')
+    return app.response_class(
+        stream_with_context(generate_csv() if export_format == 'csv' else generate_ndjson()),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=flights.{extension}'}
+    )
+
+@app.route('/api/flights/<int:flight_id>', methods=['DELETE'])
+@login_required
+def delete_flight(flight_id):
+    flight = Flight.query.filter_by(id=flight_id, user_id=current_user.id).first()
+    
+    if not flight:
+        return jsonify({'error': 'Flight not found'}), 404
+    
+    try:
+        stats = lock_user_stats(current_user.id)
+        db.session.add(FlightTombstone(user_id=current_user.id, flight_id=flight.id, change_seq=stats.data_version))
+        db.session.delete(flight)
+        update_user_stats(stats, [flight], -1)
+        db.session.commit()
+    except AccountGone:
+        raise
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Failed to delete flight: {str(e)}'}), 500
+    
+    return jsonify({'success': True, 'message': 'Flight deleted successfully'})
+
+@app.route('/api/flights/<int:flight_id>', methods=['GET'])
+@login_required
+@versioned_response()
+def get_flight(flight_id):
+    flight = Flight.query.filter_by(id=flight_id, user_id=current_user.id).first()
+    
+    if not flight:
+        return jsonify({'error': 'Flight not found'}), 404
     
-    # Calculate percentages
+    return json_response(flight_serializer().object(flight))
+
+# Statistics helpers
+MONTHS = ['January', 'February', 'March', 'April', 'May', 'June',
+          'July', 'August', 'September', 'October', 'November', 'December']
+
+def city_country(city):
+    """Extract the country from a "City, Country" string (simple approximation)"""
+    if not city:
+        return None
+    parts = city.split(',')
+    if len(parts) > 1:
+        return parts[-1].strip()
+    return None
+
+def endpoint_country(code, city):
+    """Country for one end of a flight: exact from the airport code, else guessed from the city"""
+    return airport_country(code) or city_country(city)
+
+def route_miles(departure_code, arrival_code):
+    """Great-circle miles for a route, rounded, or 0 if either airport is unknown"""
+    miles = distance_miles(departure_code, arrival_code)
+    return int(round(miles)) if miles is not None else 0
+
+def destination_city(city):
+    """Get the city name from a "City, Country" string"""
+    return city.split(',')[0].strip()
+
+def empty_rollup():
+    return {
+        'total_flights': 0,
+        'total_minutes': 0,
+        'total_miles': 0,
+        'class_counts': {},
+        'destination_counts': {},
+        'country_counts': {},
+        'monthly_counts': {}
+    }
+
+def _bump(counts, key, amount):
+    """Add amount to counts[key], dropping keys that fall to zero"""
+    value = counts.get(key, 0) + amount
+    if value > 0:
+        counts[key] = value
+    else:
+        counts.pop(key, None)
+
+def _bump_destination(destinations, city, code, amount):
+    codes = dict(destinations.get(city, {}))
+    _bump(codes, code or '', amount)
+    if codes:
+        destinations[city] = codes
+    else:
+        destinations.pop(city, None)
+
+def aggregate_user_stats(user_id):
+    """
+    Recompute a user's rollup from the Flight table with aggregate queries.
+    Only grouped rows come back from the database, never individual flights.
+    """
+    user_flights = Flight.query.filter(Flight.user_id == user_id)
+    rollup = empty_rollup()
+
+    rollup['total_flights'] = user_flights.with_entities(db.func.count(Flight.id)).scalar() or 0
+    if not rollup['total_flights']:
+        return rollup
+
+    rollup['total_minutes'] = user_flights.with_entities(
+        db.func.coalesce(db.func.sum(Flight.duration_minutes), 0)).scalar()
+
+    class_rows = (user_flights
+                  .with_entities(Flight.cabin_class, db.func.count(Flight.id))
+                  .group_by(Flight.cabin_class)
+                  .all())
+    for cabin_class, count in class_rows:
+        _bump(rollup['class_counts'], cabin_class or 'Unknown', count)
+
+    route_rows = (user_flights
+                  .with_entities(Flight.departure_code, Flight.arrival_code, db.func.count(Flight.id))
+                  .group_by(Flight.departure_code, Flight.arrival_code)
+                  .all())
+    rollup['total_miles'] = sum(route_miles(dep, arr) * count for dep, arr, count in route_rows)
+
+    for code_column, city_column in ((Flight.departure_code, Flight.departure_city),
+                                     (Flight.arrival_code, Flight.arrival_city)):
+        endpoint_rows = (user_flights
+                         .with_entities(code_column, city_column, db.func.count(Flight.id))
+                         .group_by(code_column, city_column)
+                         .all())
+        for code, city, count in endpoint_rows:
+            country = endpoint_country(code, city)
+            if country:
+                _bump(rollup['country_counts'], country, count)
+
+    destination_rows = (user_flights
+                        .with_entities(Flight.arrival_city, Flight.arrival_code, db.func.count(Flight.id))
+                        .filter(Flight.arrival_city.isnot(None), Flight.arrival_city != '')
+                        .group_by(Flight.arrival_city, Flight.arrival_code)
+                        .all())
+    for arrival_city, arrival_code, count in destination_rows:
+        _bump_destination(rollup['destination_counts'], destination_city(arrival_city), arrival_code, count)
+
+    year = db.extract('year', Flight.flight_date)
+    month = db.extract('month', Flight.flight_date)
+    monthly_rows = (user_flights
+                    .with_entities(year, month, db.func.count(Flight.id))
+                    .filter(Flight.flight_date.isnot(None))
+                    .group_by(year, month)
+                    .all())
+    for year_number, month_number, count in monthly_rows:
+        _bump(rollup['monthly_counts'], f"{int(year_number):04d}-{int(month_number):02d}", count)
+
+    return rollup
+
+def rebuild_user_stats(user_id):
+    """Recompute and store the rollup row for a user. The caller commits."""
+    stats = db.session.get(UserStats, user_id)
+    if stats is None:
+        if db.session.get(User, user_id) is None:
+            raise AccountGone()
+        stats = UserStats(user_id=user_id)
+        db.session.add(stats)
+    for key, value in aggregate_user_stats(user_id).items():
+        setattr(stats, key, value)
+    stats.data_version = (stats.data_version or 0) + 1
+    db.session.execute(db.delete(StatsBucket).where(StatsBucket.user_id == user_id))
+    return stats
+
+def get_data_version(user_id):
+    """Current data version for a user, reading only that column of the rollup row"""
+    version = db.session.query(UserStats.data_version).filter_by(user_id=user_id).scalar()
+    if version is None:
+        version = get_user_stats(user_id).data_version
+    return version
+
+def get_user_stats(user_id):
+    """Return the user's rollup row, building it once from their flights if missing"""
+    stats = db.session.get(UserStats, user_id)
+    if stats is None:
+        stats = rebuild_user_stats(user_id)
+        db.session.commit()
+    return stats
+
+def lock_user_stats(user_id):
+    """
+    Lock the user's rollup row for a write and bump its data_version, which is the
+    change number for the write: flights it adds are stamped with it and flights it
+    deletes leave a tombstone with it. The lock is held until commit, so numbers
+    become visible in order and a sync client never skips one. Call before writing
+    flights and pass the row to update_user_stats/apply_user_stats afterwards.
+    """
+    stats = UserStats.query.filter_by(user_id=user_id).with_for_update().first()
+    if stats is None:
+        # No rollup yet: build it from the flights as they are before this write
+        stats = rebuild_user_stats(user_id)
+        db.session.flush()
+    else:
+        stats.data_version += 1
+    return stats
+
+def update_user_stats(stats, flights, sign):
+    """
+    Apply flights to the rollup row from lock_user_stats (sign=1 when adding, -1
+    when deleting). Call after the flights have been added to or deleted from the
+    session so the change lands in the same transaction. The caller commits.
+    """
+    return apply_user_stats(stats, [(flight, sign) for flight in flights])
+
+def apply_user_stats(stats, weighted_flights):
+    """
+    Apply (flight, count) pairs to the rollup row from lock_user_stats, where count
+    is how many flights with those values were added (negative when deleted). Lets
+    bulk writers pass one representative per group instead of every row. Also counts
+    them towards the global leaderboards once the transaction commits. The caller commits.
+    """
+    user_id = stats.user_id
+    record_leaderboard_flights(user_id, weighted_flights)
+
+    # JSON columns are not mutation-tracked, so work on copies and reassign
+    class_counts = dict(stats.class_counts)
+    destination_counts = dict(stats.destination_counts)
+    country_counts = dict(stats.country_counts)
+    monthly_counts = dict(stats.monthly_counts)
+    total_minutes = stats.total_minutes
+    total_miles = stats.total_miles
+
+    total_flights = stats.total_flights
+    first_date = last_date = None
+
+    for flight, count in weighted_flights:
+        total_flights += count
+        total_minutes += count * (flight.duration_minutes or 0)
+        total_miles += count * route_miles(flight.departure_code, flight.arrival_code)
+        _bump(class_counts, flight.cabin_class or 'Unknown', count)
+        for code, city in ((flight.departure_code, flight.departure_city),
+                           (flight.arrival_code, flight.arrival_city)):
+            country = endpoint_country(code, city)
+            if country:
+                _bump(country_counts, country, count)
+        if flight.arrival_city:
+            _bump_destination(destination_counts, destination_city(flight.arrival_city), flight.arrival_code, count)
+        if flight.flight_date:
+            _bump(monthly_counts, flight.flight_date.strftime('%Y-%m'), count)
+            first_date = min(first_date or flight.flight_date, flight.flight_date)
+            last_date = max(last_date or flight.flight_date, flight.flight_date)
+
+    stats.total_flights = max(total_flights, 0)
+    stats.total_minutes = max(total_minutes, 0)
+    stats.total_miles = max(total_miles, 0)
+    stats.class_counts = class_counts
+    stats.destination_counts = destination_counts
+    stats.country_counts = country_counts
+    stats.monthly_counts = monthly_counts
+    if first_date is not None:
+        invalidate_stats_buckets(user_id, first_date, last_date)
+    return stats
+
+def grouped_flights(query):
+    """
+    (flight values, count) pairs for the flights matched by a Flight query, grouped
+    on the columns the rollup and leaderboards use, for apply_user_stats. One aggregate query.
+    """
+    year = db.extract('year', Flight.flight_date)
+    month = db.extract('month', Flight.flight_date)
+    columns = (Flight.cabin_class, Flight.departure_code, Flight.departure_city,
+               Flight.arrival_code, Flight.arrival_city, Flight.duration_minutes, Flight.aircraft, year, month)
+    rows = query.with_entities(*columns, db.func.count(Flight.id)).group_by(*columns).all()
+    return [
+        (SimpleNamespace(cabin_class=cabin_class, departure_code=departure_code, departure_city=departure_city,
+                         arrival_code=arrival_code, arrival_city=arrival_city, duration_minutes=duration_minutes,
+                         aircraft=aircraft,
+                         flight_date=date(int(year_number), int(month_number), 1) if year_number else None), count)
+        for (cabin_class, departure_code, departure_city, arrival_code, arrival_city, duration_minutes, aircraft,
+             year_number, month_number, count) in rows
+    ]
+
+def format_stats(rollup):
+    """Build the /api/stats payload from rollup counts"""
+    total_flights = rollup['total_flights']
+
+    if not total_flights:
+        return {
+            'total_flights': 0,
+            'total_hours': 0,
+            'countries_visited': 0,
+            'miles_flown': 0,
+            'flight_classes': {},
+            'top_destinations': [],
+            'monthly_activity': []
+        }
+
+    total_hours = rollup['total_minutes'] // 60
+    countries_visited = len(rollup['country_counts'])
+
+    # Great-circle miles between the airports of each flight
+    miles_flown = rollup['total_miles']
+
+    # Flight class distribution
     flight_classes = {}
-    for class_name, count in class_counts.items():
-        percentage = round((count / total_flights) * 100)
+    for class_name, count in rollup['class_counts'].items():
         flight_classes[class_name] = {
             'count': count,
-            'percentage': percentage
+            'percentage': round((count / total_flights) * 100)
         }
-    
-    # Top destinations
-    destination_counts = {}
-    for flight in flights:
-        if flight.arrival_city:
-            city = flight.arrival_city.split(',')[0].strip()  # Get city name
-            destination_counts[city] = destination_counts.get(city, 0) + 1
-    
+
+    # Top destinations, each with its most common airport code
+    destinations = []
+    for city, codes in rollup['destination_counts'].items():
+        known_codes = {code: count for code, count in codes.items() if code}
+        airport_code = max(known_codes, key=known_codes.get) if known_codes else 'N/A'
+        destinations.append((city, sum(codes.values()), airport_code))
+
     top_destinations = []
-    for city, count in sorted(destination_counts.items(), key=lambda x: x[1], reverse=True)[:5]:
-        percentage = round((count / total_flights) * 100)
+    for city, count, airport_code in sorted(destinations, key=lambda x: x[1], reverse=True)[:5]:
         top_destinations.append({
             'city': city,
             'count': count,
-            'percentage': percentage,
-            'airport_code': next((f.arrival_code for f in flights if f.arrival_city and city in f.arrival_city), 'N/A')
+            'percentage': round((count / total_flights) * 100),
+            'airport_code': airport_code
         })
-    
+
     # Monthly activity (simple version - just current year)
-    from collections import defaultdict
-    monthly_counts = defaultdict(int)
     current_year = datetime.now().year
-    
-    for flight in flights:
-        if flight.flight_date and flight.flight_date.year == current_year:
-            month_key = flight.flight_date.strftime('%B')
-            monthly_counts[month_key] += 1
-    
     monthly_activity = []
-    months = ['January', 'February', 'March', 'April', 'May', 'June',
-             'July', 'August', 'September', 'October', 'November', 'December']
-    
-    for month in months:
+    for month_number, month_name in enumerate(MONTHS, start=1):
         monthly_activity.append({
-            'month': month,
-            'flights': monthly_counts.get(month, 0)
+            'month': month_name,
+            'flights': rollup['monthly_counts'].get(f"{current_year:04d}-{month_number:02d}", 0)
         })
-    
-    return jsonify({
+
+    return {
         'total_flights': total_flights,
         'total_hours': f"{total_hours}h",
         'countries_visited': countries_visited,
@@ -495,13 +2038,866 @@ def get_stats():
         'flight_classes': flight_classes,
         'top_destinations': top_destinations,
         'monthly_activity': monthly_activity
+    }
+
+def rollup_dict(stats):
+    return {key: getattr(stats, key) for key in empty_rollup()}
+
+# Statistics API
+@app.route('/api/stats', methods=['GET'])
+@login_required
+@versioned_response(vary=lambda: datetime.now().year)  # monthly_activity covers the current year
+def get_stats():
+    return jsonify(format_stats(rollup_dict(get_user_stats(current_user.id))))
+
+# Statistics time series
+# Per-period totals (flights, minutes, miles, distinct routes) for any range of weeks,
+# months or years. Closed periods are stored in stats_bucket the first time they are
+# asked for and reused until a flight write lands in them; only the current period
+# (and any future ones) is aggregated on every request.
+TIMESERIES_GRANULARITIES = ('week', 'month', 'year')
+MAX_TIMESERIES_BUCKETS = 1000
+# Default range when no from= is given, in periods ending with the current one
+DEFAULT_TIMESERIES_PERIODS = {'week': 12, 'month': 12, 'year': 5}
+BUCKET_FIELDS = ('flights', 'minutes', 'miles', 'routes')
+# The period after the last one asked for must still be a valid date
+MAX_TIMESERIES_DATE = date(date.max.year - 1, 12, 31)
+
+def period_floor(day, granularity):
+    """First day of the week (Monday), month or year containing day"""
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day.replace(month=1, day=1)
+
+def next_period(start, granularity):
+    if granularity == 'week':
+        return start + timedelta(days=7)
+    if granularity == 'month':
+        return date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return date(start.year + 1, 1, 1)
+
+def period_count(first, last, granularity):
+    """Number of periods from the one containing first to the one containing last"""
+    if granularity == 'week':
+        return (period_floor(last, 'week') - period_floor(first, 'week')).days // 7 + 1
+    if granularity == 'month':
+        return (last.year - first.year) * 12 + last.month - first.month + 1
+    return last.year - first.year + 1
+
+def period_label(start, granularity):
+    if granularity == 'week':
+        year, week, _ = start.isocalendar()
+        return f'{year}-W{week:02d}'
+    if granularity == 'month':
+        return start.strftime('%Y-%m')
+    return str(start.year)
+
+def period_start_column(granularity):
+    """SQL expression for the first day of each flight's period"""
+    if db.engine.dialect.name == 'sqlite':
+        if granularity == 'week':
+            # Next Sunday (or the day itself), then back to that week's Monday
+            return db.func.date(Flight.flight_date, 'weekday 0', '-6 days')
+        return db.func.strftime('%Y-%m-01' if granularity == 'month' else '%Y-01-01', Flight.flight_date)
+    return db.cast(db.func.date_trunc(granularity, Flight.flight_date), db.Date)
+
+def aggregate_buckets(user_id, granularity, start, end):
+    """
+    Totals per period for the user's flights in [start, end), as {period_start: dict}.
+    One GROUP BY over (period, route), served by the (user_id, flight_date) index.
+    """
+    period = period_start_column(granularity).label('period')
+    rows = (db.session.query(period, Flight.departure_code, Flight.arrival_code,
+                             db.func.count(Flight.id),
+                             db.func.coalesce(db.func.sum(Flight.duration_minutes), 0))
+            .filter(Flight.user_id == user_id,
+                    Flight.flight_date >= start,
+                    Flight.flight_date < end)
+            .group_by(period, Flight.departure_code, Flight.arrival_code)
+            .all())
+
+    buckets = {}
+    for period_start, departure_code, arrival_code, count, minutes in rows:
+        if isinstance(period_start, str):
+            period_start = date.fromisoformat(period_start)
+        bucket = buckets.setdefault(period_start, dict.fromkeys(BUCKET_FIELDS, 0))
+        bucket['flights'] += count
+        bucket['minutes'] += int(minutes)
+        bucket['miles'] += count * route_miles(departure_code, arrival_code)
+        if departure_code and arrival_code:
+            bucket['routes'] += 1
+    return buckets
+
+def store_stats_buckets(user_id, granularity, buckets):
+    """Insert computed closed-period rows, leaving any a concurrent request stored first"""
+    rows = [dict(user_id=user_id, granularity=granularity, period_start=period_start, **values)
+            for period_start, values in buckets.items()]
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        statement = pg_insert(StatsBucket).values(rows).on_conflict_do_nothing()
+    elif dialect == 'sqlite':
+        statement = sqlite_insert(StatsBucket).values(rows).on_conflict_do_nothing()
+    else:
+        statement = db.insert(StatsBucket).values(rows)
+    db.session.execute(statement)
+
+def invalidate_stats_buckets(user_id, first_date, last_date):
+    """
+    Drop stored buckets overlapping the months from first_date to last_date, after
+    flights in that span were added or removed. Whole months are cleared because
+    bulk writers pass one representative flight per month (see grouped_flights).
+    """
+    start = first_date.replace(day=1)
+    end = next_period(last_date.replace(day=1), 'month')
+    db.session.execute(db.delete(StatsBucket).where(
+        StatsBucket.user_id == user_id,
+        StatsBucket.period_start < end,
+        db.or_(*(db.and_(StatsBucket.granularity == granularity,
+                         StatsBucket.period_start >= period_floor(start, granularity))
+                 for granularity in TIMESERIES_GRANULARITIES))))
+
+def stats_timeseries(user_id, granularity, first, last, today=None):
+    """Bucket dicts for every period from the one containing first to the one containing last"""
+    current = period_floor(today or date.today(), granularity)
+    periods = [period_floor(first, granularity)]
+    while periods[-1] < period_floor(last, granularity):
+        periods.append(next_period(periods[-1], granularity))
+    closed = [period for period in periods if period < current]
+    live = [period for period in periods if period >= current]
+
+    values = {}
+    if closed:
+        stored = (StatsBucket.query
+                  .filter(StatsBucket.user_id == user_id,
+                          StatsBucket.granularity == granularity,
+                          StatsBucket.period_start >= closed[0],
+                          StatsBucket.period_start <= closed[-1])
+                  .all())
+        values = {row.period_start: {field: getattr(row, field) for field in BUCKET_FIELDS} for row in stored}
+        missing = [period for period in closed if period not in values]
+        if missing:
+            # Hold the rollup row lock like flight writers do, so a back-dated write
+            # cannot commit between this aggregate and the insert and leave it stale
+            UserStats.query.filter_by(user_id=user_id).with_for_update().first()
+            computed = aggregate_buckets(user_id, granularity, missing[0], next_period(missing[-1], granularity))
+            fresh = {period: computed.get(period, dict.fromkeys(BUCKET_FIELDS, 0)) for period in missing}
+            store_stats_buckets(user_id, granularity, fresh)
+            db.session.commit()
+            values.update(fresh)
+    if live:
+        values.update(aggregate_buckets(user_id, granularity, live[0], next_period(live[-1], granularity)))
+
+    return [{
+        'period': period_label(period, granularity),
+        'start': period.isoformat(),
+        'end': (next_period(period, granularity) - timedelta(days=1)).isoformat(),
+        **values.get(period, dict.fromkeys(BUCKET_FIELDS, 0)),
+    } for period in periods]
+
+@app.route('/api/stats/timeseries', methods=['GET'])
+@login_required
+@versioned_response(vary=lambda: date.today().isoformat())  # the current period moves with the date
+def get_stats_timeseries():
+    granularity = request.args.get('granularity', 'month')
+    if granularity not in TIMESERIES_GRANULARITIES:
+        return jsonify({'error': 'granularity must be week, month or year'}), 400
+    try:
+        last = date.fromisoformat(request.args['to']) if request.args.get('to') else date.today()
+        if request.args.get('from'):
+            first = date.fromisoformat(request.args['from'])
+        else:
+            first = period_floor(last, granularity)
+            for _ in range(DEFAULT_TIMESERIES_PERIODS[granularity] - 1):
+                if first == date.min:
+                    break
+                first = period_floor(first - timedelta(days=1), granularity)
+    except ValueError:
+        return jsonify({'error': 'from and to must be dates (YYYY-MM-DD)'}), 400
+    if last > MAX_TIMESERIES_DATE:
+        return jsonify({'error': f'to must not be after {MAX_TIMESERIES_DATE.isoformat()}'}), 400
+    if first > last:
+        return jsonify({'error': 'from must not be after to'}), 400
+    if period_count(first, last, granularity) > MAX_TIMESERIES_BUCKETS:
+        return jsonify({'error': f'Range too long: at most {MAX_TIMESERIES_BUCKETS} {granularity}s'}), 400
+
+    buckets = stats_timeseries(current_user.id, granularity, first, last)
+    for bucket in buckets:
+        bucket['hours'] = round(bucket['minutes'] / 60, 1)
+    return jsonify({
+        'granularity': granularity,
+        'from': buckets[0]['start'],
+        'to': buckets[-1]['end'],
+        'buckets': buckets,
     })
 
+@app.route('/api/stats/rebuild', methods=['POST'])
+@login_required
+def rebuild_stats():
+    """Queue a recompute of the user's rollup from their flights"""
+    return job_accepted(enqueue_job(current_user.id, 'rebuild_stats', {}, request.headers.get('Idempotency-Key')))
+
+@app.cli.command('rebuild-stats')
+@click.option('--user-id', type=int, help='Only rebuild this user (default: all users)')
+def rebuild_stats_command(user_id):
+    """Recompute stats rollups from the Flight table to repair drift."""
+    user_ids = [user_id] if user_id else [uid for (uid,) in db.session.query(User.id).all()]
+    for uid in user_ids:
+        rebuild_user_stats(uid)
+        db.session.commit()
+    click.echo(f'Rebuilt stats for {len(user_ids)} user(s)')
+
+# Map API
+def build_map_routes(user_id):
+    """Deduplicated routes with counts, airport details and great-circle paths"""
+    route_rows = (db.session.query(Flight.departure_code, Flight.arrival_code, db.func.count(Flight.id))
+                  .filter(Flight.user_id == user_id,
+                          Flight.departure_code.isnot(None),
+                          Flight.arrival_code.isnot(None))
+                  .group_by(Flight.departure_code, Flight.arrival_code)
+                  .order_by(db.func.count(Flight.id).desc())
+                  .all())
+
+    routes = []
+    airports = {}
+    for departure_code, arrival_code, count in route_rows:
+        for code in (departure_code, arrival_code):
+            if code not in airports:
+                airport = lookup_airport(code)
+                airports[code] = {
+                    'name': airport.name,
+                    'city': airport.city,
+                    'country': airport.country,
+                    'latitude': round(airport.latitude, 4),
+                    'longitude': round(airport.longitude, 4)
+                } if airport else None
+        miles = distance_miles(departure_code, arrival_code)
+        routes.append({
+            'departure_code': departure_code,
+            'arrival_code': arrival_code,
+            'count': count,
+            'distance_miles': int(round(miles)) if miles is not None else None,
+            'path': great_circle_path(departure_code, arrival_code)
+        })
+
+    return {
+        'routes': routes,
+        'airports': airports,
+        'total_flights': sum(route['count'] for route in routes)
+    }
+
+@app.route('/api/map/routes', methods=['GET'])
+@login_required
+@versioned_response()
+def get_map_routes():
+    """Routes for the map page; the payload grows with distinct routes, not flights"""
+    return jsonify(build_map_routes(current_user.id))
+
+# Global leaderboards
+# Platform-wide most-flown routes, busiest airports, popular aircraft and distinct
+# travellers per airport, kept in bounded-memory sketches (see sketches.py) rather
+# than grouped over the whole flight table. Flight writes count towards a per-process
+# delta once their transaction commits; a background thread merges the delta into the
+# global_sketch rows every LEADERBOARD_FLUSH_SECONDS. Reads use a cached copy of the
+# stored sketches, so they cost the same however many flights there are.
+#
+# Accuracy against exact counts (check with `flask leaderboards-check`): flight counts
+# never undercount and overcount by at most 0.13% of all counted flights (airport
+# movements for airports) with 99.3% confidence; traveller counts have a 3.25%
+# standard error and, unlike flight counts, are not reduced when flights or accounts
+# are deleted. Top lists only hold keys that were among the top LEADERBOARD_CAPACITY
+# when last counted, so after mass deletions a smaller key may be missing until
+# `flask leaderboards-rebuild` recomputes everything exactly (seed-remove does this).
+LEADERBOARD_FLUSH_SECONDS = float(os.environ.get('LEADERBOARD_FLUSH_SECONDS', 30))
+LEADERBOARD_CACHE_SECONDS = float(os.environ.get('LEADERBOARD_CACHE_SECONDS', 30))
+LEADERBOARD_CAPACITY = 200  # Candidate keys tracked per leaderboard
+DEFAULT_LEADERBOARD_SIZE = 10
+MAX_LEADERBOARD_SIZE = 50
+
+class Leaderboards:
+    """The leaderboard sketches, either a process's unsaved delta or the stored totals"""
+    NAMES = ('routes', 'airports', 'aircraft', 'travellers')
+
+    def __init__(self):
+        self.routes = HeavyHitters(LEADERBOARD_CAPACITY)
+        self.airports = HeavyHitters(LEADERBOARD_CAPACITY)
+        self.aircraft = HeavyHitters(LEADERBOARD_CAPACITY)
+        self.travellers = KeyedHyperLogLog()
+        self.empty = True
+
+    def record(self, user_id, departure_code, arrival_code, aircraft, count):
+        """Count `count` flights (negative when removed); user_id None skips traveller counts"""
+        self.empty = False
+        if departure_code and arrival_code:
+            self.routes.add(f'{departure_code}-{arrival_code}', count)
+        for code in (departure_code, arrival_code):
+            if code:
+                self.airports.add(code, count)
+                if user_id is not None and count > 0:
+                    self.travellers.add(code, user_id)
+        aircraft = ' '.join((aircraft or '').split())
+        if aircraft:
+            self.aircraft.add(aircraft, count)
+
+    def merge(self, other):
+        for name in self.NAMES:
+            getattr(self, name).merge(getattr(other, name))
+        self.empty = self.empty and other.empty
+
+    def to_rows(self):
+        return {name: getattr(self, name).to_bytes() for name in self.NAMES}
+
+    @classmethod
+    def from_rows(cls, rows):
+        boards = cls()
+        loaders = {'travellers': KeyedHyperLogLog.from_bytes}
+        for name, data in rows.items():
+            setattr(boards, name, loaders.get(name, HeavyHitters.from_bytes)(data))
+            boards.empty = False
+        return boards
+
+_leaderboard_lock = threading.Lock()
+_leaderboard_delta = Leaderboards()
+_leaderboard_flusher = None
+_leaderboard_cache = None  # (expires at, Leaderboards, updated_at)
+
+def _stage_leaderboard_updates(updates):
+    # Summed per (user, departure, arrival, aircraft): bulk writers pass many groups
+    # that differ only in columns the leaderboards ignore, and each sketch update costs
+    staged = db.session.info.setdefault('leaderboard_updates', {})
+    for key, count in updates:
+        staged[key] = staged.get(key, 0) + count
+
+def record_leaderboard_flights(user_id, weighted_flights):
+    """Stage (flight, count) pairs for the leaderboards; they are counted when the session commits"""
+    _stage_leaderboard_updates(
+        ((user_id, flight.departure_code, flight.arrival_code, getattr(flight, 'aircraft', None)), count)
+        for flight, count in weighted_flights)
+
+def forget_leaderboard_flights(query):
+    """Stage the removal of every flight a Flight query matches, with one aggregate query"""
+    columns = (Flight.user_id, Flight.departure_code, Flight.arrival_code, Flight.aircraft)
+    rows = query.with_entities(*columns, db.func.count(Flight.id)).group_by(*columns).all()
+    _stage_leaderboard_updates((tuple(row[:4]), -row[4]) for row in rows)
+
+@db.event.listens_for(db.session, 'after_commit')
+def _count_committed_leaderboard_flights(session):
+    updates = session.info.pop('leaderboard_updates', None)
+    if not updates:
+        return
+    with _leaderboard_lock:
+        for key, count in updates.items():
+            if count:
+                _leaderboard_delta.record(*key, count)
+    start_leaderboard_flusher()
+
+@db.event.listens_for(db.session, 'after_rollback')
+def _discard_leaderboard_flights(session):
+    session.info.pop('leaderboard_updates', None)
+
+def load_stored_leaderboards(lock=False):
+    """The stored sketches and when they were last saved (None if never)"""
+    query = GlobalSketch.query.filter(GlobalSketch.name.in_(Leaderboards.NAMES))
+    rows = (query.with_for_update() if lock else query).all()
+    updated_at = max((row.updated_at for row in rows if row.updated_at), default=None)
+    return Leaderboards.from_rows({row.name: row.data for row in rows}), updated_at
+
+def save_leaderboards(boards):
+    """Write all sketches, replacing the stored ones. The caller commits."""
+    stored = {row.name: row for row in GlobalSketch.query.filter(GlobalSketch.name.in_(Leaderboards.NAMES))}
+    for name, data in boards.to_rows().items():
+        if name in stored:
+            stored[name].data = data
+        else:
+            db.session.add(GlobalSketch(name=name, data=data))
+
+def flush_leaderboards():
+    """Merge this process's unsaved counts into the stored sketches. Returns True if there were any."""
+    global _leaderboard_delta
+    with _leaderboard_lock:
+        delta, _leaderboard_delta = _leaderboard_delta, Leaderboards()
+    if delta.empty:
+        return False
+    try:
+        # Row locks serialize the read-merge-write across processes
+        stored, _ = load_stored_leaderboards(lock=True)
+        stored.merge(delta)
+        save_leaderboards(stored)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        # Keep the counts for the next attempt
+        with _leaderboard_lock:
+            _leaderboard_delta.merge(delta)
+        raise
+    return True
+
+def _flush_leaderboards_periodically():
+    while True:
+        time.sleep(LEADERBOARD_FLUSH_SECONDS)
+        with app.app_context():
+            try:
+                flush_leaderboards()
+            except Exception:
+                app.logger.exception('Saving leaderboard sketches failed')
+
+def start_leaderboard_flusher():
+    """Start this process's flush thread (again after a fork, which does not copy threads)"""
+    global _leaderboard_flusher
+    if _leaderboard_flusher is None or not _leaderboard_flusher.is_alive():
+        _leaderboard_flusher = threading.Thread(target=_flush_leaderboards_periodically,
+                                                name='leaderboard-flush', daemon=True)
+        _leaderboard_flusher.start()
+
+@atexit.register
+def _flush_leaderboards_at_exit():
+    if _leaderboard_delta.empty:
+        return
+    with app.app_context():
+        try:
+            flush_leaderboards()
+        except Exception:
+            app.logger.exception('Saving leaderboard sketches at exit failed')
+
+def cached_leaderboards():
+    """Stored sketches, re-read at most every LEADERBOARD_CACHE_SECONDS per process"""
+    global _leaderboard_cache
+    now = time.monotonic()
+    if _leaderboard_cache is None or _leaderboard_cache[0] <= now:
+        boards, updated_at = load_stored_leaderboards()
+        _leaderboard_cache = (now + LEADERBOARD_CACHE_SECONDS, boards, updated_at)
+    return _leaderboard_cache[1], _leaderboard_cache[2]
+
+def airport_summary(boards, code):
+    airport = lookup_airport(code)
+    return {
+        'code': code,
+        'name': airport.name if airport else None,
+        'city': airport.city if airport else None,
+        'flights': boards.airports.estimate(code),
+        'travellers': boards.travellers.count(code)
+    }
+
+@app.route('/api/leaderboards', methods=['GET'])
+@login_required
+def get_leaderboards():
+    try:
+        limit = int(request.args.get('limit', DEFAULT_LEADERBOARD_SIZE))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    if limit < 1 or limit > MAX_LEADERBOARD_SIZE:
+        return jsonify({'error': f'limit must be between 1 and {MAX_LEADERBOARD_SIZE}'}), 400
+
+    boards, updated_at = cached_leaderboards()
+    routes = []
+    for route, flights in boards.routes.top(limit):
+        departure_code, arrival_code = route.split('-', 1)
+        routes.append({'departure_code': departure_code, 'arrival_code': arrival_code, 'flights': flights})
+    response = jsonify({
+        'routes': routes,
+        'airports': [airport_summary(boards, code) for code, _ in boards.airports.top(limit)],
+        'aircraft': [{'aircraft': aircraft, 'flights': flights} for aircraft, flights in boards.aircraft.top(limit)],
+        'updated_at': updated_at.isoformat() if updated_at else None,
+        # Flight counts may be too high by up to this many (99.3% confidence); never too low
+        'accuracy': {
+            'routes_max_overcount': int(boards.routes.sketch.error_bound()),
+            'airports_max_overcount': int(boards.airports.sketch.error_bound()),
+            'aircraft_max_overcount': int(boards.aircraft.sketch.error_bound()),
+            'travellers_standard_error': round(boards.travellers.relative_error(), 4)
+        }
+    })
+    response.headers['Cache-Control'] = f'private, max-age={int(LEADERBOARD_CACHE_SECONDS)}'
+    return response
+
+@app.route('/api/leaderboards/airports/<code>', methods=['GET'])
+@login_required
+def get_airport_leaderboard(code):
+    code = code.upper()
+    if not validate_airport_code(code):
+        return jsonify({'error': 'Invalid airport code'}), 400
+    boards, _ = cached_leaderboards()
+    return jsonify(airport_summary(boards, code))
+
+def exact_leaderboard_counts():
+    """Exact flight counts per route, airport and aircraft, and distinct users per airport. Full scans."""
+    route_rows = (db.session.query(Flight.departure_code, Flight.arrival_code, Flight.aircraft, db.func.count(Flight.id))
+                  .group_by(Flight.departure_code, Flight.arrival_code, Flight.aircraft).all())
+    endpoints = db.union(db.select(Flight.departure_code.label('code'), Flight.user_id),
+                         db.select(Flight.arrival_code.label('code'), Flight.user_id)).subquery()
+    traveller_rows = db.session.execute(
+        db.select(endpoints.c.code, endpoints.c.user_id).where(endpoints.c.code.isnot(None))).all()
+    return route_rows, traveller_rows
+
+def rebuild_leaderboards():
+    """
+    Replace the stored sketches with ones computed from the flight table and commit.
+    Returns the number of flights counted. Counts other processes have not saved yet
+    are added on top when they flush, so run it when writes are quiet.
+    """
+    global _leaderboard_delta
+    # This process's unsaved counts are already in the table
+    with _leaderboard_lock:
+        _leaderboard_delta = Leaderboards()
+    route_rows, traveller_rows = exact_leaderboard_counts()
+    boards = Leaderboards()
+    for departure_code, arrival_code, aircraft, count in route_rows:
+        boards.record(None, departure_code, arrival_code, aircraft, count)
+    for code, user_id in traveller_rows:
+        boards.travellers.add(code, user_id)
+    load_stored_leaderboards(lock=True)
+    save_leaderboards(boards)
+    db.session.commit()
+    return sum(row[3] for row in route_rows)
+
+@app.cli.command('leaderboards-rebuild')
+def leaderboards_rebuild_command():
+    """Recompute the leaderboard sketches exactly from the flight table, replacing the stored ones."""
+    click.echo(f'Rebuilt leaderboards from {rebuild_leaderboards()} flights')
+
+@app.cli.command('leaderboards-check')
+@click.option('--top', default=DEFAULT_LEADERBOARD_SIZE, help='Compare the top N of each leaderboard')
+def leaderboards_check_command(top):
+    """Compare the stored leaderboards with exact counts from the flight table and print the errors."""
+    boards, updated_at = load_stored_leaderboards()
+    route_rows, traveller_rows = exact_leaderboard_counts()
+    exact = {'routes': {}, 'airports': {}, 'aircraft': {}}
+    for departure_code, arrival_code, aircraft, count in route_rows:
+        if departure_code and arrival_code:
+            _bump(exact['routes'], f'{departure_code}-{arrival_code}', count)
+        for code in (departure_code, arrival_code):
+            if code:
+                _bump(exact['airports'], code, count)
+        aircraft = ' '.join((aircraft or '').split())
+        if aircraft:
+            _bump(exact['aircraft'], aircraft, count)
+
+    click.echo(f'Stored sketches last saved {updated_at or "never"}')
+    for name, counts in exact.items():
+        hitters = getattr(boards, name)
+        # Same tie order as HeavyHitters.top
+        exact_top = sorted(counts, key=lambda key: (-counts[key], key))[:top]
+        errors = [hitters.estimate(key) - counts[key] for key in exact_top]
+        found = len(set(exact_top) & {key for key, _ in hitters.top(top)})
+        click.echo(f'{name:<10} top-{top} recall {found}/{len(exact_top)}, '
+                   f'overcount max {max(errors, default=0)} mean {sum(errors) / max(len(errors), 1):.1f} '
+                   f'(bound {hitters.sketch.error_bound():.0f}), undercount max {-min(errors + [0])}')
+
+    travellers = {}
+    for code, _ in traveller_rows:
+        travellers[code] = travellers.get(code, 0) + 1
+    busiest = sorted(travellers, key=lambda code: -travellers[code])[:top]
+    relative = [abs(boards.travellers.count(code) - travellers[code]) / travellers[code] for code in busiest]
+    click.echo(f'travellers top-{top} airports: relative error max {max(relative, default=0):.2%} '
+               f'mean {sum(relative) / max(len(relative), 1):.2%} '
+               f'(standard error {boards.travellers.relative_error():.2%})')
+
+# Synthetic data
+# Deterministic, realistic flight histories for staging and load tests. Routes come
+# from a weighted network of busy airports, and rows are written with the fastest
+# bulk path the database has (COPY on PostgreSQL, a raw executemany on SQLite).
+ADMIN_EMAILS = {email.strip().lower() for email in os.environ.get('ADMIN_EMAILS', '').split(',') if email.strip()}
+MAX_SEED_ROWS_PER_REQUEST = 1000000
+
+# IATA code -> relative passenger traffic, used to pick home airports and destinations
+SEED_AIRPORTS = {
+    'ATL': 104, 'DXB': 87, 'DFW': 81, 'LHR': 79, 'HND': 78, 'DEN': 77, 'IST': 76, 'LAX': 75,
+    'ORD': 73, 'DEL': 73, 'CDG': 67, 'CAN': 63, 'JFK': 62, 'AMS': 61, 'FRA': 61, 'MAD': 60,
+    'SIN': 59, 'LAS': 57, 'MCO': 57, 'ICN': 56, 'CLT': 53, 'BKK': 52, 'MIA': 52, 'SFO': 50,
+    'SEA': 50, 'BCN': 49, 'EWR': 49, 'MEX': 48, 'PHX': 48, 'IAH': 46, 'DOH': 45, 'YYZ': 44,
+    'GRU': 42, 'SYD': 41, 'MUC': 41, 'BOS': 40, 'FCO': 40, 'HKG': 40, 'MSP': 35, 'NRT': 33,
+}
+SEED_CARRIERS = {
+    'US': ('AA', 'DL', 'UA', 'WN', 'B6', 'AS'), 'GB': ('BA', 'VS'), 'FR': ('AF',), 'DE': ('LH',),
+    'NL': ('KL',), 'ES': ('IB', 'VY'), 'IT': ('AZ',), 'TR': ('TK',), 'AE': ('EK',), 'QA': ('QR',),
+    'JP': ('JL', 'NH'), 'KR': ('KE', 'OZ'), 'CN': ('CZ',), 'SG': ('SQ',), 'TH': ('TG',),
+    'IN': ('AI', '6E'), 'HK': ('CX',), 'AU': ('QF',), 'CA': ('AC',), 'MX': ('AM',), 'BR': ('LA',),
+}
+SHORT_HAUL_AIRCRAFT = ('Airbus A320neo', 'Airbus A321', 'Boeing 737-800', 'Boeing 737 MAX 8', 'Embraer E175')
+LONG_HAUL_AIRCRAFT = ('Boeing 787-9', 'Airbus A350-900', 'Boeing 777-300ER', 'Airbus A330-300', 'Airbus A380-800')
+# (cabin class, share) for flights under and over LONG_HAUL_MILES
+SHORT_HAUL_CABINS = (('Economy', 80), ('Premium Economy', 5), ('Business', 12), ('First', 3))
+LONG_HAUL_CABINS = (('Economy', 68), ('Premium Economy', 14), ('Business', 15), ('First', 3))
+LONG_HAUL_MILES = 2500
+# Relative travel by month (January first) and by weekday (Monday first)
+SEED_MONTH_WEIGHTS = (0.80, 0.75, 0.90, 0.95, 1.00, 1.15, 1.25, 1.20, 0.95, 0.95, 0.90, 1.10)
+SEED_WEEKDAY_WEIGHTS = (1.05, 0.90, 0.90, 1.05, 1.20, 0.95, 1.10)
+SEED_DEPARTURE_HOURS = tuple(range(6, 23))
+
+SEED_FLIGHT_COLUMNS = ('user_id', 'flight_number', 'aircraft', 'cabin_class',
+                       'departure_code', 'departure_city', 'arrival_code', 'arrival_city',
+                       'departure_time', 'arrival_time', 'flight_date', 'duration', 'duration_minutes',
+                       'notes', 'is_seed', 'created_at', 'updated_at', 'change_seq')
+
+def _cumulative(weights):
+    total, result = 0, []
+    for weight in weights:
+        total += weight
+        result.append(total)
+    return result
+
+def _weighted_picker(items, weights):
+    """Return pick(rng) choosing from items by weight with one random() call"""
+    items = list(items)
+    cumulative = _cumulative(weights)
+    total = cumulative[-1]
+    return lambda rng: items[bisect_right(cumulative, rng.random() * total)]
+
+class FlightGenerator:
+    """
+    Generates seed flight rows over a fixed route network. Each synthetic user gets a
+    home airport and a history of round trips from it, spread over the last `years`
+    with seasonal and weekday peaks. Output depends only on (seed, user number, end date).
+
+    Everything that depends only on the route (cities, block time, duration, aircraft
+    and cabin mix) is computed once up front, so producing a row is a handful of
+    random draws.
+    """
+
+    def __init__(self, end_date=None, years=3):
+        self.end_date = end_date or date.today()
+        codes = [code for code in SEED_AIRPORTS if lookup_airport(code)]
+        self.pick_home = _weighted_picker(codes, (SEED_AIRPORTS[code] for code in codes))
+        cities, carriers = {}, {}
+        for code in codes:
+            airport = lookup_airport(code)
+            cities[code] = f'{airport.city}, {airport.country}'
+            carriers[code] = SEED_CARRIERS.get(airport.country, ('EK', 'QR', 'LH', 'TK'))
+
+        short_cabins = _weighted_picker(*zip(*SHORT_HAUL_CABINS))
+        long_cabins = _weighted_picker(*zip(*LONG_HAUL_CABINS))
+        base = datetime.combine(self.end_date, datetime.min.time())
+        self.legs = {}
+        self.pick_destination = {}
+        for origin in codes:
+            destinations, weights = [], []
+            for destination in codes:
+                if destination == origin:
+                    continue
+                miles = distance_miles(origin, destination)
+                # Block time: taxi and climb allowance plus cruise at ~500 mph, to 5 minutes
+                block = int(round((40 + miles / 500 * 60) / 5)) * 5
+                minutes = calculate_flight_minutes(base, base + timedelta(minutes=block))
+                long_haul = miles > LONG_HAUL_MILES
+                self.legs[origin, destination] = (
+                    carriers[origin], LONG_HAUL_AIRCRAFT if long_haul else SHORT_HAUL_AIRCRAFT,
+                    long_cabins if long_haul else short_cabins,
+                    origin, cities[origin], destination, cities[destination],
+                    block, calculate_flight_duration(base, base + timedelta(minutes=block)), minutes,
+                )
+                destinations.append(destination)
+                # Destinations favour busy airports and shorter hops
+                weights.append(SEED_AIRPORTS[destination] / (1 + miles / 1500))
+            self.pick_destination[origin] = _weighted_picker(destinations, weights)
+
+        # Dates and times are produced as text in SQLAlchemy's storage format
+        days = [self.end_date - timedelta(days=offset) for offset in range(int(years * 365))]
+        self.pick_day = _weighted_picker((day.toordinal() for day in days),
+                                         (SEED_MONTH_WEIGHTS[day.month - 1] * SEED_WEEKDAY_WEIGHTS[day.weekday()]
+                                          for day in days))
+        first = days[-1].toordinal()
+        # Room for return legs and overnight arrivals after the last outbound date
+        self.day_text = {ordinal: date.fromordinal(ordinal).isoformat()
+                         for ordinal in range(first, self.end_date.toordinal() + 17)}
+        self.time_text = [f'{minute // 60:02d}:{minute % 60:02d}:00.000000' for minute in range(0, 1440, 5)]
+        self.departure_minutes = [hour * 60 + minute for hour in SEED_DEPARTURE_HOURS for minute in range(0, 60, 5)]
+
+    def _leg(self, rng, route, day):
+        carriers, aircraft, pick_cabin, origin, origin_city, destination, destination_city, \
+            block, duration, minutes = self.legs[route]
+        departure = self.departure_minutes[int(rng.random() * len(self.departure_minutes))]
+        arrival = departure + block
+        day_text = self.day_text[day]
+        return (
+            f'{carriers[int(rng.random() * len(carriers))]}{int(rng.random() * 2999) + 1}',
+            aircraft[int(rng.random() * len(aircraft))],
+            pick_cabin(rng),
+            origin, origin_city, destination, destination_city,
+            f'{day_text} {self.time_text[departure // 5]}',
+            f'{self.day_text[day + arrival // 1440]} {self.time_text[arrival % 1440 // 5]}',
+            day_text, duration, minutes,
+        )
+
+    def flights(self, seed, number, count):
+        """
+        Yield `count` flights for synthetic user `number` as tuples in
+        SEED_FLIGHT_COLUMNS order, without user_id and the columns after duration_minutes
+        """
+        rng = random.Random(f'{seed}:{number}')
+        home = self.pick_home(rng)
+        pick_destination = self.pick_destination[home]
+        produced = 0
+        while produced < count:
+            day = self.pick_day(rng)
+            destination = pick_destination(rng)
+            yield self._leg(rng, (home, destination), day)
+            produced += 1
+            if produced < count:
+                yield self._leg(rng, (destination, home), day + 2 + int(rng.random() * 13))
+                produced += 1
+
+def bulk_insert_seed_flights(rows):
+    """
+    Insert full flight tuples (SEED_FLIGHT_COLUMNS order, dates and times as text) in
+    the current transaction, bypassing the ORM. The caller updates the stats rollups and commits.
+    """
+    connection = db.session.connection()
+    columns = ', '.join(SEED_FLIGHT_COLUMNS)
+    if connection.dialect.name == 'postgresql':
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        cursor = connection.connection.cursor()
+        try:
+            cursor.copy_expert(f'COPY flight ({columns}) FROM STDIN WITH (FORMAT csv)', buffer)
+        finally:
+            cursor.close()
+    elif connection.dialect.name == 'sqlite':
+        insert = f'INSERT INTO flight ({columns}) VALUES ({", ".join("?" * len(SEED_FLIGHT_COLUMNS))})'
+        # The search index trigger costs several times more per row than indexing the
+        # new rows with one INSERT ... SELECT, so drop it for the load and restore it
+        # after. SQLite DDL is transactional, but only inside an open transaction:
+        # flush the caller's pending writes (the stats bump) so one has begun, and
+        # leave the trigger alone if none has.
+        db.session.flush()
+        indexed = connection.connection.dbapi_connection.in_transaction and connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'flight_search_insert'").first()
+        if indexed:
+            last_id = connection.exec_driver_sql('SELECT coalesce(max(id), 0) FROM flight').scalar()
+            connection.exec_driver_sql('DROP TRIGGER flight_search_insert')
+        connection.exec_driver_sql(insert, rows)
+        if indexed:
+            connection.exec_driver_sql(f"""INSERT INTO flight_search (rowid, owner, {SQLITE_SEARCH_COLUMNS})
+                SELECT id, 'u' || user_id, {SQLITE_SEARCH_COLUMNS} FROM flight WHERE id > ?""", (last_id,))
+            connection.exec_driver_sql(SQLITE_SEARCH_DDL[1])
+    else:
+        values = []
+        for row in rows:
+            row = dict(zip(SEED_FLIGHT_COLUMNS, row))
+            row['departure_time'] = datetime.fromisoformat(row['departure_time'])
+            row['arrival_time'] = datetime.fromisoformat(row['arrival_time'])
+            row['flight_date'] = date.fromisoformat(row['flight_date'])
+            row['created_at'] = row['updated_at'] = datetime.fromisoformat(row['created_at'])
+            values.append(row)
+        db.session.execute(db.insert(Flight), values)
+
+def generate_seed_flights(user_ids, flights_per_user, seed, end_date=None, years=3, chunk_size=20000,
+                          commit=True, progress=None, start=0):
+    """
+    Add `flights_per_user` synthetic flights tagged is_seed to each user in chunks of
+    up to chunk_size rows, each written with its own stats rollup update and committed
+    on its own, so the rollup row is only locked for one chunk at a time. commit=False
+    leaves committing to the caller, e.g. from progress(done), which is called after
+    each chunk with the number of flights written so far. start= skips that many
+    flights (a previous run's last progress). The n-th user gets the same flights for
+    the same seed and end date. Returns the number of rows inserted.
+    """
+    generator = FlightGenerator(end_date, years)
+    created_at = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S.%f')
+    inserted = 0
+    for number, user_id in enumerate(user_ids):
+        done = number * flights_per_user
+        if start >= done + flights_per_user:
+            continue
+        skip = max(start - done, 0)
+        flights = itertools.islice(generator.flights(seed, number, flights_per_user), skip, None)
+        done += skip
+        while True:
+            rows = list(itertools.islice(flights, chunk_size))
+            if not rows:
+                break
+            stats = lock_user_stats(user_id)
+            change_seq = stats.data_version
+            # The rollup and leaderboards only depend on these values, so count rows per distinct combination
+            groups = {}
+            chunk = []
+            for flight in rows:
+                key = (flight[2], flight[3], flight[4], flight[5], flight[6], flight[11], flight[1], flight[9][:7])
+                groups[key] = groups.get(key, 0) + 1
+                chunk.append((user_id, *flight, None, True, created_at, created_at, change_seq))
+            bulk_insert_seed_flights(chunk)
+            apply_user_stats(stats, [
+                (SimpleNamespace(cabin_class=cabin_class, departure_code=departure_code,
+                                 departure_city=departure_city, arrival_code=arrival_code, arrival_city=arrival_city,
+                                 duration_minutes=duration_minutes, aircraft=aircraft,
+                                 flight_date=date.fromisoformat(month + '-01')), count)
+                for (cabin_class, departure_code, departure_city, arrival_code, arrival_city,
+                     duration_minutes, aircraft, month), count in groups.items()
+            ])
+            inserted += len(chunk)
+            done += len(chunk)
+            if commit:
+                db.session.commit()
+            if progress:
+                progress(done)
+    return inserted
+
+def create_seed_users(count, seed, password=None, password_hash=None, commit=True):
+    """
+    Create `count` synthetic users (seed<seed>-<n>@example.com) tagged is_seed and
+    return their ids. Without a password (or an already computed password_hash) the
+    accounts cannot log in. Raises PasswordHashBusy if the hashing pool is full.
+    commit=False leaves the commit to the caller.
+    """
+    emails = [f'seed{seed}-{n}@example.com' for n in range(count)]
+    if db.session.query(User.id).filter(User.email.in_(emails)).first():
+        raise ValueError(f'Seed users for seed {seed} already exist')
+    # One hash shared by every synthetic account; '!' never matches a password
+    if password_hash is None:
+        password_hash = hash_password(password) if password else '!'
+    users = [User(email=email, password_hash=password_hash, is_seed=True) for email in emails]
+    db.session.add_all(users)
+    db.session.flush()
+    # New accounts have no flights, so start them with an empty rollup rather than a rebuild
+    db.session.add_all(UserStats(user_id=user.id, **empty_rollup()) for user in users)
+    if commit:
+        db.session.commit()
+    return [user.id for user in users]
+
+def is_admin(user):
+    return user.is_authenticated and user.email.lower() in ADMIN_EMAILS
+
+@app.cli.command('seed-generate')
+@click.option('--users', default=1, show_default=True, help='Synthetic users to create.')
+@click.option('--flights', default=1000, show_default=True, help='Flights per user.')
+@click.option('--seed', default=1, show_default=True, help='Random seed; the same seed gives the same data.')
+@click.option('--email', help='Add the flights to this existing account instead of creating users.')
+@click.option('--password', help='Password for the created users (default: login disabled).')
+@click.option('--years', default=3.0, show_default=True, help='Years of history to spread flights over.')
+@click.option('--end-date', type=click.DateTime(formats=['%Y-%m-%d']), help='Last possible flight date (default: today).')
+def seed_generate_command(users, flights, seed, email, password, years, end_date):
+    """Generate synthetic users and flights (tagged is_seed) at scale."""
+    if email:
+        user = User.query.filter_by(email=email.strip().lower()).first()
+        if user is None:
+            raise click.ClickException(f'No user with email {email}')
+        user_ids = [user.id]
+    else:
+        try:
+            user_ids = create_seed_users(users, seed, password)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        except PasswordHashBusy:
+            raise click.ClickException('Password hashing is busy; try again')
+
+    started = time.perf_counter()
+    inserted = generate_seed_flights(user_ids, flights, seed, end_date.date() if end_date else None, years)
+    elapsed = time.perf_counter() - started
+    click.echo(f'Inserted {inserted} flights for {len(user_ids)} user(s) in {elapsed:.1f}s '
+               f'({inserted / elapsed if elapsed else 0:,.0f} rows/s)')
+
 # Seed Data API
 @app.route('/api/seed/add', methods=['POST'])
 @login_required
 def add_seed_data():
-    """Add sample flight data for the user to explore the app"""
+    """
+    Add sample flight data for the user to explore the app. Admins (ADMIN_EMAILS) may
+    instead pass {"flights": M, "seed": S} to generate M synthetic flights for
+    themselves, or add "users": N to create N synthetic users with M flights each.
+    """
+    options = request.get_json(silent=True) or {}
+    if any(key in options for key in ('users', 'flights', 'seed')):
+        return generate_seed_data_response(options)
     try:
         # Check if user already has seed data
         existing_seed = Flight.query.filter_by(user_id=current_user.id, is_seed=True).first()
@@ -509,7 +2905,7 @@ def add_seed_data():
             return jsonify({'error': 'Sample data already exists. Remove it first before adding new sample data.'}), 400
         
         # Sample flights data
-        from datetime import date, time
+        from datetime import time
         sample_flights = [
             {
                 'flight_number': 'UA328',
@@ -580,6 +2976,7 @@ def add_seed_data():
         
         # Create flight records
         created_flights = []
+        stats = lock_user_stats(current_user.id)
         for flight_data in sample_flights:
             flight = Flight(
                 user_id=current_user.id,
@@ -594,42 +2991,84 @@ def add_seed_data():
                 departure_time=flight_data['departure_time'],
                 arrival_time=flight_data['arrival_time'],
                 notes=flight_data['notes'],
-                is_seed=True
+                is_seed=True,
+                change_seq=stats.data_version
             )
             
             # Calculate duration
-            flight.duration = calculate_flight_duration(flight.departure_time, flight.arrival_time)
+            flight.duration_minutes = calculate_flight_minutes(flight.departure_time, flight.arrival_time)
+            flight.duration = format_duration(flight.duration_minutes)
             
             db.session.add(flight)
             created_flights.append(flight)
         
+        update_user_stats(stats, created_flights, 1)
         db.session.commit()
         
-        return jsonify({
+        return json_response({
             'success': True,
             'message': f'Added {len(created_flights)} sample flights',
-            'flights': [f.to_dict() for f in created_flights]
-        }), 201
+            'flights': flight_serializer().objects(created_flights)
+        }, 201)
         
+    except AccountGone:
+        raise
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'Failed to add sample data: {str(e)}'}), 500
 
+def generate_seed_data_response(options):
+    if not is_admin(current_user):
+        return jsonify({'error': 'Generating synthetic data requires an admin account'}), 403
+    try:
+        flights = int(options.get('flights', 100))
+        users = int(options['users']) if options.get('users') is not None else None
+        seed = int(options.get('seed', 1))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'users, flights and seed must be integers'}), 400
+    if flights < 1 or (users is not None and users < 1):
+        return jsonify({'error': 'users and flights must be positive'}), 400
+    if flights * (users or 1) > MAX_SEED_ROWS_PER_REQUEST:
+        return jsonify({'error': f'At most {MAX_SEED_ROWS_PER_REQUEST} flights per request; use flask seed-generate for more'}), 400
+
+    # The password is hashed now so it is never stored on the job
+    try:
+        password_hash = hash_password(options['password']) if options.get('password') else None
+    except PasswordHashBusy:
+        return busy_response()
+    payload = {'users': users, 'flights': flights, 'seed': seed, 'password_hash': password_hash}
+    return job_accepted(enqueue_job(current_user.id, 'seed_generate', payload,
+                                    request.headers.get('Idempotency-Key')))
+
+def remove_seed_flights(user_id):
+    """
+    Delete a user's seed flights with one DELETE and take them out of the stats
+    rollup using grouped counts, without loading the rows. Returns the number
+    deleted. The caller commits.
+    """
+    seed_flights = Flight.query.filter_by(user_id=user_id, is_seed=True)
+    groups = grouped_flights(seed_flights)
+    if not groups:
+        return 0
+    stats = lock_user_stats(user_id)
+    db.session.execute(db.insert(FlightTombstone).from_select(
+        ['user_id', 'flight_id', 'change_seq', 'deleted_at'],
+        db.select(Flight.user_id, Flight.id, db.literal(stats.data_version), db.literal(datetime.utcnow()))
+        .where(Flight.user_id == user_id, Flight.is_seed == True)))
+    deleted = db.session.execute(
+        db.delete(Flight).where(Flight.user_id == user_id, Flight.is_seed == True)
+    ).rowcount
+    apply_user_stats(stats, [(flight, -count) for flight, count in groups])
+    return deleted
+
 @app.route('/api/seed/remove', methods=['DELETE'])
 @login_required
 def remove_seed_data():
     """Remove all seed data for the current user"""
     try:
-        # Find and delete all seed flights for the current user
-        seed_flights = Flight.query.filter_by(user_id=current_user.id, is_seed=True).all()
-        
-        if not seed_flights:
+        count = remove_seed_flights(current_user.id)
+        if not count:
             return jsonify({'error': 'No sample data found to remove'}), 404
-        
-        count = len(seed_flights)
-        for flight in seed_flights:
-            db.session.delete(flight)
-        
         db.session.commit()
         
         return jsonify({
@@ -637,10 +3076,387 @@ def remove_seed_data():
             'message': f'Removed {count} sample flights'
         })
         
+    except AccountGone:
+        raise
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'Failed to remove sample data: {str(e)}'}), 500
 
+@app.cli.command('seed-remove')
+def seed_remove_command():
+    """Delete synthetic users (with their flights) and every user's seed flights."""
+    users = db.session.execute(db.delete(User).where(User.is_seed == True)).rowcount
+    db.session.commit()
+    user_ids = [user_id for (user_id,) in
+                db.session.query(Flight.user_id).filter(Flight.is_seed == True).distinct()]
+    flights = 0
+    for user_id in user_ids:
+        flights += remove_seed_flights(user_id)
+        db.session.commit()
+    # A mass removal empties the tracked top keys, so recompute rather than subtract
+    rebuild_leaderboards()
+    click.echo(f'Deleted {users} synthetic user(s) and {flights} seed flight(s) from {len(user_ids)} other user(s)')
+
+# Background jobs
+# Heavy per-user work (?async=1 imports, stats rebuilds, bulk seed generation) is
+# queued in the job table and run by `flask worker`, a separate process, so request
+# workers stay free. The request returns 202 with the job, which the client polls at
+# /api/jobs/<id>. Long handlers (imports, seed generation) commit their writes in
+# chunks with checkpoint_job, together with a cursor in job.progress and the totals
+# so far in job.result, so a user's stats row is only locked for one chunk at a time
+# and a retry carries on after the last checkpoint. Whatever is left commits in the
+# same transaction that marks the job succeeded.
+# While a job runs its worker refreshes locked_at as a heartbeat (every checkpoint
+# does too); a job whose heartbeat stops is claimed again, and a run that has lost
+# its claim that way rolls back instead of committing.
+JOB_POLL_SECONDS = float(os.environ.get('JOB_POLL_SECONDS', 1))
+JOB_RETRY_SECONDS = int(os.environ.get('JOB_RETRY_SECONDS', 30))   # Doubles with each attempt
+JOB_HEARTBEAT_SECONDS = float(os.environ.get('JOB_HEARTBEAT_SECONDS', 30))
+JOB_TIMEOUT = int(os.environ.get('JOB_TIMEOUT', 300))              # No heartbeat for longer = worker died; run again
+
+JOB_HANDLERS = {}
+
+def job_handler(kind):
+    """Register handler(job) -> result for a job kind. Handlers only commit through checkpoint_job."""
+    def decorator(handler):
+        JOB_HANDLERS[kind] = handler
+        return handler
+    return decorator
+
+def enqueue_job(user_id, kind, payload, idempotency_key=None):
+    """Queue a job and commit. With an idempotency key, a repeated request gets the existing job."""
+    if idempotency_key:
+        existing = Job.query.filter_by(user_id=user_id, idempotency_key=idempotency_key).first()
+        if existing:
+            return existing
+    job = Job(user_id=user_id, kind=kind, payload=payload, idempotency_key=idempotency_key)
+    db.session.add(job)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent request with the same key got there first
+        db.session.rollback()
+        return Job.query.filter_by(user_id=user_id, idempotency_key=idempotency_key).one()
+    return job
+
+def job_accepted(job):
+    """202 response pointing at the job's status URL"""
+    response = jsonify(job.to_dict())
+    response.status_code = 202
+    response.headers['Location'] = url_for('get_job', job_id=job.id)
+    return response
+
+class JobSuperseded(Exception):
+    """Raised when another worker has claimed the running job since this attempt started"""
+
+def claimed_by(job_id, worker_id, attempt):
+    """Condition matching a job only while this worker's attempt still holds it"""
+    return db.and_(Job.id == job_id, Job.status == 'running', Job.locked_by == worker_id, Job.attempts == attempt)
+
+def hold_job(job, **values):
+    """
+    Lock the job row for this attempt's transaction and refresh its locked_at (plus
+    any other values). Rolls back and raises JobSuperseded if the attempt lost its claim.
+    """
+    worker_id, attempt = job.claim  # Set by run_job; the row itself may now say otherwise
+    held = db.session.execute(
+        db.update(Job).where(claimed_by(job.id, worker_id, attempt))
+        .values(locked_at=datetime.utcnow(), **values)
+        .execution_options(synchronize_session=False)
+    ).rowcount == 1
+    if not held:
+        db.session.rollback()
+        raise JobSuperseded()
+
+def checkpoint_job(job, progress, result, total=None):
+    """Commit a handler's writes so far with its cursor (job.progress) and totals (job.result)"""
+    hold_job(job, progress=progress, result=result, total=total)
+    db.session.commit()
+
+def start_heartbeat(job_id, worker_id, attempt):
+    """
+    Refresh the job's locked_at every JOB_HEARTBEAT_SECONDS on a separate connection
+    until the returned event is set. Not used on SQLite, where that write would wait
+    on the job's own write lock; checkpoints are its only heartbeat there.
+    """
+    stop = threading.Event()
+    if db.engine.dialect.name == 'sqlite':
+        return stop, None
+
+    def beat():
+        with app.app_context():
+            while not stop.wait(JOB_HEARTBEAT_SECONDS):
+                try:
+                    with db.engine.begin() as connection:
+                        connection.execute(db.update(Job).where(claimed_by(job_id, worker_id, attempt))
+                                           .values(locked_at=datetime.utcnow()))
+                except Exception:
+                    app.logger.exception('Heartbeat for job %s failed', job_id)
+
+    thread = threading.Thread(target=beat, name=f'job-{job_id}-heartbeat', daemon=True)
+    thread.start()
+    return stop, thread
+
+def claim_job(worker_id):
+    """Take the oldest due job (or one whose heartbeat stopped) and mark it running. Returns it or None."""
+    now = datetime.utcnow()
+    job = (Job.query
+           .filter(db.or_(db.and_(Job.status == 'queued', Job.run_at <= now),
+                          db.and_(Job.status == 'running', Job.locked_at < now - timedelta(seconds=JOB_TIMEOUT))))
+           .order_by(Job.run_at, Job.id)
+           .with_for_update(skip_locked=True)
+           .first())
+    if job is None:
+        db.session.rollback()
+        return None
+    if job.status == 'running' and job.attempts >= job.max_attempts:
+        # Its worker died on every attempt; don't let it take down another
+        job.status = 'failed'
+        job.error = 'The worker stopped while running this job'
+        job.finished_at = now
+        db.session.commit()
+        return claim_job(worker_id)
+    job.status = 'running'
+    job.attempts += 1
+    job.locked_at = now
+    job.locked_by = worker_id
+    db.session.commit()
+    return job
+
+def run_job(job):
+    """Run a claimed job and record the outcome. Returns the final status."""
+    job_id, worker_id, attempt = job.id, job.locked_by, job.attempts
+    job.claim = (worker_id, attempt)
+    stop_heartbeat, heartbeat = start_heartbeat(job_id, worker_id, attempt)
+    try:
+        try:
+            handler = JOB_HANDLERS.get(job.kind)
+            if handler is None:
+                raise ValueError(f'Unknown job kind: {job.kind}')
+            result = handler(job)
+            hold_job(job)
+            job.status = 'succeeded'
+            job.result = result
+            job.error = None
+            # Uploaded data is only needed until it has been processed
+            job.payload = {key: value for key, value in job.payload.items() if key != 'data'}
+            job.finished_at = datetime.utcnow()
+            job.locked_at = None
+            db.session.commit()
+            return job.status
+        except JobSuperseded:
+            raise
+        except Exception as e:
+            db.session.rollback()
+            app.logger.exception('Job %s (%s) failed', job_id, job.kind)
+            hold_job(job)
+            job = db.session.get(Job, job_id)
+            job.error = str(e)
+            job.locked_at = None
+            # Bad input will not get better on a retry
+            if isinstance(e, ValueError) or job.attempts >= job.max_attempts:
+                job.status = 'failed'
+                job.finished_at = datetime.utcnow()
+            else:
+                job.status = 'queued'
+                job.run_at = datetime.utcnow() + timedelta(seconds=JOB_RETRY_SECONDS * 2 ** (job.attempts - 1))
+            db.session.commit()
+            return job.status
+    except JobSuperseded:
+        app.logger.warning('Job %s was claimed by another worker; discarding this attempt', job_id)
+        return db.session.get(Job, job_id).status
+    finally:
+        stop_heartbeat.set()
+        if heartbeat is not None:
+            heartbeat.join()
+
+@job_handler('import')
+def run_import_job(job):
+    data, import_format = job.payload['data'], job.payload['format']
+    if not job.progress:
+        # Chunks commit as they go, so find problems with the file as a whole first
+        check_import_rows(io.StringIO(data, newline=''), import_format)
+    resume = (job.progress, job.result) if job.progress else None
+    return import_flight_rows(job.user_id, io.StringIO(data, newline=''), import_format, resume=resume,
+                              progress=lambda rows, totals: checkpoint_job(job, rows, totals))
+
+@job_handler('rebuild_stats')
+def run_rebuild_stats_job(job):
+    stats = rebuild_user_stats(job.user_id)
+    return {'total_flights': stats.total_flights}
+
+@job_handler('seed_generate')
+def run_seed_generate_job(job):
+    options = job.payload
+    if job.result and 'user_ids' in job.result:
+        user_ids = job.result['user_ids']  # Created by an earlier attempt
+    elif options.get('users'):
+        user_ids = create_seed_users(options['users'], options['seed'],
+                                     password_hash=options.get('password_hash'), commit=False)
+    else:
+        user_ids = [job.user_id]
+    total = len(user_ids) * options['flights']
+    start = job.progress or 0
+    checkpoint_job(job, start, {'inserted': start, 'user_ids': user_ids}, total)
+    generate_seed_flights(user_ids, options['flights'], options['seed'], commit=False, start=start,
+                          progress=lambda done: checkpoint_job(job, done, {'inserted': done, 'user_ids': user_ids},
+                                                               total))
+    return {'inserted': total, 'user_ids': user_ids}
+
+@app.route('/api/jobs/<int:job_id>', methods=['GET'])
+@login_required
+def get_job(job_id):
+    job = Job.query.filter_by(id=job_id, user_id=current_user.id).first()
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+@app.cli.command('worker')
+@click.option('--burst', is_flag=True, help='Exit once the queue is empty instead of waiting for more jobs')
+def worker_command(burst):
+    """Run queued background jobs until stopped (SIGTERM finishes the current job first)."""
+    worker_id = f'{socket.gethostname()}:{os.getpid()}'
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.set())
+    click.echo(f'Worker {worker_id} waiting for jobs')
+    while not stopping.is_set():
+        job = claim_job(worker_id)
+        if job is None:
+            if burst:
+                break
+            stopping.wait(JOB_POLL_SECONDS)
+            continue
+        started = time.perf_counter()
+        status = run_job(job)
+        click.echo(f'Job {job.id} ({job.kind}) {status} in {time.perf_counter() - started:.1f}s')
+
+# Database migrations
+# Numbered PostgreSQL scripts in migrations/ are applied in order and recorded in
+# schema_migrations. The app itself never runs DDL at startup.
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+def migration_files():
+    """Return [(version, path)] for every migration script, in order"""
+    files = sorted(name for name in os.listdir(MIGRATIONS_DIR) if name.endswith('.sql'))
+    return [(name.split('_', 1)[0], os.path.join(MIGRATIONS_DIR, name)) for name in files]
+
+def ensure_migrations_table(conn):
+    conn.exec_driver_sql(
+        'CREATE TABLE IF NOT EXISTS schema_migrations ('
+        'version VARCHAR(32) PRIMARY KEY, applied_at TIMESTAMP NOT NULL)'
+    )
+
+def applied_migrations(conn):
+    return {version for (version,) in conn.exec_driver_sql('SELECT version FROM schema_migrations')}
+
+def record_migration(conn, version):
+    conn.execute(db.text('INSERT INTO schema_migrations (version, applied_at) VALUES (:version, :applied_at)'),
+                 {'version': version, 'applied_at': datetime.utcnow()})
+
+@app.cli.command('db-upgrade')
+@click.option('--sql', 'offline', is_flag=True, help='Print the migration SQL instead of running it (offline mode)')
+def db_upgrade_command(offline):
+    """Apply pending schema migrations."""
+    if offline:
+        # Every script is idempotent, so the full script can be piped into psql
+        click.echo('CREATE TABLE IF NOT EXISTS schema_migrations '
+                   '(version VARCHAR(32) PRIMARY KEY, applied_at TIMESTAMP NOT NULL);\n')
+        for version, path in migration_files():
+            with open(path) as f:
+                click.echo(f'-- {os.path.basename(path)}\nBEGIN;\n{f.read().strip()}')
+            click.echo(f"INSERT INTO schema_migrations (version, applied_at) VALUES ('{version}', now()) "
+                       f"ON CONFLICT (version) DO NOTHING;\nCOMMIT;\n")
+        return
+
+    with db.engine.begin() as conn:
+        ensure_migrations_table(conn)
+        applied = applied_migrations(conn)
+    pending = [(version, path) for version, path in migration_files() if version not in applied]
+
+    if db.engine.dialect.name != 'postgresql':
+        # The scripts are PostgreSQL-only; build local databases (e.g. SQLite) from the models
+        db.create_all()
+        with db.engine.begin() as conn:
+            if db.engine.dialect.name == 'sqlite' and not ensure_sqlite_search_index(conn):
+                click.echo('SQLite has no FTS5: flight search will scan instead of using an index')
+            for version, _ in pending:
+                record_migration(conn, version)
+        click.echo(f'Created schema from models and marked {len(pending)} migration(s) as applied')
+        return
+
+    for version, path in pending:
+        with open(path) as f:
+            sql = f.read()
+        with db.engine.begin() as conn:
+            conn.exec_driver_sql(sql)
+            record_migration(conn, version)
+        click.echo(f'Applied {os.path.basename(path)}')
+    click.echo(f'Database is up to date ({len(pending)} migration(s) applied)')
+
+@app.cli.command('explain-routes')
+@click.option('--user-id', type=int, required=True, help='User whose flights the routes are run against')
+def explain_routes_command(user_id):
+    """
+    Run the per-user read routes for a user, EXPLAIN every query they issue
+    against the flight table, and fail if any of them scans the whole table.
+    """
+    user = db.session.get(User, user_id)
+    if user is None:
+        raise click.ClickException(f'User {user_id} not found')
+    some_flight = Flight.query.filter_by(user_id=user_id).first()
+
+    statements = []
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM flight' in statement:
+            statements.append((statement, parameters))
+
+    requests_to_run = [
+        ('/api/flights', get_flights, {}),
+        ('/api/flights?limit=20', get_flights, {}),
+        ('/api/flights?limit=20&q=a', get_flights, {}),
+        ('/api/flights?limit=20&departure=JFK', get_flights, {}),
+        ('/api/flights?limit=20&arrival=LHR', get_flights, {}),
+        ('/api/flights/0', get_flight, {'flight_id': some_flight.id if some_flight else 0}),
+        (f'/api/flights/changes?since={encode_change_token(0, 0)}', get_flight_changes, {}),
+    ]
+    db.event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        for path, view, kwargs in requests_to_run:
+            with app.test_request_context(path):
+                login_user(user)
+                view(**kwargs)
+        # get_stats reads the rollup; the per-user scans happen when it is rebuilt
+        aggregate_user_stats(user_id)
+        # The seed routes' lookups
+        Flight.query.filter_by(user_id=user_id, is_seed=True).first()
+    finally:
+        db.event.remove(db.engine, 'before_cursor_execute', capture)
+        db.session.rollback()
+
+    postgres = db.engine.dialect.name == 'postgresql'
+    failures = 0
+    connection = db.engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        if postgres:
+            # Tiny tables are always cheaper to seq scan; check the index can serve the query
+            cursor.execute('SET enable_seqscan = off')
+        for statement, parameters in statements:
+            cursor.execute(('EXPLAIN ' if postgres else 'EXPLAIN QUERY PLAN ') + statement, parameters)
+            plan = [' '.join(str(col) for col in row) for row in cursor.fetchall()]
+            full_scan = any(('Seq Scan on flight' in line) if postgres else
+                            re.search(r'\bSCAN flight\b(?! USING)', line) for line in plan)
+            failures += bool(full_scan)
+            click.echo(('FULL SCAN  ' if full_scan else 'index      ') + ' '.join(statement.split()))
+            for line in plan:
+                click.echo(f'    {line}')
+    finally:
+        connection.close()
+
+    if failures:
+        raise click.ClickException(f'{failures} of {len(statements)} queries scan the whole flight table')
+    click.echo(f'All {len(statements)} flight queries use an index')
+
 if __name__ == '__main__':
     debug_mode = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
     port = int(os.environ.get('PORT', 5001))  # Changed default from 5000 to 5001
@@ -0,0 +1,168 @@
+"""
+Static asset build: content-hashed file names and precompressed variants.
+
+The source files live in static/. The build writes dist/ with:
+  - every script and stylesheet copied to a fingerprinted name
+    (js/app.js -> js/app.<hash>.js) so it can be cached forever
+  - every HTML page with its /static/... references rewritten to the
+    fingerprinted names
+  - .gz (and .br, when the optional brotli package is installed) next to each
+    file, compressed once at build time instead of on every request
+  - manifest.json describing all of the above for the server
+
+Run the build after changing anything in static/ (and as part of deploys):
+    python assets.py
+Without dist/ the app serves static/ directly, uncompressed.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIR = os.path.join(ROOT_DIR, 'static')
+DIST_DIR = os.path.join(ROOT_DIR, 'dist')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+
+FINGERPRINTED_EXTENSIONS = ('.js', '.css', '.svg', '.png', '.jpg', '.webp', '.woff2', '.ico')
+COMPRESSIBLE_EXTENSIONS = ('.html', '.js', '.css', '.svg', '.json')
+# Files smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 512
+
+STATIC_REFERENCE = re.compile(r'''(["'])/static/([^"'?#]+)''')
+
+# Encodings in order of preference, with the file suffix the build writes
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def fingerprint(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def fingerprinted_name(name, digest):
+    base, ext = os.path.splitext(name)
+    return f'{base}.{digest[:12]}{ext}'
+
+
+def _write_variants(path, data):
+    """Write a file and its precompressed variants; returns the encodings written"""
+    with open(path, 'wb') as f:
+        f.write(data)
+    encodings = []
+    if not path.endswith(COMPRESSIBLE_EXTENSIONS) or len(data) < MIN_COMPRESS_SIZE:
+        return encodings
+    if brotli is not None:
+        compressed = brotli.compress(data, quality=11)
+        if len(compressed) < len(data):
+            with open(path + '.br', 'wb') as f:
+                f.write(compressed)
+            encodings.append('br')
+    # mtime=0 keeps the output byte-identical between builds
+    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(compressed) < len(data):
+        with open(path + '.gz', 'wb') as f:
+            f.write(compressed)
+        encodings.append('gzip')
+    return encodings
+
+
+def build(source_dir=SOURCE_DIR, dist_dir=DIST_DIR):
+    """Build dist/ from static/. Returns the manifest."""
+    sources = []
+    for folder, _, files in os.walk(source_dir):
+        for filename in files:
+            path = os.path.join(folder, filename)
+            sources.append(os.path.relpath(path, source_dir).replace(os.sep, '/'))
+    sources.sort()
+
+    if os.path.isdir(dist_dir):
+        shutil.rmtree(dist_dir)
+    os.makedirs(dist_dir)
+
+    files = {}
+    contents = {}
+    for name in sources:
+        with open(os.path.join(source_dir, name), 'rb') as f:
+            contents[name] = f.read()
+
+    # Assets first, so pages can point at their fingerprinted names
+    renamed = {}
+    for name in sources:
+        if name.endswith(FINGERPRINTED_EXTENSIONS):
+            renamed[name] = fingerprinted_name(name, fingerprint(contents[name]))
+
+    def rewrite(match):
+        target = renamed.get(match.group(2))
+        return f'{match.group(1)}/static/{target}' if target else match.group(0)
+
+    for name in sources:
+        data = contents[name]
+        if name.endswith('.html'):
+            data = STATIC_REFERENCE.sub(rewrite, data.decode('utf-8')).encode('utf-8')
+        output = renamed.get(name, name)
+        path = os.path.join(dist_dir, output)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        files[name] = {
+            'path': output,
+            'etag': fingerprint(data)[:16],
+            'immutable': name in renamed,
+            'encodings': _write_variants(path, data),
+        }
+
+    manifest = {'files': files}
+    with open(os.path.join(dist_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+class AssetManifest:
+    """Lookups over a built manifest, by source name or by fingerprinted name"""
+
+    def __init__(self, manifest, dist_dir=DIST_DIR):
+        self.dist_dir = dist_dir
+        self.files = manifest['files']
+        self._by_output = {entry['path']: entry for entry in self.files.values() if entry['immutable']}
+
+    @classmethod
+    def load(cls, dist_dir=DIST_DIR):
+        """Load dist/manifest.json, or return None if the assets have not been built"""
+        path = os.path.join(dist_dir, 'manifest.json')
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return cls(json.load(f), dist_dir)
+
+    def get(self, name):
+        """Entry for a source name (index.html, js/app.js) or a fingerprinted name"""
+        return self._by_output.get(name) or self.files.get(name)
+
+    def url(self, name):
+        """Public URL of a source asset, e.g. /static/js/app.<hash>.js"""
+        entry = self.files.get(name)
+        return f'/static/{entry["path"] if entry else name}'
+
+
+def select_encoding(entry, accept_encodings):
+    """
+    Pick the best precompressed variant the client accepts.
+    Returns (encoding or None, file suffix).
+    """
+    for encoding, suffix in ENCODINGS:
+        if encoding in entry['encodings'] and accept_encodings[encoding]:
+            return encoding, suffix
+    return None, ''
+
+
+if __name__ == '__main__':
+    result = build()
+    files = result['files']
+    print(f'Built {len(files)} files into {DIST_DIR} '
+          f'({sum(1 for e in files.values() if e["immutable"])} fingerprinted, '
+          f'brotli {"on" if brotli else "off - pip install brotli to enable"})')
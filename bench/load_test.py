@@ -0,0 +1,274 @@
+"""
+Load test the API: start the app against a local database, create synthetic
+users with flight histories, then drive the main routes concurrently and report
+throughput and p50/p95/p99 latency per endpoint as JSON.
+
+    python bench/load_test.py --users 4 --flights 5000 --concurrency 8 --duration 30 --output run.json
+    python bench/load_test.py ... --compare run.json     # print deltas against an earlier run
+
+By default it uses a throwaway SQLite file. Pass --database-url to run against a
+local PostgreSQL database; it is migrated and filled with bench users, so use one
+you can throw away. Data generation is seeded, so runs with the same options
+test the same data.
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import date
+from http.cookiejar import CookieJar
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+AIRPORTS = ['ATL', 'LAX', 'ORD', 'DFW', 'DEN', 'JFK', 'SFO', 'SEA', 'LAS', 'MCO',
+            'LHR', 'CDG', 'AMS', 'FRA', 'MAD', 'DXB', 'HND', 'SIN', 'SYD', 'YYZ']
+CABIN_CLASSES = ['Economy', 'Premium Economy', 'Business', 'First']
+PASSWORD = 'benchmark-password'
+
+# (endpoint name, share of requests)
+MIX = [
+    ('GET /api/flights', 0.4),
+    ('GET /api/stats', 0.3),
+    ('POST /api/flights', 0.2),
+    ('POST /api/auth/login', 0.1),
+]
+
+
+def synthetic_flight(rng, day):
+    departure, arrival = rng.sample(AIRPORTS, 2)
+    hour, minute = rng.randrange(6, 22), rng.choice((0, 15, 30, 45))
+    length = rng.randrange(45, 16 * 60, 5)
+    arrival_minutes = hour * 60 + minute + length
+    return {
+        'flight_number': f'{rng.choice(["UA", "DL", "AA", "BA", "LH", "EK"])}{rng.randrange(1, 9999)}',
+        'aircraft': rng.choice(['Boeing 737-800', 'Airbus A320', 'Boeing 787-9', 'Airbus A350-900']),
+        'cabin_class': rng.choice(CABIN_CLASSES),
+        'departure_code': departure,
+        'arrival_code': arrival,
+        'flight_date': day.isoformat(),
+        'departure_time': f'{hour:02d}:{minute:02d}',
+        'arrival_time': f'{arrival_minutes // 60 % 24:02d}:{arrival_minutes % 60:02d}',
+    }
+
+
+def create_dataset(users, flights, seed):
+    """Migrate the database and create bench users with `flights` synthetic flights each"""
+    import app as soarrr
+
+    result = soarrr.app.test_cli_runner().invoke(args=['db-upgrade'])
+    if result.exit_code != 0:
+        raise SystemExit(result.output)
+
+    emails = [f'seed{seed}-{n}@example.com' for n in range(users)]
+    with soarrr.app.app_context():
+        # Same seed, same users: reuse them when pointed at an existing database
+        if not soarrr.User.query.filter_by(email=emails[0]).first():
+            user_ids = soarrr.create_seed_users(users, seed, PASSWORD)
+            soarrr.generate_seed_flights(user_ids, flights, seed)
+    return emails
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(env, port, gunicorn_workers):
+    if gunicorn_workers:
+        command = [sys.executable, '-m', 'gunicorn', '--workers', str(gunicorn_workers), '--threads', '4',
+                   '--bind', f'127.0.0.1:{port}', 'app:app']
+    else:
+        command = [sys.executable, '-m', 'flask', '--app', 'app', 'run', '--port', str(port),
+                   '--with-threads', '--no-reload', '--no-debugger']
+    server = subprocess.Popen(command, cwd=ROOT_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/login', timeout=1).read()
+            return server
+        except OSError:
+            if server.poll() is not None:
+                raise SystemExit('The app server exited during startup')
+            time.sleep(0.2)
+    server.terminate()
+    raise SystemExit('The app server did not start within 30 seconds')
+
+
+class Client:
+    def __init__(self, base_url, email):
+        self.base_url = base_url
+        self.email = email
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()))
+
+    def request(self, method, path, body=None):
+        """Send a request and return (status, seconds)"""
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                         headers={'Content-Type': 'application/json'})
+        start = time.perf_counter()
+        try:
+            with self.opener.open(request, timeout=60) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            status = e.code
+        except OSError:
+            status = 0
+        return status, time.perf_counter() - start
+
+    def login(self):
+        return self.request('POST', '/api/auth/login', {'email': self.email, 'password': PASSWORD})
+
+
+def run_worker(client, rng, deadline, results):
+    endpoints = [name for name, _ in MIX]
+    weights = [share for _, share in MIX]
+    client.login()
+    while time.monotonic() < deadline:
+        endpoint = rng.choices(endpoints, weights)[0]
+        if endpoint == 'GET /api/flights':
+            status, seconds = client.request('GET', '/api/flights?limit=50')
+        elif endpoint == 'GET /api/stats':
+            status, seconds = client.request('GET', '/api/stats')
+        elif endpoint == 'POST /api/flights':
+            status, seconds = client.request('POST', '/api/flights', synthetic_flight(rng, date.today()))
+        else:
+            status, seconds = client.login()
+        results.append((endpoint, status, seconds))
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(fraction * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(results, elapsed):
+    endpoints = {}
+    for name, _ in MIX:
+        samples = [(status, seconds) for endpoint, status, seconds in results if endpoint == name]
+        latencies = sorted(seconds * 1000 for _, seconds in samples)
+        statuses = {}
+        for status, _ in samples:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        endpoints[name] = {
+            'requests': len(samples),
+            'errors': sum(1 for status, _ in samples if not 200 <= status < 400),
+            'statuses': statuses,
+            'throughput_rps': round(len(samples) / elapsed, 2),
+            'mean_ms': round(sum(latencies) / len(latencies), 2) if latencies else None,
+            'p50_ms': round(percentile(latencies, 0.50), 2) if latencies else None,
+            'p95_ms': round(percentile(latencies, 0.95), 2) if latencies else None,
+            'p99_ms': round(percentile(latencies, 0.99), 2) if latencies else None,
+            'max_ms': round(latencies[-1], 2) if latencies else None,
+        }
+    return endpoints
+
+
+def print_report(report, baseline=None):
+    columns = ('requests', 'errors', 'throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms')
+    print(f'{"endpoint":<22}' + ''.join(f'{column:>16}' for column in columns), file=sys.stderr)
+    for name, stats in report['endpoints'].items():
+        cells = []
+        for column in columns:
+            value = stats[column]
+            cell = '-' if value is None else f'{value:g}'
+            previous = (baseline or {}).get('endpoints', {}).get(name, {}).get(column)
+            if value is not None and previous:
+                cell += f' ({(value - previous) / previous:+.0%})'
+            cells.append(f'{cell:>16}')
+        print(f'{name:<22}' + ''.join(cells), file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', help='Database to use (default: a throwaway SQLite file)')
+    parser.add_argument('--users', type=int, default=4, help='Synthetic users (default: 4)')
+    parser.add_argument('--flights', type=int, default=1000, help='Flights per user, 10 to 50000 (default: 1000)')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients (default: 8)')
+    parser.add_argument('--duration', type=float, default=20, help='Seconds to drive load (default: 20)')
+    parser.add_argument('--seed', type=int, default=1, help='Seed for data and request mix (default: 1)')
+    parser.add_argument('--gunicorn-workers', type=int, default=0,
+                        help='Serve with gunicorn and this many workers instead of the Flask server')
+    parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+    parser.add_argument('--compare', help='Earlier JSON report to show deltas against')
+    args = parser.parse_args()
+    if not 10 <= args.flights <= 50000:
+        parser.error('--flights must be between 10 and 50000')
+
+    database_url = args.database_url or f'sqlite:///{os.path.join(tempfile.mkdtemp(), "load_test.db")}'
+    os.environ['DATABASE_URL'] = database_url
+    os.environ.setdefault('SECRET_KEY', 'bench')
+    sys.path.insert(0, ROOT_DIR)
+
+    started = time.perf_counter()
+    emails = create_dataset(args.users, args.flights, args.seed)
+    print(f'Created {args.users} users x {args.flights} flights in {time.perf_counter() - started:.1f}s',
+          file=sys.stderr)
+
+    port = free_port()
+    server = start_server(dict(os.environ), port, args.gunicorn_workers)
+    try:
+        base_url = f'http://127.0.0.1:{port}'
+        results = []
+        deadline = time.monotonic() + args.duration
+        workers = [
+            threading.Thread(target=run_worker, args=(Client(base_url, emails[i % len(emails)]),
+                                                      random.Random(f'{args.seed}:worker:{i}'),
+                                                      deadline, results))
+            for i in range(args.concurrency)
+        ]
+        started = time.monotonic()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.monotonic() - started
+    finally:
+        server.terminate()
+        server.wait()
+
+    report = {
+        'config': {
+            'database': database_url.split(':', 1)[0],
+            'users': args.users,
+            'flights_per_user': args.flights,
+            'concurrency': args.concurrency,
+            'duration_seconds': args.duration,
+            'seed': args.seed,
+            'server': f'gunicorn x{args.gunicorn_workers}' if args.gunicorn_workers else 'flask',
+        },
+        'elapsed_seconds': round(elapsed, 2),
+        'total_requests': len(results),
+        'endpoints': summarize(results, elapsed),
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
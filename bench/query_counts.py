@@ -0,0 +1,73 @@
+"""
+Count the SQL queries each authenticated API request issues, with the identity
+restored from the session (the normal path) and with it removed from the session
+so Flask-Login has to look the user up (the old behaviour).
+
+Runs the app in-process against a throwaway SQLite database:
+    python bench/query_counts.py
+"""
+import os
+import re
+import sys
+import tempfile
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), 'query_counts.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+os.environ.setdefault('SECRET_KEY', 'bench')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event  # noqa: E402
+
+import app as soarrr  # noqa: E402
+
+REQUESTS = [
+    ('GET', '/api/auth/status'),
+    ('GET', '/api/flights'),
+    ('GET', '/api/flights?limit=20'),
+    ('GET', '/api/stats'),
+    ('GET', '/api/map/routes'),
+    ('POST', '/api/flights'),
+]
+
+
+USER_QUERY = re.compile(r'FROM "?user"?\s')
+
+
+def count_queries(client, statements, method, path, session_identity):
+    if not session_identity:
+        with client.session_transaction() as session:
+            session.pop('_identity', None)
+    # Skip the response cache so every request does its real work
+    soarrr.response_cache.local = soarrr.LRUCache(soarrr.response_cache.local.max_entries)
+    statements.clear()
+    if method == 'POST':
+        client.post(path, json={'departure_code': 'JFK', 'arrival_code': 'LHR'})
+    else:
+        client.get(path)
+    return len(statements), sum(1 for statement in statements if USER_QUERY.search(statement))
+
+
+def main():
+    result = soarrr.app.test_cli_runner().invoke(args=['db-upgrade'])
+    if result.exit_code != 0:
+        raise SystemExit(result.output)
+
+    client = soarrr.app.test_client()
+    client.post('/api/auth/signup', json={'email': 'bench@example.com', 'password': 'benchmark'})
+    client.post('/api/seed/add')
+
+    statements = []
+    with soarrr.app.app_context():
+        event.listen(soarrr.db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+
+    print(f'{"request":<28} {"session identity":>17} {"user lookup":>12}')
+    for method, path in REQUESTS:
+        with_identity, _ = count_queries(client, statements, method, path, session_identity=True)
+        without_identity, user_queries = count_queries(client, statements, method, path, session_identity=False)
+        print(f'{method + " " + path:<28} {with_identity:>17} {without_identity:>12}'
+              f'{"  (" + str(user_queries) + " on user)" if user_queries else ""}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Microbenchmark for flight serialization: the per-row to_dict-style conversion the
+API used before serialization.py, encoded by jsonify's provider, against
+serialization.py with the stdlib encoder and (when installed) orjson. Rows are
+synthetic tuples shaped like a GET /api/flights query result, so no database is
+needed.
+
+    python bench/serialization_bench.py --rows 5000 --repeat 20
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def synthetic_rows(count, fields):
+    # Named tuples, like the Row objects a column query returns
+    Row = namedtuple('Row', fields)
+    rng = random.Random(1)
+    start = date(2020, 1, 1)
+    rows = []
+    for n in range(count):
+        day = start + timedelta(days=rng.randrange(2000))
+        departure = datetime.combine(day, datetime.min.time()) + timedelta(minutes=rng.randrange(6 * 60, 22 * 60))
+        values = {
+            'id': n + 1,
+            'flight_number': f'BA{rng.randrange(1, 9999)}',
+            'aircraft': rng.choice(['Boeing 787-9', 'Airbus A320', 'Airbus A350-900']),
+            'cabin_class': rng.choice(['Economy', 'Business']),
+            'departure_code': 'LHR',
+            'departure_city': 'London, UK',
+            'arrival_code': 'JFK',
+            'arrival_city': 'New York, USA',
+            'departure_time': departure,
+            'arrival_time': departure + timedelta(minutes=rng.randrange(60, 900)),
+            'flight_date': day,
+            'duration': '7h 30m',
+            'notes': None if n % 3 else 'Window seat, smooth flight',
+            'is_seed': True,
+            'created_at': datetime(2024, 1, 1, 12, 0, 0, rng.randrange(1000000)),
+            'updated_at': datetime(2024, 1, 1, 12, 0, 0, rng.randrange(1000000)),
+        }
+        rows.append(Row(*(values[field] for field in fields)))
+    return rows
+
+
+def row_to_dict(row, fields):
+    """The old per-row conversion, kept here as the baseline"""
+    result = {}
+    for field in fields:
+        value = getattr(row, field)
+        if isinstance(value, (datetime, date)):
+            value = value.isoformat()
+        result[field] = value
+    return result
+
+
+def best_of(repeat, function):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=5000, help='Rows per response (default: 5000)')
+    parser.add_argument('--repeat', type=int, default=20, help='Runs per variant; the best is reported (default: 20)')
+    args = parser.parse_args()
+
+    os.environ.setdefault('DATABASE_URL', 'sqlite://')
+    os.environ.setdefault('SECRET_KEY', 'bench')
+    sys.path.insert(0, ROOT_DIR)
+    import app as soarrr
+    import serialization
+
+    fields = soarrr.FLIGHT_FIELDS
+    rows = synthetic_rows(args.rows, fields)
+    stdlib_serializer = serialization.RowSerializer(fields, soarrr.FLIGHT_TEMPORAL_FIELDS, native_dates=False)
+    orjson_serializer = serialization.RowSerializer(fields, soarrr.FLIGHT_TEMPORAL_FIELDS, native_dates=True)
+
+    with soarrr.app.app_context():
+        variants = [
+            ('to_dict + jsonify', lambda: soarrr.app.json.dumps(
+                [row_to_dict(row, fields) for row in rows]).encode()),
+            ('RowSerializer + stdlib', lambda: serialization.stdlib_dumps(stdlib_serializer.rows(rows))),
+        ]
+        if serialization.orjson is not None:
+            variants.append(('RowSerializer + orjson', lambda: serialization.orjson_dumps(orjson_serializer.rows(rows))))
+
+        baseline = None
+        print(f'{args.rows} rows, best of {args.repeat}')
+        for name, function in variants:
+            seconds = best_of(args.repeat, function)
+            baseline = baseline or seconds
+            print(f'{name:<26}{seconds * 1000:9.2f} ms  {baseline / seconds:5.1f}x')
+        if serialization.orjson is None:
+            print('orjson is not installed - pip install orjson to compare it')
+
+
+if __name__ == '__main__':
+    main()
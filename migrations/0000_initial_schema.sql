@@ -0,0 +1,33 @@
+-- Initial schema: users and their flights.
+-- Uses IF NOT EXISTS so databases created by the old db.create_all() at
+-- startup can be brought under versioned migrations unchanged.
+
+CREATE TABLE IF NOT EXISTS "user" (
+    id SERIAL NOT NULL,
+    email VARCHAR(120) NOT NULL,
+    password_hash VARCHAR(200) NOT NULL,
+    created_at TIMESTAMP WITHOUT TIME ZONE,
+    PRIMARY KEY (id),
+    UNIQUE (email)
+);
+
+CREATE TABLE IF NOT EXISTS flight (
+    id SERIAL NOT NULL,
+    user_id INTEGER NOT NULL,
+    flight_number VARCHAR(20),
+    aircraft VARCHAR(100),
+    cabin_class VARCHAR(50),
+    departure_code VARCHAR(10),
+    departure_city VARCHAR(100),
+    arrival_code VARCHAR(10),
+    arrival_city VARCHAR(100),
+    departure_time TIMESTAMP WITHOUT TIME ZONE,
+    arrival_time TIMESTAMP WITHOUT TIME ZONE,
+    flight_date DATE,
+    duration VARCHAR(20),
+    notes TEXT,
+    is_seed BOOLEAN,
+    created_at TIMESTAMP WITHOUT TIME ZONE,
+    PRIMARY KEY (id),
+    FOREIGN KEY (user_id) REFERENCES "user" (id)
+);
@@ -0,0 +1,18 @@
+-- Add a numeric flight duration so stats can SUM() it instead of parsing
+-- the "7h 30m" display strings.
+--
+-- Apply with:  psql "$DATABASE_URL" -f migrations/0001_flight_duration_minutes.sql
+-- Then run:    flask --app app rebuild-stats
+
+ALTER TABLE flight ADD COLUMN IF NOT EXISTS duration_minutes INTEGER;
+
+-- Backfill from the stored times, matching calculate_flight_minutes:
+-- arrivals before departure are treated as next-day arrivals.
+UPDATE flight
+SET duration_minutes = TRUNC(EXTRACT(EPOCH FROM (
+        arrival_time - departure_time
+        + CASE WHEN arrival_time < departure_time THEN INTERVAL '1 day' ELSE INTERVAL '0' END
+    )) / 60)::INTEGER
+WHERE duration_minutes IS NULL
+  AND departure_time IS NOT NULL
+  AND arrival_time IS NOT NULL;
@@ -0,0 +1,15 @@
+-- Per-user statistics rollup maintained by the flight write paths.
+-- Populate it afterwards with:  flask --app app rebuild-stats
+
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_id INTEGER NOT NULL,
+    total_flights INTEGER NOT NULL,
+    total_minutes INTEGER NOT NULL,
+    class_counts JSON NOT NULL,
+    destination_counts JSON NOT NULL,
+    country_counts JSON NOT NULL,
+    monthly_counts JSON NOT NULL,
+    updated_at TIMESTAMP WITHOUT TIME ZONE,
+    PRIMARY KEY (user_id),
+    FOREIGN KEY (user_id) REFERENCES "user" (id)
+);
@@ -0,0 +1,11 @@
+-- Indexes for the per-user flight queries.
+
+-- Serves every "WHERE user_id = ?" query and matches the
+-- flight_date DESC NULLS LAST, id DESC order (and keyset cursor) of GET /api/flights.
+CREATE INDEX IF NOT EXISTS ix_flight_user_date
+    ON flight (user_id, flight_date DESC NULLS LAST, id DESC);
+
+-- Seed lookups and removal only ever touch seed rows.
+CREATE INDEX IF NOT EXISTS ix_flight_user_seed
+    ON flight (user_id)
+    WHERE is_seed;
@@ -0,0 +1,5 @@
+-- Great-circle miles in the stats rollup. Countries are now keyed by the
+-- airports' ISO codes, so rebuild every rollup afterwards:
+--     flask --app app rebuild-stats
+
+ALTER TABLE user_stats ADD COLUMN IF NOT EXISTS total_miles INTEGER NOT NULL DEFAULT 0;
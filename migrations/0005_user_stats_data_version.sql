@@ -0,0 +1,4 @@
+-- Per-user data version, bumped whenever a user's flights change.
+-- Cached per-user responses are keyed by it.
+
+ALTER TABLE user_stats ADD COLUMN IF NOT EXISTS data_version INTEGER NOT NULL DEFAULT 0;
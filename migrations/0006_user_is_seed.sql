@@ -0,0 +1,4 @@
+-- Synthetic users created by the seed generator (flask seed-generate), so they
+-- can be told apart from real accounts and removed with their flights.
+
+ALTER TABLE "user" ADD COLUMN IF NOT EXISTS is_seed BOOLEAN NOT NULL DEFAULT FALSE;
@@ -0,0 +1,10 @@
+-- Delete a user's flights and stats rollup in the database when the user row is
+-- deleted, so account and seed-user deletion is a single statement.
+
+ALTER TABLE flight DROP CONSTRAINT IF EXISTS flight_user_id_fkey;
+ALTER TABLE flight ADD CONSTRAINT flight_user_id_fkey
+    FOREIGN KEY (user_id) REFERENCES "user" (id) ON DELETE CASCADE;
+
+ALTER TABLE user_stats DROP CONSTRAINT IF EXISTS user_stats_user_id_fkey;
+ALTER TABLE user_stats ADD CONSTRAINT user_stats_user_id_fkey
+    FOREIGN KEY (user_id) REFERENCES "user" (id) ON DELETE CASCADE;
@@ -0,0 +1,19 @@
+-- Filtering and free-text search for GET /api/flights.
+
+-- Word-prefix search (q=) over flight number, cities, aircraft and notes.
+-- The 'simple' configuration keeps codes and place names as-is (no stemming).
+ALTER TABLE flight ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (to_tsvector('simple',
+        coalesce(flight_number, '') || ' ' || coalesce(departure_city, '') || ' ' ||
+        coalesce(arrival_city, '') || ' ' || coalesce(aircraft, '') || ' ' || coalesce(notes, ''))) STORED;
+CREATE INDEX IF NOT EXISTS ix_flight_search ON flight USING GIN (search_vector);
+
+-- Substring matches on aircraft (aircraft=).
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS ix_flight_aircraft_trgm ON flight USING GIN (aircraft gin_trgm_ops);
+
+-- Airport filters, in the list order so filtered pages are read straight off the index.
+CREATE INDEX IF NOT EXISTS ix_flight_user_departure
+    ON flight (user_id, departure_code, flight_date DESC NULLS LAST, id DESC);
+CREATE INDEX IF NOT EXISTS ix_flight_user_arrival
+    ON flight (user_id, arrival_code, flight_date DESC NULLS LAST, id DESC);
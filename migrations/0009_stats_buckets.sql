@@ -0,0 +1,14 @@
+-- Per-user flight totals for closed weeks, months and years, filled on demand by
+-- /api/stats/timeseries. Rows for the current period are never stored; a
+-- back-dated flight write deletes the rows whose period it falls in.
+
+CREATE TABLE IF NOT EXISTS stats_bucket (
+    user_id INTEGER NOT NULL REFERENCES "user" (id) ON DELETE CASCADE,
+    granularity VARCHAR(5) NOT NULL,
+    period_start DATE NOT NULL,
+    flights INTEGER NOT NULL DEFAULT 0,
+    minutes INTEGER NOT NULL DEFAULT 0,
+    miles INTEGER NOT NULL DEFAULT 0,
+    routes INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, granularity, period_start)
+);
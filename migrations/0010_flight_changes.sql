@@ -0,0 +1,18 @@
+-- Delta sync for GET /api/flights/changes.
+
+-- Every flight write stamps the rows it adds with the user's next change number
+-- (UserStats.data_version), so a client can ask for everything after the last
+-- number it saw. Existing rows start at 0 and come with the first full sync.
+ALTER TABLE flight ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP;
+UPDATE flight SET updated_at = created_at WHERE updated_at IS NULL;
+ALTER TABLE flight ADD COLUMN IF NOT EXISTS change_seq INTEGER NOT NULL DEFAULT 0;
+CREATE INDEX IF NOT EXISTS ix_flight_user_change ON flight (user_id, change_seq, id);
+
+-- Deleted flights, so clients holding a copy learn to drop it.
+CREATE TABLE IF NOT EXISTS flight_tombstone (
+    user_id INTEGER NOT NULL REFERENCES "user" (id) ON DELETE CASCADE,
+    change_seq INTEGER NOT NULL,
+    flight_id INTEGER NOT NULL,
+    deleted_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+    PRIMARY KEY (user_id, change_seq, flight_id)
+);
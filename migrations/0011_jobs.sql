@@ -0,0 +1,27 @@
+-- Background jobs run by `flask worker`: imports, stats rebuilds and seed generation.
+
+CREATE TABLE IF NOT EXISTS job (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES "user" (id) ON DELETE CASCADE,
+    kind VARCHAR(50) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    payload JSON NOT NULL,
+    result JSON,
+    error TEXT,
+    progress INTEGER NOT NULL DEFAULT 0,
+    total INTEGER,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    idempotency_key VARCHAR(100),
+    run_at TIMESTAMP NOT NULL,
+    locked_at TIMESTAMP,
+    locked_by VARCHAR(100),
+    created_at TIMESTAMP,
+    finished_at TIMESTAMP
+);
+
+-- Workers poll for the oldest due job.
+CREATE INDEX IF NOT EXISTS ix_job_queue ON job (status, run_at);
+
+-- A retried request with the same Idempotency-Key gets the job it already created.
+CREATE UNIQUE INDEX IF NOT EXISTS ix_job_user_key ON job (user_id, idempotency_key);
@@ -0,0 +1,9 @@
+-- Platform-wide leaderboard sketches (flights per route, airport and aircraft;
+-- distinct travellers per airport). Each web process merges what it counted into
+-- these rows every LEADERBOARD_FLUSH_SECONDS; see sketches.py for the format.
+
+CREATE TABLE IF NOT EXISTS global_sketch (
+    name VARCHAR(50) PRIMARY KEY,
+    data BYTEA NOT NULL,
+    updated_at TIMESTAMP
+);
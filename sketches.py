@@ -0,0 +1,234 @@
+"""
+Bounded-memory streaming sketches for platform-wide leaderboards.
+
+CountMinSketch counts how often each key was seen in a `depth` x `width` table of
+counters. An estimate is the smallest of the key's `depth` counters, so it never
+undercounts (as long as no key's true count goes negative) and overcounts by at
+most e / width * total with probability 1 - exp(-depth). With the defaults
+(2048 x 5) that is 0.13% of all counted events, with 99.3% confidence.
+
+HeavyHitters pairs a count-min sketch with the `capacity` keys that have the
+highest estimates, which gives top-k lists without storing every key. A key that
+climbs into the top k later is admitted as soon as its estimate passes the
+smallest tracked one.
+
+HyperLogLog estimates the number of distinct items added to it from 2^p one-byte
+registers, with a standard error of 1.04 / sqrt(2^p): 3.25% for the default
+p=10 (1 KB). It cannot forget an item.
+
+Every sketch can be merged with another of the same shape (that is how per-process
+deltas are folded into the stored totals) and round-trips through to_bytes() /
+from_bytes().
+"""
+import hashlib
+import json
+import math
+import struct
+from array import array
+from functools import lru_cache
+
+CMS_HEADER = struct.Struct('<IIq')  # width, depth, total
+HLL_ENTRY = struct.Struct('<B')     # key length, before each key in KeyedHyperLogLog
+
+
+@lru_cache(maxsize=65536)  # Routes, airports and aircraft repeat constantly
+def _digest(key, size):
+    return hashlib.blake2b(str(key).encode('utf-8'), digest_size=size).digest()
+
+
+class CountMinSketch:
+    def __init__(self, width=2048, depth=5):
+        self.width = width
+        self.depth = depth
+        self.total = 0
+        self.counts = array('q', bytes(8 * width * depth))
+        self._row_hashes = struct.Struct(f'<{depth}I')
+
+    def _cells(self, key):
+        width = self.width
+        return [row * width + value % width
+                for row, value in enumerate(self._row_hashes.unpack(_digest(key, 4 * self.depth)))]
+
+    def add(self, key, count=1):
+        """Count `key` `count` times; a negative count takes earlier ones back"""
+        counts = self.counts
+        for cell in self._cells(key):
+            counts[cell] += count
+        self.total += count
+
+    def estimate(self, key):
+        counts = self.counts
+        return max(0, min(counts[cell] for cell in self._cells(key)))
+
+    def error_bound(self):
+        """Largest expected overcount of any estimate (holds with probability 1 - exp(-depth))"""
+        return math.e / self.width * self.total
+
+    def merge(self, other):
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError('Cannot merge count-min sketches of different shapes')
+        counts = self.counts
+        for i, value in enumerate(other.counts):
+            if value:
+                counts[i] += value
+        self.total += other.total
+
+    def to_bytes(self):
+        return CMS_HEADER.pack(self.width, self.depth, self.total) + self.counts.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        width, depth, total = CMS_HEADER.unpack_from(data, 0)
+        sketch = cls(width, depth)
+        sketch.total = total
+        sketch.counts = array('q')
+        sketch.counts.frombytes(data[CMS_HEADER.size:CMS_HEADER.size + 8 * width * depth])
+        return sketch
+
+
+class HeavyHitters:
+    """Top-k keys by count: a count-min sketch plus the `capacity` best candidates"""
+
+    def __init__(self, capacity=100, width=2048, depth=5):
+        self.capacity = capacity
+        self.sketch = CountMinSketch(width, depth)
+        self.candidates = {}  # key -> estimate when last counted
+        self._floor = None    # Smallest candidate estimate, recomputed when needed
+
+    def add(self, key, count=1):
+        self.sketch.add(key, count)
+        self._consider(key, self.sketch.estimate(key))
+
+    def _consider(self, key, estimate):
+        candidates = self.candidates
+        if key in candidates:
+            if estimate > 0:
+                candidates[key] = estimate
+            else:
+                del candidates[key]
+            self._floor = None
+            return
+        if estimate <= 0:
+            return
+        if len(candidates) < self.capacity:
+            candidates[key] = estimate
+            self._floor = None
+            return
+        if self._floor is None:
+            self._floor = min(candidates.values())
+        if estimate > self._floor:
+            del candidates[min(candidates, key=candidates.get)]
+            candidates[key] = estimate
+            self._floor = None
+
+    def top(self, n):
+        """[(key, estimated count)] for the n most counted keys, highest first"""
+        return sorted(self.candidates.items(), key=lambda item: (-item[1], item[0]))[:n]
+
+    def estimate(self, key):
+        return self.sketch.estimate(key)
+
+    def merge(self, other):
+        self.sketch.merge(other.sketch)
+        keys = set(self.candidates) | set(other.candidates)
+        estimates = {key: self.sketch.estimate(key) for key in keys}
+        best = sorted(estimates.items(), key=lambda item: -item[1])[:self.capacity]
+        self.candidates = {key: estimate for key, estimate in best if estimate > 0}
+        self._floor = None
+
+    def to_bytes(self):
+        sketch = self.sketch.to_bytes()
+        candidates = json.dumps(self.candidates, separators=(',', ':')).encode('utf-8')
+        return struct.pack('<II', self.capacity, len(sketch)) + sketch + candidates
+
+    @classmethod
+    def from_bytes(cls, data):
+        capacity, length = struct.unpack_from('<II', data, 0)
+        hitters = cls(capacity)
+        hitters.sketch = CountMinSketch.from_bytes(data[8:8 + length])
+        hitters.candidates = json.loads(bytes(data[8 + length:]).decode('utf-8'))
+        return hitters
+
+
+class HyperLogLog:
+    def __init__(self, p=10, registers=None):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.m)
+
+    def add(self, item):
+        value = int.from_bytes(_digest(item, 8), 'little')
+        index = value >> (64 - self.p)
+        rest = value & ((1 << (64 - self.p)) - 1)
+        # Position of the first 1 bit in the remaining 64 - p bits
+        rank = 64 - self.p - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self):
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Small cardinalities: linear counting is more accurate
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def relative_error(self):
+        """Standard error of count() as a fraction of the true value"""
+        return 1.04 / math.sqrt(self.m)
+
+    def merge(self, other):
+        if other.p != self.p:
+            raise ValueError('Cannot merge HyperLogLogs of different precision')
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+
+class KeyedHyperLogLog:
+    """One HyperLogLog per key (e.g. distinct users per airport), created on first use"""
+
+    def __init__(self, p=10):
+        self.p = p
+        self.sketches = {}
+
+    def add(self, key, item):
+        sketch = self.sketches.get(key)
+        if sketch is None:
+            sketch = self.sketches[key] = HyperLogLog(self.p)
+        sketch.add(item)
+
+    def count(self, key):
+        sketch = self.sketches.get(key)
+        return sketch.count() if sketch else 0
+
+    def relative_error(self):
+        return HyperLogLog(self.p).relative_error()
+
+    def merge(self, other):
+        for key, sketch in other.sketches.items():
+            if key in self.sketches:
+                self.sketches[key].merge(sketch)
+            else:
+                self.sketches[key] = HyperLogLog(sketch.p, sketch.registers)
+
+    def to_bytes(self):
+        parts = [bytes([self.p])]
+        for key, sketch in sorted(self.sketches.items()):
+            encoded = key.encode('utf-8')[:255]
+            parts.append(HLL_ENTRY.pack(len(encoded)) + encoded + bytes(sketch.registers))
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        keyed = cls(data[0])
+        size = 1 << keyed.p
+        offset = 1
+        while offset < len(data):
+            (length,) = HLL_ENTRY.unpack_from(data, offset)
+            offset += HLL_ENTRY.size
+            key = bytes(data[offset:offset + length]).decode('utf-8')
+            offset += length
+            keyed.sketches[key] = HyperLogLog(keyed.p, data[offset:offset + size])
+            offset += size
+        return keyed
@@ -13,6 +13,8 @@ document.addEventListener('DOMContentLoaded', function() {
         initAddFlightForm();
     } else if (currentPage === '/stats' || currentPage === '/stats.html') {
         initStats();
+    } else if (currentPage === '/map' || currentPage === '/map.html') {
+        initMap();
     }
 });
 
@@ -31,16 +33,59 @@ async function checkAuth() {
     }
 }
 
+// Flights list paging state
+const FLIGHTS_PAGE_SIZE = 25;
+const FLIGHT_CARD_FIELDS = 'id,flight_number,aircraft,cabin_class,departure_code,departure_city,arrival_code,arrival_city,flight_date,duration,notes,is_seed';
+let flightsNextCursor = null;
+let flightsHasSeedData = false;
+let loadedFlights = [];
+let flightsQuery = '';
+let flightsSearchTimer = null;
+
+// Fetch one page of flights (the first page when cursor is null)
+async function fetchFlightsPage(cursor) {
+    const params = new URLSearchParams({ limit: FLIGHTS_PAGE_SIZE, fields: FLIGHT_CARD_FIELDS });
+    if (cursor) {
+        params.set('cursor', cursor);
+    }
+    if (flightsQuery) {
+        params.set('q', flightsQuery);
+    }
+    
+    const response = await fetch(`/api/flights?${params}`);
+    if (!response.ok) {
+        throw new Error('Failed to fetch flights');
+    }
+    return response.json();
+}
+
 // Initialize flights list page
-async function initFlightsList() {
+function initFlightsList() {
+    const searchInput = document.getElementById('flight-search');
+    if (searchInput) {
+        searchInput.addEventListener('input', () => {
+            // Search on the server once typing pauses
+            clearTimeout(flightsSearchTimer);
+            flightsSearchTimer = setTimeout(() => {
+                flightsQuery = searchInput.value.trim();
+                loadFlights();
+            }, 250);
+        });
+    }
+    loadFlights();
+}
+
+// Load the first page of flights for the current search
+async function loadFlights() {
+    const query = flightsQuery;
     try {
-        const response = await fetch('/api/flights');
-        if (!response.ok) {
-            throw new Error('Failed to fetch flights');
-        }
-        
-        const flights = await response.json();
-        displayFlights(flights);
+        const page = await fetchFlightsPage(null);
+        // A newer search started while this one was in flight
+        if (query !== flightsQuery) return;
+        loadedFlights = page.flights;
+        flightsNextCursor = page.next_cursor;
+        flightsHasSeedData = page.has_seed_data;
+        displayFlights(loadedFlights);
         
     } catch (error) {
         console.error('Error loading flights:', error);
@@ -48,11 +93,46 @@ async function initFlightsList() {
     }
 }
 
+// Load the next page of flights and append it to the list
+async function loadMoreFlights() {
+    if (!flightsNextCursor) return;
+    
+    const button = document.getElementById('load-more-flights');
+    if (button) {
+        button.disabled = true;
+        button.textContent = 'Loading...';
+    }
+    
+    try {
+        const page = await fetchFlightsPage(flightsNextCursor);
+        loadedFlights = loadedFlights.concat(page.flights);
+        flightsNextCursor = page.next_cursor;
+        displayFlights(loadedFlights);
+        
+    } catch (error) {
+        console.error('Error loading more flights:', error);
+        showMessage('Error loading more flights. Please try again.', 'error');
+        if (button) {
+            button.disabled = false;
+            button.textContent = 'Load More Flights';
+        }
+    }
+}
+
 // Display flights in the list
 function displayFlights(flights) {
     const flightsContainer = document.querySelector('#flights-container');
     if (!flightsContainer) return;
     
+    if (flights.length === 0 && flightsQuery) {
+        flightsContainer.innerHTML = `
+            <div class="bg-anti_flash_white-500 rounded-xl p-8 text-center">
+                <p class="text-anti_flash_white-300">No flights match your search.</p>
+            </div>
+        `;
+        return;
+    }
+    
     if (flights.length === 0) {
         flightsContainer.innerHTML = `
             <div class="bg-anti_flash_white-500 rounded-xl p-8 text-center">
@@ -78,8 +158,8 @@ function displayFlights(flights) {
         return;
     }
     
-    // Check if there are any seed flights
-    const hasSeedData = flights.some(flight => flight.is_seed);
+    // Seed data may be on a page that has not been loaded yet, so ask the server
+    const hasSeedData = flightsHasSeedData || flights.some(flight => flight.is_seed);
     
     let headerHtml = '';
     if (hasSeedData) {
@@ -99,7 +179,19 @@ function displayFlights(flights) {
     }
     
     const flightCards = flights.map(flight => createFlightCard(flight)).join('');
-    flightsContainer.innerHTML = headerHtml + flightCards;
+    
+    let footerHtml = '';
+    if (flightsNextCursor) {
+        footerHtml = `
+            <div class="text-center">
+                <button id="load-more-flights" onclick="loadMoreFlights()" class="bg-cornflower_blue-500 hover:bg-cornflower_blue-600 text-white px-6 py-3 rounded-lg font-medium transition-colors">
+                    Load More Flights
+                </button>
+            </div>
+        `;
+    }
+    
+    flightsContainer.innerHTML = headerHtml + flightCards + footerHtml;
     
     // Add delete functionality
     document.querySelectorAll('.delete-flight').forEach(button => {
@@ -173,7 +265,7 @@ async function handleDeleteFlight(event) {
         
         if (response.ok) {
             // Refresh the flights list
-            initFlightsList();
+            loadFlights();
             showMessage('Flight deleted successfully!', 'success');
         } else {
             throw new Error('Failed to delete flight');
@@ -445,6 +537,77 @@ function updateMonthlyActivity(activity) {
     container.innerHTML = chartHTML;
 }
 
+// Initialize map page
+async function initMap() {
+    try {
+        const response = await fetch('/api/map/routes');
+        if (!response.ok) {
+            throw new Error('Failed to fetch routes');
+        }
+        
+        const data = await response.json();
+        displayRoutes(data);
+        
+    } catch (error) {
+        console.error('Error loading routes:', error);
+        showMessage('Error loading your routes. Please try again.', 'error');
+    }
+}
+
+// Draw routes on the map (equirectangular: x = longitude, y = -latitude)
+function displayRoutes(data) {
+    const routesLayer = document.getElementById('route-map-routes');
+    const airportsLayer = document.getElementById('route-map-airports');
+    const graticule = document.getElementById('route-map-graticule');
+    if (!routesLayer || !airportsLayer) return;
+    
+    updateStatCard('map-route-count', data.routes.length);
+    updateStatCard('map-airport-count', Object.values(data.airports).filter(Boolean).length);
+    updateStatCard('map-flight-count', data.total_flights);
+    
+    const emptyState = document.getElementById('route-map-empty');
+    const drawable = data.routes.filter(route => route.path);
+    if (drawable.length === 0) {
+        const message = document.getElementById('route-map-message');
+        if (message) {
+            message.textContent = 'Add flights with airport codes to see your routes here.';
+        }
+        return;
+    }
+    if (emptyState) {
+        emptyState.remove();
+    }
+    
+    // Light grid every 30 degrees
+    let gridHtml = '';
+    for (let lon = -150; lon <= 150; lon += 30) {
+        gridHtml += `<line x1="${lon}" y1="-90" x2="${lon}" y2="90" stroke="#9ba3c9" stroke-width="0.2" opacity="0.4"/>`;
+    }
+    for (let lat = -60; lat <= 60; lat += 30) {
+        gridHtml += `<line x1="-180" y1="${-lat}" x2="180" y2="${-lat}" stroke="#9ba3c9" stroke-width="0.2" opacity="0.4"/>`;
+    }
+    graticule.innerHTML = gridHtml;
+    
+    // Paths may extend past +/-180 on antimeridian crossings, so draw a wrapped copy too
+    const maxCount = Math.max(...drawable.map(route => route.count), 1);
+    routesLayer.innerHTML = drawable.map(route => {
+        const points = route.path.map(([lat, lon]) => `${lon},${-lat}`).join(' ');
+        const lons = route.path.map(point => point[1]);
+        const shift = Math.max(...lons) > 180 ? -360 : (Math.min(...lons) < -180 ? 360 : 0);
+        const width = 0.4 + (route.count / maxCount) * 1.2;
+        const line = offset => `<polyline points="${points}" transform="translate(${offset} 0)" fill="none" stroke="url(#route-gradient)" stroke-width="${width}" stroke-linecap="round" opacity="0.8"><title>${route.departure_code} → ${route.arrival_code} • ${route.count} flight${route.count > 1 ? 's' : ''}</title></polyline>`;
+        return line(0) + (shift ? line(shift) : '');
+    }).join('');
+    
+    airportsLayer.innerHTML = Object.entries(data.airports)
+        .filter(([, airport]) => airport)
+        .map(([code, airport]) => `
+            <circle cx="${airport.longitude}" cy="${-airport.latitude}" r="1.2" fill="#ff8600">
+                <title>${code} • ${airport.name}</title>
+            </circle>
+        `).join('');
+}
+
 // Logout functionality
 function logout() {
     fetch('/api/auth/logout', { method: 'POST' })
@@ -532,7 +695,7 @@ async function addSampleData() {
         if (response.ok) {
             showMessage('Sample flights added successfully! Explore the app and remove them when ready.', 'success');
             // Reload the flights list
-            initFlightsList();
+            loadFlights();
         } else {
             showMessage(data.error || 'Failed to add sample data', 'error');
         }
@@ -561,7 +724,7 @@ async function removeSampleData() {
         if (response.ok) {
             showMessage('Sample flights removed successfully!', 'success');
             // Reload the flights list
-            initFlightsList();
+            loadFlights();
         } else {
             showMessage(data.error || 'Failed to remove sample data', 'error');
         }
@@ -0,0 +1,31 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# The app reads its configuration at import time: point it at a throwaway SQLite file
+os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tempfile.mkdtemp(), "test.db")}'
+os.environ.setdefault('SECRET_KEY', 'test')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as soarrr  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def app():
+    result = soarrr.app.test_cli_runner().invoke(args=['db-upgrade'])
+    assert result.exit_code == 0, result.output
+    return soarrr.app
+
+
+@pytest.fixture
+def signed_in(app):
+    """signed_in(email) -> a test client logged in as that user, signing up on first use"""
+    def sign_in(email, password='secret1'):
+        client = app.test_client()
+        if client.post('/api/auth/signup', json={'email': email, 'password': password}).status_code != 200:
+            response = client.post('/api/auth/login', json={'email': email, 'password': password})
+            assert response.status_code == 200, response.get_json()
+        return client
+    return sign_in
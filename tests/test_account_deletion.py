@@ -0,0 +1,76 @@
+import app as soarrr
+
+FLIGHT = {
+    'flight_number': 'BA117',
+    'departure_code': 'LHR',
+    'arrival_code': 'JFK',
+    'flight_date': '2024-05-01',
+    'departure_time': '08:30',
+    'arrival_time': '11:15',
+}
+
+
+def test_deleting_the_account_ends_its_other_sessions(signed_in):
+    first = signed_in('deleted@example.com')
+    second = signed_in('deleted@example.com')
+    assert second.post('/api/flights', json=FLIGHT).status_code == 201
+
+    response = first.delete('/api/auth/account', json={'password': 'secret1'})
+    assert response.status_code == 200
+
+    # Signed out, like any other anonymous request
+    assert second.get('/api/auth/status').get_json() == {'authenticated': False}
+    assert second.get('/api/flights').status_code == 302
+    assert second.get('/api/stats').status_code == 302
+    assert second.post('/api/flights', json=FLIGHT).status_code == 302
+
+
+def test_sessions_that_still_trust_a_deleted_account_are_ended(signed_in):
+    first = signed_in('stale@example.com')
+    readers = [signed_in('stale@example.com'), signed_in('stale@example.com')]
+    with soarrr.app.app_context():
+        user_id = soarrr.User.query.filter_by(email='stale@example.com').one().id
+    first.delete('/api/auth/account', json={'password': 'secret1'})
+
+    # As in another worker process whose cached check of the account has not expired yet
+    for client, request in zip(readers, (lambda c: c.get('/api/flights'),
+                                         lambda c: c.post('/api/flights', json=FLIGHT))):
+        soarrr.mark_account_checked(user_id)
+        response = request(client)
+        assert response.status_code == 401
+        assert response.get_json() == {'error': 'This account no longer exists'}
+        assert client.get('/api/auth/status').get_json() == {'authenticated': False}
+    with soarrr.app.app_context():
+        assert soarrr.db.session.get(soarrr.UserStats, user_id) is None
+
+
+def test_deletes_racing_an_account_deletion_end_the_session(signed_in, monkeypatch):
+    client = signed_in('racing@example.com')
+    flight_id = client.post('/api/flights', json=FLIGHT).get_json()['id']
+
+    # As if the account was deleted between the route's lookup and its write
+    def gone(user_id):
+        raise soarrr.AccountGone()
+    monkeypatch.setattr(soarrr, 'lock_user_stats', gone)
+    monkeypatch.setattr(soarrr, 'remove_seed_flights', gone)
+    for request in (lambda: client.delete(f'/api/flights/{flight_id}'), lambda: client.delete('/api/seed/remove')):
+        response = request()
+        assert response.status_code == 401
+        assert response.get_json() == {'error': 'This account no longer exists'}
+        client = signed_in('racing@example.com')
+
+
+def test_a_failed_flight_delete_is_rolled_back(signed_in, monkeypatch):
+    client = signed_in('failed-delete@example.com')
+    flight_id = client.post('/api/flights', json=FLIGHT).get_json()['id']
+
+    def broken(stats, flights, sign):
+        raise RuntimeError('rollup unavailable')
+    monkeypatch.setattr(soarrr, 'update_user_stats', broken)
+    response = client.delete(f'/api/flights/{flight_id}')
+    assert response.status_code == 500
+    monkeypatch.undo()
+
+    assert client.get(f'/api/flights/{flight_id}').status_code == 200
+    assert client.get('/api/flights/changes').get_json()['deleted'] == []
+    assert client.delete(f'/api/flights/{flight_id}').status_code == 200
@@ -0,0 +1,38 @@
+import pytest
+
+import airports
+
+
+def test_the_bundled_table_is_up_to_date_with_the_csv():
+    with open(airports.BIN_PATH, 'rb') as f:
+        assert f.read() == airports.build()
+
+
+def test_lookups_by_iata_code():
+    heathrow = airports.lookup('lhr')
+    assert (heathrow.code, heathrow.city, heathrow.country, heathrow.timezone) == \
+        ('LHR', 'London', 'GB', 'Europe/London')
+    assert heathrow.latitude == pytest.approx(51.4706, abs=1e-3)
+    assert heathrow.longitude == pytest.approx(-0.4619, abs=1e-3)
+    assert airports.airport_country('JFK') == 'US'
+    assert 'CDG' in airports.get_index()
+
+    for code in ('XQZ', 'L1R', 'LHRX', '', None):
+        assert airports.lookup(code) is None
+        assert airports.airport_country(code) is None
+
+
+def test_great_circle_distances_and_paths():
+    assert airports.distance_miles('LHR', 'JFK') == pytest.approx(3442, abs=5)
+    assert airports.distance_miles('jfk', 'lhr') == airports.distance_miles('LHR', 'JFK')
+    assert airports.distance_miles('LHR', 'LHR') == 0
+    assert airports.distance_miles('LHR', 'XQZ') is None
+    assert airports.distance_miles('LHR', None) is None
+
+    path = airports.great_circle_path('NRT', 'SFO')
+    tokyo, san_francisco = airports.get_index().coordinates('NRT'), airports.get_index().coordinates('SFO')
+    assert path[0] == pytest.approx(tokyo, abs=1e-3)
+    # Across the antimeridian the longitude keeps increasing instead of wrapping to -122
+    assert path[-1] == pytest.approx((san_francisco[0], san_francisco[1] + 360), abs=1e-3)
+    assert all(b[1] > a[1] for a, b in zip(path, path[1:]))
+    assert airports.great_circle_path('NRT', 'XQZ') is None
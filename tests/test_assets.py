@@ -0,0 +1,36 @@
+import gzip
+
+import pytest
+
+import app as soarrr
+import assets
+
+
+@pytest.fixture
+def manifest(tmp_path, monkeypatch):
+    """A build of static/ into a temporary dist directory, served in place of dist/"""
+    assets.build(dist_dir=str(tmp_path))
+    loaded = assets.AssetManifest.load(str(tmp_path))
+    monkeypatch.setattr(soarrr, 'asset_manifest', loaded)
+    return loaded
+
+
+def test_a_gzip_client_gets_the_precompressed_fingerprinted_asset(app, manifest):
+    name, entry = next((name, entry) for name, entry in manifest.files.items()
+                       if entry['immutable'] and 'gzip' in entry['encodings'])
+    with open(f"{manifest.dist_dir}/{entry['path']}", 'rb') as f:
+        original = f.read()
+
+    response = app.test_client().get(f"/static/{entry['path']}", headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.vary
+    assert 'immutable' in response.headers['Cache-Control']
+    assert '.gz' not in response.headers.get('Content-Disposition', '')
+    assert gzip.decompress(response.data) == original
+
+    # The source name is only briefly cacheable, and identity clients get the file as-is
+    response = app.test_client().get(f'/static/{name}')
+    assert 'Content-Encoding' not in response.headers
+    assert 'immutable' not in response.headers['Cache-Control']
+    assert response.data == original
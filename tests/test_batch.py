@@ -0,0 +1,40 @@
+import app as soarrr
+
+LEGS = [
+    {'flight_number': 'BA117', 'departure_code': 'LHR', 'arrival_code': 'JFK', 'flight_date': '2024-05-01',
+     'departure_time': '08:30', 'arrival_time': '11:15', 'cabin_class': 'Economy'},
+    {'flight_number': 'AA100', 'departure_code': 'JFK', 'arrival_code': 'LAX', 'flight_date': '2024-05-03',
+     'departure_time': '09:00', 'arrival_time': '12:30', 'cabin_class': 'Business'},
+    {'flight_number': 'BA268', 'departure_code': 'LAX', 'arrival_code': 'LHR', 'flight_date': '2024-04-28',
+     'departure_time': '17:00', 'arrival_time': '11:20'},
+]
+
+
+def test_a_batch_is_saved_in_request_order_and_counted_in_the_stats(app, signed_in):
+    client = signed_in('batch@example.com')
+    response = client.post('/api/flights/batch', json={'flights': LEGS})
+    assert response.status_code == 201
+    flights = response.get_json()['flights']
+    assert [flight['flight_number'] for flight in flights] == ['BA117', 'AA100', 'BA268']
+    assert [flight['id'] for flight in flights] == sorted(flight['id'] for flight in flights)
+    for flight in flights:
+        assert client.get(f"/api/flights/{flight['id']}").get_json()['flight_number'] == flight['flight_number']
+
+    assert client.get('/api/stats').get_json()['total_flights'] == 3
+    with app.app_context():
+        user_id = soarrr.User.query.filter_by(email='batch@example.com').one().id
+        rollup = soarrr.rollup_dict(soarrr.db.session.get(soarrr.UserStats, user_id))
+        assert rollup['total_miles'] == sum(soarrr.route_miles(leg['departure_code'], leg['arrival_code'])
+                                            for leg in LEGS)
+        assert rollup == soarrr.aggregate_user_stats(user_id)
+
+
+def test_one_invalid_flight_fails_the_whole_batch(signed_in):
+    client = signed_in('bad-batch@example.com')
+    legs = [LEGS[0], {**LEGS[1], 'flight_date': 'not-a-date'}, 'BA268']
+    response = client.post('/api/flights/batch', json={'flights': legs})
+    assert response.status_code == 400
+    assert [error['index'] for error in response.get_json()['errors']] == [1, 2]
+
+    assert client.get('/api/flights').get_json() == []
+    assert client.get('/api/stats').get_json()['total_flights'] == 0
@@ -0,0 +1,41 @@
+import importlib.util
+import os
+import random
+from datetime import date
+
+import app as soarrr
+
+spec = importlib.util.spec_from_file_location(
+    'load_test', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'bench', 'load_test.py'))
+load_test = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(load_test)
+
+
+def test_the_same_seed_generates_the_same_valid_flights(signed_in):
+    flights = [load_test.synthetic_flight(random.Random(3), date(2024, 5, 1)) for _ in range(2)]
+    assert flights[0] == flights[1]
+    response = signed_in('bench@example.com').post('/api/flights', json=flights[0])
+    assert response.status_code == 201, response.get_json()
+
+
+def test_datasets_are_created_once_per_seed(app):
+    emails = load_test.create_dataset(2, 25, seed=41)
+    assert emails == ['seed41-0@example.com', 'seed41-1@example.com']
+    assert load_test.create_dataset(2, 25, seed=41) == emails
+    with app.app_context():
+        users = soarrr.User.query.filter(soarrr.User.email.in_(emails)).all()
+        assert [soarrr.Flight.query.filter_by(user_id=user.id).count() for user in users] == [25, 25]
+
+
+def test_the_report_has_percentiles_per_endpoint():
+    results = [('GET /api/stats', 200, n / 1000) for n in range(1, 101)] + [('GET /api/stats', 500, 0.2)]
+    report = load_test.summarize(results, elapsed=10)
+    stats = report['GET /api/stats']
+    assert (stats['requests'], stats['errors'], stats['statuses']) == (101, 1, {'200': 100, '500': 1})
+    assert stats['throughput_rps'] == 10.1
+    assert (stats['p50_ms'], stats['p99_ms'], stats['max_ms']) == (51, 100, 200)
+    assert report['POST /api/flights'] == {
+        'requests': 0, 'errors': 0, 'statuses': {}, 'throughput_rps': 0.0,
+        'mean_ms': None, 'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'max_ms': None,
+    }
+    assert load_test.percentile([], 0.5) is None
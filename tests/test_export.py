@@ -0,0 +1,44 @@
+import json
+
+import app as soarrr
+
+
+def test_ndjson_export_streams_every_flight_in_batches(signed_in, monkeypatch):
+    client = signed_in('export@example.com')
+    monkeypatch.setattr(soarrr, 'EXPORT_BATCH_SIZE', 2)
+    for day in range(1, 6):
+        response = client.post('/api/flights', json={
+            'flight_number': f'BA{day}', 'departure_code': 'LHR', 'arrival_code': 'CDG',
+            'flight_date': f'2024-05-0{day}', 'departure_time': '08:30', 'arrival_time': '10:45',
+            'notes': 'Café au lait'})
+        assert response.status_code == 201
+
+    response = client.get('/api/flights/export?format=ndjson')
+    assert response.is_streamed
+    flights = [json.loads(line) for line in response.data.decode('utf-8').splitlines()]
+    assert [flight['flight_number'] for flight in flights] == ['BA5', 'BA4', 'BA3', 'BA2', 'BA1']
+    assert list(flights[0]) == soarrr.FLIGHT_FIELDS
+    assert flights[0]['flight_date'] == '2024-05-05'
+    assert flights[0]['notes'] == 'Café au lait'
+
+
+def test_exported_text_imports_back_unchanged(signed_in):
+    text = {'flight_number': 'A&B1', 'aircraft': "Boeing 777 'Triple'", 'departure_city': 'London <Heathrow>',
+            'notes': '<3 "nice" & \'fun\' > meh'}
+    source = signed_in('roundtrip@example.com')
+    response = source.post('/api/flights', json={'departure_code': 'LHR', 'arrival_code': 'JFK',
+                                                 'flight_date': '2024-05-01', 'departure_time': '08:30',
+                                                 'arrival_time': '11:15', **text})
+    assert response.status_code == 201
+    stored = {field: response.get_json()[field] for field in text}
+
+    exported = json.loads(source.get('/api/flights/export?format=ndjson').data)
+    assert {field: exported[field] for field in text} == text
+
+    for export_format in ('csv', 'ndjson'):
+        target = signed_in(f'roundtrip-{export_format}@example.com')
+        response = target.post(f'/api/flights/import?format={export_format}', content_type='text/plain',
+                               data=source.get(f'/api/flights/export?format={export_format}').data)
+        assert response.get_json()['imported'] == 1
+        flight = target.get('/api/flights').get_json()[0]
+        assert {field: flight[field] for field in text} == stored
@@ -0,0 +1,63 @@
+import itertools
+
+import pytest
+
+import app as soarrr
+
+PAGED_USERS = itertools.count()
+
+
+@pytest.fixture
+def paged_user(app, signed_in):
+    """A client whose flights include same-day ties and flights without a date or times"""
+    email = f'paging-{next(PAGED_USERS)}@example.com'
+    client = signed_in(email)
+    for number, flight_date in (('BA1', '2024-01-05'), ('BA2', '2024-03-01'), ('BA3', '2024-03-01'),
+                                ('BA4', '2023-12-31'), ('BA5', '2024-03-01')):
+        response = client.post('/api/flights', json={'flight_number': number, 'departure_code': 'LHR',
+                                                     'arrival_code': 'CDG', 'flight_date': flight_date})
+        assert response.status_code == 201
+    # Older rows may have no flight_date; the API itself always sets one
+    with app.app_context():
+        user_id = soarrr.User.query.filter_by(email=email).one().id
+        soarrr.db.session.add_all([soarrr.Flight(user_id=user_id, flight_number=number, flight_date=None)
+                                   for number in ('BA6', 'BA7')])
+        soarrr.db.session.commit()
+    return client
+
+
+def test_cursor_pages_cover_every_flight_once_in_list_order(paged_user):
+    full = paged_user.get('/api/flights').get_json()
+    assert [flight['flight_number'] for flight in full] == ['BA5', 'BA3', 'BA2', 'BA1', 'BA4', 'BA7', 'BA6']
+
+    pages = []
+    response = paged_user.get('/api/flights?limit=2').get_json()
+    assert response['has_seed_data'] is False
+    while True:
+        pages.append([flight['id'] for flight in response['flights']])
+        if response['next_cursor'] is None:
+            break
+        response = paged_user.get(f"/api/flights?limit=2&cursor={response['next_cursor']}").get_json()
+        assert 'has_seed_data' not in response
+    assert [len(page) for page in pages] == [2, 2, 2, 1]
+    assert sum(pages, []) == [flight['id'] for flight in full]
+
+
+def test_fields_selects_the_returned_keys(paged_user):
+    page = paged_user.get('/api/flights?limit=3&fields=flight_number,flight_date').get_json()
+    assert page['flights'][0] == {'flight_number': 'BA5', 'flight_date': '2024-03-01'}
+
+    full = paged_user.get('/api/flights?fields=id').get_json()
+    assert all(list(flight) == ['id'] for flight in full)
+
+
+@pytest.mark.parametrize('query, error', [
+    ('fields=id,password', 'Unknown fields: password'),
+    ('limit=0', 'limit must be between 1 and 200'),
+    ('limit=ten', 'limit must be an integer'),
+    ('cursor=not-a-cursor', 'Invalid cursor'),
+])
+def test_bad_paging_parameters_get_a_400(paged_user, query, error):
+    response = paged_user.get(f'/api/flights?{query}')
+    assert response.status_code == 400
+    assert response.get_json() == {'error': error}
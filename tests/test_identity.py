@@ -0,0 +1,57 @@
+import re
+import time
+
+import app as soarrr
+
+USER_QUERY = re.compile(r'FROM "?user"?\b')
+
+
+def user_queries(app, request):
+    statements = []
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if USER_QUERY.search(statement):
+            statements.append(statement)
+    with app.app_context():
+        soarrr.db.event.listen(soarrr.db.engine, 'before_cursor_execute', capture)
+        try:
+            response = request()
+        finally:
+            soarrr.db.event.remove(soarrr.db.engine, 'before_cursor_execute', capture)
+    return response, statements
+
+
+def test_signed_in_requests_load_the_identity_from_the_session(app, signed_in):
+    client = signed_in('identity@example.com')
+    response, statements = user_queries(app, lambda: client.get('/api/auth/status'))
+    assert response.get_json() == {'authenticated': True, 'user': {'email': 'identity@example.com'}}
+    assert statements == []
+
+    # A session without the stored identity is loaded from the database once
+    with client.session_transaction() as session:
+        del session['_identity']
+    response, statements = user_queries(app, lambda: client.get('/api/auth/status'))
+    assert response.get_json()['authenticated'] is True
+    assert statements
+    with client.session_transaction() as session:
+        assert session['_identity']['email'] == 'identity@example.com'
+
+
+def test_a_deleted_account_is_noticed_once_the_cached_check_expires(app, signed_in):
+    client = signed_in('expiry@example.com')
+    with app.app_context():
+        user_id = soarrr.User.query.filter_by(email='expiry@example.com').one().id
+    assert signed_in('expiry@example.com').delete('/api/auth/account', json={'password': 'secret1'}).status_code == 200
+
+    # As in another worker process that checked the account a moment ago
+    soarrr.mark_account_checked(user_id)
+    response, statements = user_queries(app, lambda: client.get('/api/auth/status'))
+    assert response.get_json()['authenticated'] is True
+    assert statements == []
+
+    soarrr._account_checks[user_id] = time.monotonic() - soarrr.IDENTITY_CHECK_SECONDS - 1
+    response, statements = user_queries(app, lambda: client.get('/api/auth/status'))
+    assert response.get_json() == {'authenticated': False}
+    assert statements
+    with client.session_transaction() as session:
+        assert '_identity' not in session
+    assert client.get('/api/flights').status_code == 302
@@ -0,0 +1,34 @@
+import json
+
+
+def test_an_upload_that_is_not_utf8_gets_a_file_level_error(signed_in):
+    client = signed_in('import@example.com')
+    body = 'flight_number,departure_code,arrival_code,flight_date\nBA1,LHR,CDG,2024-05-01\n'.encode('utf-16')
+
+    for path in ('/api/flights/import?format=csv', '/api/flights/import?format=csv&async=1'):
+        response = client.post(path, data=body, content_type='text/csv')
+        assert response.status_code == 400
+        assert response.get_json() == {'error': 'The upload is not valid UTF-8'}
+
+
+def test_ndjson_rows_with_wrong_field_types_get_actionable_errors(signed_in):
+    client = signed_in('import-types@example.com')
+    lines = [
+        {'flight_number': 'BA1', 'departure_code': 'LHR', 'arrival_code': 'CDG', 'flight_date': '2024-05-01'},
+        {'flight_number': 'BA2', 'departure_code': 123, 'arrival_code': 'CDG'},
+        {'flight_number': 'BA3', 'departure_code': 'LHR', 'flight_date': ['2024-05-01']},
+        {'flight_number': 'BA4', 'departure_code': 'LHR', 'flight_date': '05/01/2024'},
+        {'flight_number': 'BA5', 'departure_code': 'LHR', 'departure_time': '8am'},
+    ]
+    body = '\n'.join(json.dumps(line) for line in lines)
+
+    response = client.post('/api/flights/import?format=ndjson', data=body, content_type='application/x-ndjson')
+    result = response.get_json()
+    assert response.status_code == 201
+    assert (result['imported'], result['failed']) == (1, 4)
+    assert result['errors'] == [
+        {'row': 2, 'error': 'departure_code must be a string'},
+        {'row': 3, 'error': 'flight_date must be a string'},
+        {'row': 4, 'error': 'flight_date must be a date in YYYY-MM-DD format'},
+        {'row': 5, 'error': 'departure_time must be HH:MM or an ISO datetime'},
+    ]
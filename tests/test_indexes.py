@@ -0,0 +1,17 @@
+import app as soarrr
+
+
+def test_the_per_user_read_routes_use_an_index(app, signed_in):
+    client = signed_in('explain@example.com')
+    for day in range(1, 4):
+        client.post('/api/flights', json={'flight_number': f'BA{day}', 'departure_code': 'JFK', 'arrival_code': 'LHR',
+                                          'flight_date': f'2024-05-0{day}', 'departure_time': '08:30',
+                                          'arrival_time': '20:45', 'aircraft': 'A350'})
+    with app.app_context():
+        user_id = soarrr.User.query.filter_by(email='explain@example.com').one().id
+
+    result = app.test_cli_runner().invoke(args=['explain-routes', '--user-id', str(user_id)])
+    assert result.exit_code == 0, result.output
+    assert 'FULL SCAN' not in result.output
+    assert 'USING INDEX ix_flight_user_date' in result.output
+    assert 'flight queries use an index' in result.output
@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import app as soarrr
+
+
+@pytest.fixture
+def user_id(app, signed_in):
+    signed_in('jobs@example.com')
+    with app.app_context():
+        yield soarrr.User.query.filter_by(email='jobs@example.com').one().id
+        soarrr.Job.query.delete()
+        soarrr.db.session.commit()
+
+
+def test_only_jobs_with_a_stale_heartbeat_are_claimed_again(user_id):
+    job = soarrr.enqueue_job(user_id, 'rebuild_stats', {})
+    assert soarrr.claim_job('worker-a').id == job.id
+    assert soarrr.claim_job('worker-b') is None
+
+    job.locked_at = datetime.utcnow() - timedelta(seconds=soarrr.JOB_TIMEOUT + 1)
+    soarrr.db.session.commit()
+    job = soarrr.claim_job('worker-b')
+    assert (job.locked_by, job.attempts) == ('worker-b', 2)
+
+
+def test_an_attempt_that_lost_its_claim_rolls_back(user_id, monkeypatch):
+    def slow_import(job):
+        # Another worker decides this one died and takes the job over
+        with soarrr.db.engine.begin() as connection:
+            connection.execute(soarrr.db.update(soarrr.Job).where(soarrr.Job.id == job.id)
+                               .values(locked_by='worker-b', attempts=soarrr.Job.attempts + 1))
+        soarrr.db.session.add(soarrr.Flight(user_id=user_id, flight_number='ZZ1'))
+        return {'imported': 1}
+    monkeypatch.setitem(soarrr.JOB_HANDLERS, 'slow_import', slow_import)
+
+    job_id = soarrr.enqueue_job(user_id, 'slow_import', {}).id
+    assert soarrr.run_job(soarrr.claim_job('worker-a')) == 'running'
+    job = soarrr.db.session.get(soarrr.Job, job_id)
+    assert (job.status, job.locked_by, job.result) == ('running', 'worker-b', None)
+    assert soarrr.Flight.query.filter_by(user_id=user_id).count() == 0
+
+
+def test_an_import_job_commits_in_chunks_and_resumes_after_the_last_one(user_id, monkeypatch):
+    monkeypatch.setattr(soarrr, 'IMPORT_CHUNK_SIZE', 2)
+    lines = ['flight_number,departure_code,arrival_code,flight_date']
+    lines += [f'CK{i},LHR,CDG,2024-05-0{i}' for i in range(1, 4)] + ['BAD,LHR,CDG,not-a-date']
+    lines += [f'CK{i},LHR,CDG,2024-05-0{i}' for i in range(4, 7)]
+    job_id = soarrr.enqueue_job(user_id, 'import', {'data': '\n'.join(lines) + '\n', 'format': 'csv'}).id
+
+    insert_flight_chunk = soarrr.insert_flight_chunk
+    calls = []
+    def fail_third_chunk(user, chunk):
+        calls.append(len(chunk))
+        if len(calls) == 3:
+            raise RuntimeError('connection lost')
+        insert_flight_chunk(user, chunk)
+    monkeypatch.setattr(soarrr, 'insert_flight_chunk', fail_third_chunk)
+
+    job = soarrr.claim_job('worker-a')
+    locked_at = job.locked_at
+    assert soarrr.run_job(job) == 'queued'
+    job = soarrr.db.session.get(soarrr.Job, job_id)
+    # The first two chunks (rows 1-5, one of them invalid) stay committed
+    assert job.progress == 5
+    assert job.result['imported'] == 4 and job.result['failed'] == 1
+    assert soarrr.Flight.query.filter_by(user_id=user_id).count() == 4
+
+    job.run_at = datetime.utcnow()
+    soarrr.db.session.commit()
+    job = soarrr.claim_job('worker-a')
+    assert job.locked_at >= locked_at
+    assert soarrr.run_job(job) == 'succeeded'
+    job = soarrr.db.session.get(soarrr.Job, job_id)
+    assert (job.result['imported'], job.result['failed']) == (6, 1)
+    assert job.result['errors'][0]['row'] == 4
+    numbers = [number for (number,) in soarrr.db.session.query(soarrr.Flight.flight_number)
+               .filter_by(user_id=user_id).order_by(soarrr.Flight.flight_number)]
+    assert numbers == [f'CK{i}' for i in range(1, 7)]
+
+
+def test_an_unusable_upload_fails_before_any_chunk_is_written(user_id, monkeypatch):
+    monkeypatch.setattr(soarrr, 'IMPORT_CHUNK_SIZE', 1)
+    monkeypatch.setattr(soarrr, 'IMPORT_MAX_ROWS', 3)
+    data = 'flight_number,departure_code,arrival_code\n' + 'BA1,LHR,CDG\n' * 4
+    flights = soarrr.Flight.query.filter_by(user_id=user_id).count()
+    job_id = soarrr.enqueue_job(user_id, 'import', {'data': data, 'format': 'csv'}).id
+    assert soarrr.run_job(soarrr.claim_job('worker-a')) == 'failed'
+    assert soarrr.db.session.get(soarrr.Job, job_id).error == 'Row 4: Imports are limited to 3 rows'
+    assert soarrr.Flight.query.filter_by(user_id=user_id).count() == flights
+
+
+def test_checkpoints_refresh_the_heartbeat_and_publish_progress(user_id, monkeypatch):
+    seen = []
+    def handler(job):
+        soarrr.checkpoint_job(job, 1, {'done': 1}, 2)
+        stored = soarrr.db.session.get(soarrr.Job, job.id)
+        seen.append((stored.locked_at, stored.progress, stored.total, stored.result))
+        return {'done': 2}
+    monkeypatch.setitem(soarrr.JOB_HANDLERS, 'steps', handler)
+    soarrr.enqueue_job(user_id, 'steps', {})
+    job = soarrr.claim_job('worker-a')
+    claimed_at = job.locked_at
+    assert soarrr.run_job(job) == 'succeeded'
+    locked_at, progress, total, result = seen[0]
+    assert locked_at > claimed_at
+    assert (progress, total, result) == (1, 2, {'done': 1})
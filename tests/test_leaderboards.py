@@ -0,0 +1,24 @@
+import app as soarrr
+
+
+def test_flushed_counts_show_up_in_the_leaderboards(signed_in, monkeypatch):
+    monkeypatch.setattr(soarrr, '_leaderboard_cache', None)
+    legs = [{'flight_number': f'NZ{i}', 'departure_code': 'ZQN', 'arrival_code': 'WLG', 'aircraft': 'Leaderboard Jet',
+             'flight_date': '2024-05-01', 'departure_time': '08:30', 'arrival_time': '09:45'} for i in range(60)]
+    for email, flights in (('board-a@example.com', legs[:30]), ('board-b@example.com', legs[30:])):
+        assert signed_in(email).post('/api/flights/batch', json={'flights': flights}).status_code == 201
+
+    with soarrr.app.app_context():
+        soarrr.flush_leaderboards()
+    client = signed_in('board-a@example.com')
+    boards = client.get('/api/leaderboards?limit=50').get_json()
+
+    routes = {(route['departure_code'], route['arrival_code']): route['flights'] for route in boards['routes']}
+    # Never undercounted, and over by at most the reported bound
+    assert 60 <= routes[('ZQN', 'WLG')] <= 60 + boards['accuracy']['routes_max_overcount']
+    aircraft = {entry['aircraft']: entry['flights'] for entry in boards['aircraft']}
+    assert aircraft['Leaderboard Jet'] >= 60
+    airports = {airport['code']: airport for airport in boards['airports']}
+    assert airports['ZQN']['flights'] >= 60
+    assert airports['ZQN']['travellers'] == 2
+    assert boards['updated_at'] is not None
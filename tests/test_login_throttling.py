@@ -0,0 +1,18 @@
+import app as soarrr
+
+
+def login(client, email, password, ip):
+    return client.post('/api/auth/login', json={'email': email, 'password': password},
+                       environ_base={'REMOTE_ADDR': ip})
+
+
+def test_failed_logins_from_one_address_do_not_lock_out_others(app, signed_in):
+    signed_in('victim@example.com')
+    attacker, owner = app.test_client(), app.test_client()
+    for _ in range(soarrr.login_failures.burst):
+        assert login(attacker, 'victim@example.com', 'wrong-password', '203.0.113.7').status_code == 401
+
+    response = login(attacker, 'victim@example.com', 'wrong-password', '203.0.113.7')
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) > 0
+    assert login(owner, 'victim@example.com', 'secret1', '198.51.100.20').status_code == 200
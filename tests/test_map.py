@@ -0,0 +1,26 @@
+import airports
+
+
+def test_routes_are_grouped_with_airports_distances_and_paths(signed_in):
+    client = signed_in('map@example.com')
+    legs = [('LHR', 'JFK')] * 3 + [('JFK', 'LHR')] * 2 + [('LHR', 'XQZ'), ('LHR', None)]
+    for departure, arrival in legs:
+        response = client.post('/api/flights', json={'flight_number': 'BA1', 'departure_code': departure,
+                                                     'arrival_code': arrival, 'flight_date': '2024-05-01'})
+        assert response.status_code == 201
+
+    payload = client.get('/api/map/routes').get_json()
+    assert [(route['departure_code'], route['arrival_code'], route['count']) for route in payload['routes']] == \
+        [('LHR', 'JFK', 3), ('JFK', 'LHR', 2), ('LHR', 'XQZ', 1)]
+    assert payload['total_flights'] == 6
+
+    outbound, inbound, unknown = payload['routes']
+    assert outbound['distance_miles'] == inbound['distance_miles'] == round(airports.distance_miles('LHR', 'JFK'))
+    assert outbound['path'] == [list(point) for point in airports.great_circle_path('LHR', 'JFK')]
+    assert inbound['path'][0] == outbound['path'][-1]
+    assert unknown['distance_miles'] is None and unknown['path'] is None
+
+    assert set(payload['airports']) == {'LHR', 'JFK', 'XQZ'}
+    assert payload['airports']['XQZ'] is None
+    assert payload['airports']['LHR'] == {'name': 'London Heathrow Airport', 'city': 'London', 'country': 'GB',
+                                          'latitude': 51.4706, 'longitude': -0.4619}
@@ -0,0 +1,66 @@
+import app as soarrr
+
+
+def test_metrics_scrape_on_sqlite_reports_the_pool_without_a_capacity(app):
+    client = app.test_client()
+    with app.app_context():
+        assert isinstance(soarrr.db.engine.pool, soarrr.QueuePool)
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert 'soarrr_db_pool_connections{state="checked_out"}' in response.text
+    assert 'state="capacity"' not in response.text
+    assert '\nsoarrr_db_pool_saturation ' not in response.text
+
+
+def samples(text, name):
+    """{label string: value} for every sample of a metric"""
+    result = {}
+    for line in text.splitlines():
+        if line.startswith(name + '{') or line.startswith(name + ' '):
+            labels, _, value = line[len(name):].rpartition(' ')
+            result[labels] = float(value)
+    return result
+
+
+def test_requests_show_up_as_latency_buckets_and_status_counts(app):
+    client = app.test_client()
+    before = samples(client.get('/metrics').text, 'soarrr_http_requests_total')
+    for _ in range(3):
+        assert client.get('/api/auth/status').status_code == 200
+    text = client.get('/metrics').text
+
+    assert '# TYPE soarrr_http_request_duration_seconds histogram' in text
+    buckets = samples(text, 'soarrr_http_request_duration_seconds_bucket')
+    route = [(labels, value) for labels, value in buckets.items() if 'endpoint="auth_status",method="GET"' in labels]
+    assert len(route) == len(soarrr.Histogram(soarrr.Registry(), 'x', 'x').buckets)
+    assert route[-1][0].endswith(',le="+Inf"}')
+    counts = [value for _, value in route]
+    assert counts == sorted(counts)  # Cumulative
+    count = samples(text, 'soarrr_http_request_duration_seconds_count')['{endpoint="auth_status",method="GET"}']
+    assert counts[-1] == count >= 3
+    assert samples(text, 'soarrr_http_request_duration_seconds_sum')['{endpoint="auth_status",method="GET"}'] > 0
+
+    assert '# TYPE soarrr_http_requests_total counter' in text
+    key = '{endpoint="auth_status",method="GET",status="200"}'
+    assert samples(text, 'soarrr_http_requests_total')[key] == before.get(key, 0) + 3
+
+
+def test_pool_gauges_report_capacity_when_the_pool_is_bounded(app, monkeypatch):
+    monkeypatch.setitem(app.config['SQLALCHEMY_ENGINE_OPTIONS'], 'max_overflow', 10)
+    text = app.test_client().get('/metrics').text
+    assert '# TYPE soarrr_db_pool_connections gauge' in text
+    connections = samples(text, 'soarrr_db_pool_connections')
+    with app.app_context():
+        size = soarrr.db.engine.pool.size()
+    assert connections['{state="capacity"}'] == size + 10
+    assert 0 <= samples(text, 'soarrr_db_pool_saturation')[''] <= 1
+
+
+def test_metrics_require_the_bearer_token_when_one_is_set(app, monkeypatch):
+    monkeypatch.setattr(soarrr, 'METRICS_TOKEN', 's3cret')
+    client = app.test_client()
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    response = client.get('/metrics', headers={'Authorization': 'Bearer s3cret'})
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
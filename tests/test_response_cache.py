@@ -0,0 +1,86 @@
+import pytest
+
+import app as soarrr
+
+FLIGHT = {'flight_number': 'BA117', 'departure_code': 'LHR', 'arrival_code': 'JFK',
+          'flight_date': '2024-05-01', 'departure_time': '08:30', 'arrival_time': '11:15'}
+
+
+@pytest.fixture
+def shared(monkeypatch):
+    """A shared tier as with RESPONSE_CACHE_BACKEND=local, behind this worker's empty local tier"""
+    backend = soarrr.LocalCacheBackend()
+    monkeypatch.setattr(soarrr, 'response_cache', soarrr.ResponseCache(shared=backend))
+    return backend
+
+
+@pytest.fixture
+def flight_queries(app):
+    statements = []
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM flight' in statement:
+            statements.append(statement)
+    with app.app_context():
+        soarrr.db.event.listen(soarrr.db.engine, 'before_cursor_execute', capture)
+        yield statements
+        soarrr.db.event.remove(soarrr.db.engine, 'before_cursor_execute', capture)
+
+
+def test_if_none_match_gets_304_until_a_write_changes_the_etag(signed_in, shared):
+    client = signed_in('etag@example.com')
+    client.post('/api/flights', json=FLIGHT)
+    first = client.get('/api/flights')
+    assert first.status_code == 200 and first.headers['ETag']
+
+    revalidated = client.get('/api/flights', headers={'If-None-Match': first.headers['ETag']})
+    assert revalidated.status_code == 304
+    assert revalidated.data == b''
+
+    client.post('/api/flights', json=FLIGHT)
+    changed = client.get('/api/flights', headers={'If-None-Match': first.headers['ETag']})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != first.headers['ETag']
+    assert len(changed.get_json()) == 2
+
+
+def test_a_hit_in_the_shared_tier_skips_the_view(signed_in, shared, flight_queries, monkeypatch):
+    client = signed_in('shared@example.com')
+    client.post('/api/flights', json=FLIGHT)
+    body = client.get('/api/flights').data
+
+    # Another worker: its own empty local tier over the same shared backend
+    monkeypatch.setattr(soarrr, 'response_cache', soarrr.ResponseCache(shared=shared))
+    assert flight_queries  # The first request ran the view
+    flight_queries.clear()
+    response = client.get('/api/flights')
+    assert response.status_code == 200
+    assert response.data == body
+    assert flight_queries == []
+
+
+def test_the_local_tier_evicts_to_stay_within_its_byte_budget():
+    cache = soarrr.LRUCache(max_entries=100, max_bytes=10)
+    cache.set('a', b'1234')
+    cache.set('b', b'5678')
+    cache.set('c', b'90ab')
+    assert cache.get('a') is None
+    assert cache.get('b') == b'5678' and cache.get('c') == b'90ab'
+    assert cache.size == 8
+
+    cache.set('b', b'12')
+    assert cache.size == 6
+    cache.set('big', b'x' * 11)
+    assert cache.get('big') is None and cache.size == 6
+
+
+def test_bodies_over_the_size_threshold_are_not_cached(signed_in, flight_queries, monkeypatch):
+    backend = soarrr.LocalCacheBackend()
+    monkeypatch.setattr(soarrr, 'response_cache', soarrr.ResponseCache(shared=backend, max_body_bytes=64))
+    client = signed_in('large@example.com')
+    client.post('/api/flights', json=FLIGHT)
+    client.get('/api/flights')
+
+    flight_queries.clear()
+    assert client.get('/api/flights').status_code == 200
+    assert flight_queries
+    assert soarrr.response_cache.local.size == 0
@@ -0,0 +1,64 @@
+import itertools
+
+import pytest
+
+SEARCH_USERS = itertools.count()
+
+FLIGHTS = [
+    {'flight_number': 'BA117', 'departure_code': 'LHR', 'arrival_code': 'JFK', 'departure_city': 'London',
+     'arrival_city': 'New York', 'aircraft': 'Boeing 777', 'cabin_class': 'Business', 'flight_date': '2024-05-01'},
+    {'flight_number': 'BA304', 'departure_code': 'LHR', 'arrival_code': 'CDG', 'departure_city': 'London',
+     'arrival_city': 'Paris', 'aircraft': 'Airbus A320', 'cabin_class': 'Economy', 'flight_date': '2024-06-01',
+     'notes': 'Window seat, newlyweds'},
+    {'flight_number': 'AF1780', 'departure_code': 'CDG', 'arrival_code': 'LHR', 'departure_city': 'Paris',
+     'arrival_city': 'London', 'aircraft': 'Airbus A319', 'cabin_class': 'Economy', 'flight_date': '2024-06-08'},
+]
+
+
+@pytest.fixture
+def client(signed_in):
+    client = signed_in(f'search-{next(SEARCH_USERS)}@example.com')
+    for data in FLIGHTS:
+        assert client.post('/api/flights', json=data).status_code == 201
+    return client
+
+
+def numbers(client, query):
+    response = client.get(f'/api/flights?fields=flight_number&{query}')
+    assert response.status_code == 200, response.get_json()
+    return [flight['flight_number'] for flight in response.get_json()]
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('q=paris', ['AF1780', 'BA304']),
+    ('q=Par', ['AF1780', 'BA304']),
+    ('q=new', ['BA304', 'BA117']),
+    ('q=airbus+a32', ['BA304']),
+    ('q=ba11', ['BA117']),
+    ('q=aris', []),
+    ('q=%25', ['AF1780', 'BA304', 'BA117']),
+])
+def test_q_matches_word_prefixes_across_the_text_fields(client, query, expected):
+    assert numbers(client, query) == expected
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('q=london&departure=CDG', ['AF1780']),
+    ('q=london&cabin_class=Business', ['BA117']),
+    ('q=airbus&from=2024-06-05', ['AF1780']),
+    ('q=london&aircraft=boeing', ['BA117']),
+])
+def test_q_combines_with_the_other_filters(client, query, expected):
+    assert numbers(client, query) == expected
+
+
+def test_q_narrows_paginated_lists(client):
+    page = client.get('/api/flights?fields=flight_number&q=airbus&limit=1').get_json()
+    assert page['flights'] == [{'flight_number': 'AF1780'}]
+    page = client.get(f"/api/flights?fields=flight_number&q=airbus&limit=1&cursor={page['next_cursor']}").get_json()
+    assert page == {'flights': [{'flight_number': 'BA304'}], 'next_cursor': None}
+
+
+def test_other_users_flights_never_match(client, signed_in):
+    other = signed_in(f'search-{next(SEARCH_USERS)}@example.com')
+    assert numbers(other, 'q=paris') == []
@@ -0,0 +1,76 @@
+from datetime import date
+
+import app as soarrr
+
+
+def test_generating_seed_users_while_hashing_is_saturated_returns_503(signed_in, monkeypatch):
+    admin = signed_in('admin@example.com')
+    monkeypatch.setattr(soarrr, 'ADMIN_EMAILS', {'admin@example.com'})
+
+    def busy(password):
+        raise soarrr.PasswordHashBusy()
+    monkeypatch.setattr(soarrr, 'hash_password', busy)
+
+    response = admin.post('/api/seed/add', json={'users': 1, 'flights': 10, 'password': 'secret1'})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    with soarrr.app.app_context():
+        assert soarrr.Job.query.count() == 0
+
+
+def search_trigger_exists():
+    connection = soarrr.db.session.connection()
+    return connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'flight_search_insert'").first() is not None
+
+
+def test_generated_flights_are_searchable_and_the_search_trigger_survives(app, signed_in):
+    client = signed_in('seeded@example.com')
+    with app.app_context():
+        user_id = soarrr.User.query.filter_by(email='seeded@example.com').one().id
+        soarrr.generate_seed_flights([user_id], 50, seed=7, commit=False)
+        soarrr.db.session.rollback()
+        assert search_trigger_exists()
+        assert soarrr.Flight.query.filter_by(user_id=user_id).count() == 0
+
+        soarrr.generate_seed_flights([user_id], 50, seed=7)
+        assert search_trigger_exists()
+        flight_number = soarrr.Flight.query.filter_by(user_id=user_id).first().flight_number
+
+    flights = client.get(f'/api/flights?q={flight_number}').get_json()
+    assert flight_number in {flight['flight_number'] for flight in flights}
+    # Rows written afterwards are still indexed by the trigger
+    client.post('/api/flights', json={'flight_number': 'ZZ999', 'departure_code': 'LHR', 'arrival_code': 'CDG',
+                                      'flight_date': '2024-05-01', 'departure_time': '08:30', 'arrival_time': '10:45'})
+    assert [flight['flight_number'] for flight in client.get('/api/flights?q=zz999').get_json()] == ['ZZ999']
+
+
+def test_generation_resumed_from_its_last_progress_writes_the_same_flights(app, signed_in):
+    signed_in('seed-full@example.com')
+    signed_in('seed-resumed@example.com')
+
+    class Interrupted(Exception):
+        pass
+    def stop_after_first_chunk(done):
+        raise Interrupted(done)
+
+    with app.app_context():
+        full, resumed = (soarrr.User.query.filter_by(email=email).one().id
+                         for email in ('seed-full@example.com', 'seed-resumed@example.com'))
+        soarrr.generate_seed_flights([full], 50, seed=11, end_date=date(2024, 6, 1), chunk_size=20)
+        try:
+            soarrr.generate_seed_flights([resumed], 50, seed=11, end_date=date(2024, 6, 1), chunk_size=20,
+                                         progress=stop_after_first_chunk)
+        except Interrupted as e:
+            done = e.args[0]
+        assert done == 20
+        assert soarrr.generate_seed_flights([resumed], 50, seed=11, end_date=date(2024, 6, 1), chunk_size=20,
+                                            start=done) == 30
+
+        def flights(user_id):
+            return sorted(soarrr.db.session.query(soarrr.Flight.flight_number, soarrr.Flight.departure_time)
+                          .filter_by(user_id=user_id).all())
+        assert len(flights(full)) == 50
+        assert flights(resumed) == flights(full)
+        assert soarrr.rollup_dict(soarrr.db.session.get(soarrr.UserStats, resumed)) == \
+            soarrr.aggregate_user_stats(resumed)
@@ -0,0 +1,95 @@
+import random
+from collections import Counter
+
+from sketches import CountMinSketch, HeavyHitters, HyperLogLog, KeyedHyperLogLog
+
+
+def zipf_stream(n, keys, seed=1):
+    rng = random.Random(seed)
+    weights = [1 / rank for rank in range(1, keys + 1)]
+    return rng.choices([f'key{i}' for i in range(keys)], weights, k=n)
+
+
+def test_count_min_never_undercounts_and_stays_within_its_bound():
+    sketch = CountMinSketch(width=64, depth=4)  # Narrow, so keys collide
+    stream = zipf_stream(20000, 500)
+    for key in stream:
+        sketch.add(key)
+    exact = Counter(stream)
+    overcounts = [sketch.estimate(key) - count for key, count in exact.items()]
+    assert min(overcounts) >= 0
+    assert sum(overcount <= sketch.error_bound() for overcount in overcounts) / len(overcounts) > 0.95
+
+
+def test_count_min_round_trips_and_merges():
+    first, second = CountMinSketch(width=256, depth=3), CountMinSketch(width=256, depth=3)
+    for key in zipf_stream(2000, 100, seed=1):
+        first.add(key)
+    for key in zipf_stream(2000, 100, seed=2):
+        second.add(key, 2)
+
+    copy = CountMinSketch.from_bytes(first.to_bytes())
+    assert copy.to_bytes() == first.to_bytes()
+    assert (copy.width, copy.depth, copy.total) == (256, 3, 2000)
+
+    merged = CountMinSketch.from_bytes(first.to_bytes())
+    merged.merge(second)
+    assert merged.total == 6000
+    assert list(merged.counts) == [a + b for a, b in zip(first.counts, second.counts)]
+    for key in ('key0', 'key1', 'key50'):
+        assert merged.estimate(key) >= first.estimate(key) and merged.estimate(key) >= second.estimate(key)
+
+
+def test_heavy_hitters_track_the_top_keys_through_removals():
+    hitters = HeavyHitters(capacity=3)
+    for key, count in (('LHR', 10), ('JFK', 8), ('CDG', 6), ('SFO', 4)):
+        hitters.add(key, count)
+    assert hitters.top(3) == [('LHR', 10), ('JFK', 8), ('CDG', 6)]
+
+    hitters.add('LHR', -10)
+    assert hitters.top(3) == [('JFK', 8), ('CDG', 6)]
+    hitters.add('SFO', 5)
+    assert hitters.top(3) == [('SFO', 9), ('JFK', 8), ('CDG', 6)]
+
+    copy = HeavyHitters.from_bytes(hitters.to_bytes())
+    assert copy.top(3) == hitters.top(3)
+    assert copy.estimate('SFO') == 9
+
+    other = HeavyHitters(capacity=3)
+    other.add('LHR', 20)
+    copy.merge(other)
+    assert copy.top(2) == [('LHR', 20), ('SFO', 9)]
+
+
+def test_hyperloglog_is_within_three_standard_errors():
+    for p in (10, 12):
+        # Ten disjoint sets of 10k travellers
+        for group in range(10):
+            sketch = HyperLogLog(p)
+            for i in range(10000):
+                sketch.add(f'user-{group}-{i}')
+            assert abs(sketch.count() - 10000) <= 3 * sketch.relative_error() * 10000
+
+    small = HyperLogLog()
+    for i in range(100):
+        small.add(i)
+        small.add(i)  # Repeats are not counted again
+    assert abs(small.count() - 100) <= 3
+
+
+def test_keyed_hyperloglog_round_trips_and_merges():
+    first, second = KeyedHyperLogLog(), KeyedHyperLogLog()
+    for user_id in range(3000):
+        first.add('LHR', user_id)
+        second.add('LHR', user_id + 1500)
+        second.add('JFK', user_id)
+
+    copy = KeyedHyperLogLog.from_bytes(first.to_bytes())
+    assert copy.to_bytes() == first.to_bytes()
+    assert copy.count('LHR') == first.count('LHR')
+    assert copy.count('CDG') == 0
+
+    copy.merge(second)
+    tolerance = 3 * copy.relative_error()
+    assert abs(copy.count('LHR') - 4500) <= tolerance * 4500
+    assert abs(copy.count('JFK') - 3000) <= tolerance * 3000
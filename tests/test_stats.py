@@ -0,0 +1,87 @@
+from datetime import date
+
+import app as soarrr
+
+YEAR = date.today().year
+
+
+def flight(number, departure, arrival, city, month, cabin_class=None):
+    return {'flight_number': number, 'departure_code': departure, 'arrival_code': arrival,
+            'departure_city': 'London', 'arrival_city': city, 'cabin_class': cabin_class,
+            'flight_date': f'{YEAR}-{month:02d}-10', 'departure_time': '08:00', 'arrival_time': '10:30'}
+
+
+def test_stats_payload_aggregates_classes_destinations_and_months(signed_in):
+    client = signed_in('stats-shape@example.com')
+    for data in (flight('BA1', 'LHR', 'CDG', 'Paris', 1, 'Economy'),
+                 flight('BA2', 'LHR', 'ORY', 'Paris', 1, 'Economy'),
+                 flight('BA3', 'LGW', 'CDG', 'Paris', 3, 'Business'),
+                 flight('BA4', 'LHR', 'JFK', 'New York', 3)):
+        assert client.post('/api/flights', json=data).status_code == 201
+
+    stats = client.get('/api/stats').get_json()
+    assert stats['total_flights'] == 4
+    assert stats['total_hours'] == '10h'
+    assert stats['countries_visited'] == 3
+    assert stats['flight_classes'] == {
+        'Economy': {'count': 2, 'percentage': 50},
+        'Business': {'count': 1, 'percentage': 25},
+        'Unknown': {'count': 1, 'percentage': 25},
+    }
+    assert stats['top_destinations'] == [
+        {'city': 'Paris', 'count': 3, 'percentage': 75, 'airport_code': 'CDG'},
+        {'city': 'New York', 'count': 1, 'percentage': 25, 'airport_code': 'JFK'},
+    ]
+    assert [month['flights'] for month in stats['monthly_activity']] == [2, 0, 2] + [0] * 9
+    assert stats['monthly_activity'][0]['month'] == 'January'
+
+
+def test_a_user_without_flights_gets_zeroed_stats(signed_in):
+    stats = signed_in('stats-empty@example.com').get('/api/stats').get_json()
+    assert stats == {'total_flights': 0, 'total_hours': 0, 'countries_visited': 0, 'miles_flown': 0,
+                     'flight_classes': {}, 'top_destinations': [], 'monthly_activity': []}
+
+
+def test_the_rollup_follows_adds_and_deletes_without_reading_flights(app, signed_in):
+    client = signed_in('stats-rollup@example.com')
+    ids = [client.post('/api/flights', json=data).get_json()['id']
+           for data in (flight('BA1', 'LHR', 'CDG', 'Paris', 1, 'Economy'),
+                        flight('BA2', 'LHR', 'JFK', 'New York', 2, 'Business'),
+                        flight('BA3', 'LHR', 'CDG', 'Paris', 2, 'Economy'))]
+    assert client.delete(f'/api/flights/{ids[1]}').status_code == 200
+
+    statements = []
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    with app.app_context():
+        soarrr.db.event.listen(soarrr.db.engine, 'before_cursor_execute', capture)
+        try:
+            stats = client.get('/api/stats').get_json()
+        finally:
+            soarrr.db.event.remove(soarrr.db.engine, 'before_cursor_execute', capture)
+        user_id = soarrr.User.query.filter_by(email='stats-rollup@example.com').one().id
+        assert soarrr.rollup_dict(soarrr.db.session.get(soarrr.UserStats, user_id)) == \
+            soarrr.aggregate_user_stats(user_id)
+
+    assert any('FROM user_stats' in statement for statement in statements)
+    assert not [statement for statement in statements if 'FROM flight' in statement]
+    assert stats['total_flights'] == 2
+    assert stats['flight_classes'] == {'Economy': {'count': 2, 'percentage': 100}}
+    assert stats['top_destinations'] == [{'city': 'Paris', 'count': 2, 'percentage': 100, 'airport_code': 'CDG'}]
+
+    for flight_id in (ids[0], ids[2]):
+        client.delete(f'/api/flights/{flight_id}')
+    assert client.get('/api/stats').get_json()['total_flights'] == 0
+
+
+def test_durations_are_stored_as_minutes_and_summed_for_total_hours(app, signed_in):
+    client = signed_in('stats-minutes@example.com')
+    overnight = dict(flight('BA5', 'LHR', 'JFK', 'New York', 4), departure_time='23:10', arrival_time='01:05')
+    short = dict(flight('BA6', 'LHR', 'CDG', 'Paris', 4), departure_time='08:00', arrival_time='08:50')
+    created = [client.post('/api/flights', json=data).get_json() for data in (overnight, short)]
+    assert [data['duration'] for data in created] == ['1h 55m', '50m']
+
+    with app.app_context():
+        minutes = [soarrr.db.session.get(soarrr.Flight, data['id']).duration_minutes for data in created]
+    assert minutes == [115, 50]
+    assert client.get('/api/stats').get_json()['total_hours'] == '2h'
@@ -0,0 +1,19 @@
+def flight(number, day):
+    return {'flight_number': number, 'departure_code': 'LHR', 'arrival_code': 'CDG',
+            'flight_date': f'2024-05-0{day}', 'departure_time': '08:30', 'arrival_time': '10:45'}
+
+
+def test_a_deleted_flight_id_is_not_reused_and_every_change_is_sequenced(signed_in):
+    client = signed_in('sync@example.com')
+    ids = [client.post('/api/flights', json=flight(f'BA{day}', day)).get_json()['id'] for day in (1, 2)]
+    token = client.get('/api/flights/changes').get_json()['next_token']
+
+    assert client.delete(f'/api/flights/{ids[-1]}').status_code == 200
+    created = client.post('/api/flights/batch', json={'flights': [flight('BA3', 3)]}).get_json()
+    new_id = created['flights'][0]['id']
+    assert new_id not in ids
+
+    changes = client.get(f'/api/flights/changes?since={token}').get_json()
+    assert [entry['id'] for entry in changes['deleted']] == [ids[-1]]
+    assert [entry['id'] for entry in changes['flights']] == [new_id]
+    assert changes['deleted'][0]['change_seq'] < changes['flights'][0]['change_seq']
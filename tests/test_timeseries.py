@@ -0,0 +1,76 @@
+from datetime import date
+
+import app as soarrr
+
+RANGES = {'week': ('2023-01-02', '2023-05-28'), 'month': ('2022-01-01', '2023-12-31'),
+          'year': ('2020-01-01', '2023-12-31')}
+
+
+def flight(flight_date):
+    return {'flight_number': 'BA117', 'departure_code': 'LHR', 'arrival_code': 'JFK', 'flight_date': flight_date,
+            'departure_time': '08:30', 'arrival_time': '11:15'}
+
+
+def timeseries(client):
+    result = {}
+    for granularity, (first, last) in RANGES.items():
+        response = client.get(f'/api/stats/timeseries?granularity={granularity}&from={first}&to={last}')
+        assert response.status_code == 200
+        result[granularity] = {bucket['start']: bucket for bucket in response.get_json()['buckets']}
+    return result
+
+
+def stored_buckets(user_id):
+    return {(row.granularity, row.period_start): {field: getattr(row, field) for field in soarrr.BUCKET_FIELDS}
+            for row in soarrr.StatsBucket.query.filter_by(user_id=user_id)}
+
+
+def test_a_back_dated_flight_changes_only_the_buckets_covering_it(app, signed_in):
+    client = signed_in('timeseries@example.com')
+    dates = ['2022-06-10', '2023-01-05', '2023-02-20', '2023-03-02', '2023-04-11', '2023-05-20']
+    assert client.post('/api/flights/batch', json={'flights': [flight(day) for day in dates]}).status_code == 201
+    before = timeseries(client)
+    with app.app_context():
+        user_id = soarrr.User.query.filter_by(email='timeseries@example.com').one().id
+        stored = stored_buckets(user_id)
+    assert len(stored) == sum(len(buckets) for buckets in before.values())
+
+    assert client.post('/api/flights', json=flight('2023-03-15')).status_code == 201
+    with app.app_context():
+        kept = stored_buckets(user_id)
+    # Only buckets overlapping the flight's month are dropped; the rest are reused as stored
+    dropped = set(stored) - set(kept)
+    weeks = {start for granularity, start in dropped if granularity == 'week'}
+    assert dropped - {('week', start) for start in weeks} == {('month', date(2023, 3, 1)), ('year', date(2023, 1, 1))}
+    assert all(date(2023, 2, 27) <= start < date(2023, 4, 1) for start in weeks)
+    assert all(kept[key] == stored[key] for key in kept)
+
+    after = timeseries(client)
+    for granularity, covering in (('week', '2023-03-13'), ('month', '2023-03-01'), ('year', '2023-01-01')):
+        changed = [start for start in after[granularity] if after[granularity][start] != before[granularity][start]]
+        assert changed == [covering]
+        assert after[granularity][covering]['flights'] == before[granularity][covering]['flights'] + 1
+
+
+def test_a_range_with_too_many_periods_is_rejected(signed_in):
+    client = signed_in('timeseries-range@example.com')
+    response = client.get('/api/stats/timeseries?granularity=week&from=2000-01-01&to=2024-01-01')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == f'Range too long: at most {soarrr.MAX_TIMESERIES_BUCKETS} weeks'
+    assert client.get('/api/stats/timeseries?granularity=year&from=2000-01-01&to=2024-01-01').status_code == 200
+
+
+def test_dates_at_the_ends_of_the_calendar_get_a_400_or_a_clamped_range(signed_in):
+    client = signed_in('timeseries-edges@example.com')
+    for granularity in ('week', 'month', 'year'):
+        response = client.get(f'/api/stats/timeseries?granularity={granularity}&from=9999-01-01&to=9999-12-31')
+        assert response.status_code == 400
+        assert response.get_json()['error'] == 'to must not be after 9998-12-31'
+    response = client.get('/api/stats/timeseries?granularity=month&from=9998-01-01&to=9998-12-31')
+    assert response.status_code == 200
+    assert len(response.get_json()['buckets']) == 12
+
+    # The default range stops at the first representable period
+    response = client.get('/api/stats/timeseries?granularity=week&to=0001-01-10')
+    assert response.status_code == 200
+    assert response.get_json()['from'] == '0001-01-01'